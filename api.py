@@ -0,0 +1,469 @@
+# api.py
+
+"""
+Local JSON/HTTP API over the batch engine, for tools that want damage
+numbers without driving the Gradio UI. Endpoints take and return JSON:
+
+    POST /damage    one build     {"config", "source", "level", "rounds"?, "stacks"?}
+    POST /batch     many builds   {"configs", "source", "level", "rounds"?, "stacks"?}
+    POST /ttk       kill rounds   {"config" or "configs", "source", "level", "max_rounds"?, "stacks"?}
+    POST /sweep     grid sweep    {"axes", "sources"?, "levels"?, "base"?, "rounds"?}
+    GET  /health    queue depth and counters
+    GET  /metrics   request, queue and batch metrics in the Prometheus text format
+
+Configs are partial: keys left out take their BASE_CONFIG value. Requests
+wait in a bounded queue. A batching thread drains it and stacks the rows of
+all queued requests for the same endpoint, adventurer, level and options
+into one matrix, evaluated in a single vectorized call, so many small
+concurrent requests cost about as much as one large one. Sweeps wait in a
+queue of their own and run on separate threads, so they never hold up the
+batched endpoints. When a queue is full the server answers 503 with
+Retry-After rather than queueing without bound. Connections are kept alive
+(HTTP/1.1).
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from config.scenarios import BASE_CONFIG
+from simulation.adventurers import ADVENTURER_LEVELS
+from simulation.batch import KEY_INDEX, configs_to_matrix, adventurer_damage_batch, adventurer_timeline_batch
+from simulation.sweep import grid_sweep
+from simulation.ttk import kill_rounds_batch
+from utils.metrics import CONTENT_TYPE, MetricsRegistry
+
+logger = logging.getLogger("capybara.api")
+
+# Requests waiting for the batching thread; beyond this the server answers 503
+API_QUEUE = int(os.getenv("API_QUEUE", 1024))
+# Rows stacked into one vectorized call at most
+API_BATCH_ROWS = int(os.getenv("API_BATCH_ROWS", 8192))
+# How long a batch waits for more requests; 0 only takes what is already queued
+API_BATCH_WAIT_MS = float(os.getenv("API_BATCH_WAIT_MS", 0))
+# Sweeps run on their own threads and queue, so a long one never holds up the batched endpoints
+API_SWEEP_WORKERS = int(os.getenv("API_SWEEP_WORKERS", 1))
+API_SWEEP_QUEUE = int(os.getenv("API_SWEEP_QUEUE", 8))
+# Builds per request and sweep cells per request at most
+API_MAX_ROWS = int(os.getenv("API_MAX_ROWS", 100_000))
+API_MAX_SWEEP_CELLS = int(os.getenv("API_MAX_SWEEP_CELLS", 1_000_000))
+# rounds / max_rounds per request at most; a round is a column of every row's timeline
+API_MAX_ROUNDS = int(os.getenv("API_MAX_ROUNDS", 1000))
+# Request bodies above this size are refused
+API_MAX_BODY = int(os.getenv("API_MAX_BODY", 64 * 2 ** 20))
+# Seconds a request waits for its result before the server answers 504
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", 60))
+# Rows per vectorized call, as histogram buckets
+BATCH_ROW_BUCKETS = tuple(2 ** i for i in range(14))
+
+
+class QueueFull(Exception):
+    """The request queue is full; the client should retry later."""
+
+
+# === [1] Request Parsing ===
+def _adventurer(payload: dict) -> tuple:
+    source = payload.get("source")
+    if not isinstance(source, str) or source not in ADVENTURER_LEVELS:
+        raise ValueError(f"Unknown adventurer source: {source!r}")
+    level = payload.get("level")
+    if not isinstance(level, int) or isinstance(level, bool) or level not in ADVENTURER_LEVELS[source]:
+        raise ValueError(f"Unknown level for {source}: {level!r}")
+    return source, int(level)
+
+
+def _optional_int(payload: dict, name: str):
+    value = payload.get(name)
+    if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+        raise ValueError(f"{name} must be a positive integer")
+    if value is not None and value > API_MAX_ROUNDS:
+        raise ValueError(f"{name} is {value}, at most {API_MAX_ROUNDS} are accepted")
+    return value
+
+
+def _config_matrix(configs) -> np.ndarray:
+    if not isinstance(configs, list) or not all(isinstance(config, dict) for config in configs):
+        raise ValueError("configs must be a list of objects")
+    if not configs or len(configs) > API_MAX_ROWS:
+        raise ValueError(f"Between 1 and {API_MAX_ROWS} configs are accepted per request")
+    unknown = {key for config in configs for key in config} - KEY_INDEX.keys()
+    if unknown:
+        raise ValueError(f"Unknown config keys: {sorted(unknown)}")
+    try:
+        return configs_to_matrix(configs)
+    except (TypeError, ValueError):
+        raise ValueError("Config values must be numbers") from None
+
+
+def _builds(payload: dict) -> tuple:
+    """(config matrix, whether the request named a list of builds)."""
+    if "configs" in payload:
+        return _config_matrix(payload["configs"]), True
+    return _config_matrix([payload.get("config", {})]), False
+
+
+def parse_request(path: str, payload: dict) -> tuple:
+    """(batch key, config matrix, many, options) of an endpoint request. Raises ValueError when invalid."""
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    if path == "/sweep":
+        return ("sweep",), None, False, _sweep_options(payload)
+    source, level = _adventurer(payload)
+    stacks = bool(payload.get("stacks", True))
+    if path == "/damage":
+        X, many = _config_matrix([payload.get("config", {})]), False
+    elif path == "/batch":
+        if "configs" not in payload:
+            raise ValueError("/batch needs a configs list")
+        X, many = _config_matrix(payload["configs"]), True
+    else:
+        X, many = _builds(payload)
+    if path == "/ttk":
+        return ("ttk", source, level, _optional_int(payload, "max_rounds"), stacks), X, many, None
+    return ("damage", source, level, _optional_int(payload, "rounds"), stacks), X, many, None
+
+
+def _sweep_options(payload: dict) -> dict:
+    axes = payload.get("axes")
+    if not isinstance(axes, dict) or not axes:
+        raise ValueError("axes must be an object of {config key: values}")
+    unknown = set(axes) - KEY_INDEX.keys()
+    if unknown:
+        raise ValueError(f"Unknown config keys for sweep axes: {sorted(unknown)}")
+    if not all(isinstance(values, list) and values for values in axes.values()):
+        raise ValueError("Every sweep axis needs a non-empty list of values")
+    cells = int(np.prod([len(values) for values in axes.values()]))
+    if cells > API_MAX_SWEEP_CELLS:
+        raise ValueError(f"Sweep has {cells} cells, at most {API_MAX_SWEEP_CELLS} are accepted")
+    base = payload.get("base", {})
+    if not isinstance(base, dict) or set(base) - KEY_INDEX.keys():
+        raise ValueError("base must be an object of known config keys")
+    sources = payload.get("sources")
+    if sources is not None and (not isinstance(sources, list) or not all(isinstance(source, str) for source in sources)
+                                or set(sources) - ADVENTURER_LEVELS.keys()):
+        raise ValueError(f"sources must be a list of {sorted(ADVENTURER_LEVELS)}")
+    levels = payload.get("levels")
+    if levels is not None and not isinstance(levels, (list, dict)):
+        raise ValueError("levels must be a list or an object of {source: levels}")
+    try:
+        axes = {key: np.asarray(values, dtype=float) for key, values in axes.items()}
+    except (TypeError, ValueError):
+        raise ValueError("Sweep axis values must be numbers") from None
+    if any(values.ndim != 1 for values in axes.values()):
+        raise ValueError("Every sweep axis must be a flat list of numbers")
+    return {
+        "axes": axes, "sources": sources, "levels": levels,
+        "base": {**BASE_CONFIG, **base}, "rounds": _optional_int(payload, "rounds"),
+    }
+
+
+# === [2] Evaluation ===
+def evaluate(key: tuple, X: np.ndarray, options: dict = None) -> dict:
+    """Columns of one batch key for the stacked rows X: {name: (N,) array}, or the sweep result."""
+    op = key[0]
+    if op == "sweep":
+        result = grid_sweep(**options)
+        return {
+            "axes": {name: values.tolist() for name, values in result.axes.items()},
+            "levels": {source: [int(level) for level in levels] for source, levels in result.levels.items()},
+            "totals": {source: np.asarray(totals).tolist() for source, totals in result.totals.items()},
+        }
+    _, source, level, rounds, stacks = key
+    if op == "damage":
+        dmg = adventurer_damage_batch(source, X, level, stacks)
+        fight = adventurer_timeline_batch(source, X, level, rounds, dmg=dmg, per_skill=False).cumulative()[:, -1]
+        return {**{name: np.broadcast_to(values, (X.shape[0],)) for name, values in dmg.items()},
+                "fight_damage": fight}
+    if op == "ttk":
+        return {"kill_round": kill_rounds_batch(source, X, level, None, rounds, stacks)[:, 0]}
+    raise ValueError(f"Unknown operation: {op!r}")
+
+
+def warm_up():
+    """Builds every adventurer level's column tables before the first request needs them."""
+    X = configs_to_matrix([{}])
+    for source, levels in ADVENTURER_LEVELS.items():
+        for level in levels:
+            evaluate(("damage", source, level, None, True), X)
+            evaluate(("ttk", source, level, None, True), X)
+
+
+# === [3] Micro-Batching ===
+@dataclass
+class Job:
+    key: tuple
+    X: np.ndarray
+    options: dict = None
+    future: Future = field(default_factory=Future)
+    queued: float = field(default_factory=time.perf_counter)
+
+    @property
+    def rows(self) -> int:
+        return 0 if self.X is None else self.X.shape[0]
+
+
+class MicroBatcher:
+    """
+    Bounded request queue drained by batching threads. Each drain takes the
+    queued jobs (up to `max_rows` rows), groups them by key and evaluates each
+    group once on the stacked rows; every job's future gets its own slice.
+    Sweeps (jobs without rows) can run for seconds, so they wait in a second
+    bounded queue served by `sweep_workers` threads of their own.
+    """
+
+    def __init__(self, evaluate_fn=evaluate, max_queue: int = API_QUEUE, max_rows: int = API_BATCH_ROWS,
+                 max_wait_ms: float = API_BATCH_WAIT_MS, workers: int = 1, metrics: MetricsRegistry = None,
+                 sweep_workers: int = API_SWEEP_WORKERS, max_sweeps: int = API_SWEEP_QUEUE):
+        self.evaluate_fn = evaluate_fn
+        self.max_rows = max_rows
+        self.max_wait_s = max_wait_ms / 1e3
+        self._queue = queue.Queue(max_queue)
+        self._sweeps = queue.Queue(max_sweeps)
+        self._closed = threading.Event()
+
+        # Simple counters, exposed on /health
+        self.submitted = 0
+        self.rejected = 0
+        self.batches = 0
+        self.rows = 0
+        self.failed = 0
+
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics.gauge("api_queue_depth", "Requests waiting for the batching thread", fn=lambda: self.depth)
+        self.metrics.gauge("api_sweep_queue_depth", "Sweeps waiting for a sweep thread", fn=lambda: self.sweep_depth)
+        self.metrics.counter("api_jobs_total", "Queued requests by outcome", ["outcome"], fn=lambda: {
+            ("submitted",): self.submitted, ("rejected",): self.rejected, ("failed",): self.failed,
+        })
+        self.metrics.counter("api_batches_total", "Vectorized calls made", fn=lambda: self.batches)
+        self._queue_wait = self.metrics.histogram("api_queue_wait_seconds", "Time requests spent queued")
+        self._batch_rows = self.metrics.histogram("api_batch_rows", "Rows stacked into one vectorized call",
+                                                  buckets=BATCH_ROW_BUCKETS)
+
+        self._threads = [threading.Thread(target=self._run, name=f"api-batcher-{i}", daemon=True)
+                         for i in range(workers)]
+        self._threads += [threading.Thread(target=self._run_sweeps, name=f"api-sweeper-{i}", daemon=True)
+                          for i in range(sweep_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def sweep_depth(self) -> int:
+        return self._sweeps.qsize()
+
+    def submit(self, key: tuple, X: np.ndarray = None, options: dict = None) -> Future:
+        """Queues a job and returns its future. Raises QueueFull instead of waiting for room."""
+        if self._closed.is_set():
+            raise QueueFull("Server is shutting down")
+        job = Job(key, X, options)
+        target = self._sweeps if X is None else self._queue
+        try:
+            target.put_nowait(job)
+        except queue.Full:
+            self.rejected += 1
+            kind = "Sweep" if X is None else "Request"
+            raise QueueFull(f"{kind} queue is full ({target.maxsize} waiting)") from None
+        self.submitted += 1
+        return job.future
+
+    def _drain(self, first: Job) -> list:
+        jobs, rows = [first], first.rows
+        deadline = time.perf_counter() + self.max_wait_s
+        while rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            jobs.append(job)
+            rows += job.rows
+        return jobs
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._closed.is_set():
+                    return
+                continue
+            groups = {}
+            for job in self._drain(first):
+                groups.setdefault(job.key, []).append(job)
+            for key, jobs in groups.items():
+                self._evaluate(key, jobs)
+
+    def _run_sweeps(self):
+        while True:
+            try:
+                job = self._sweeps.get(timeout=0.2)
+            except queue.Empty:
+                if self._closed.is_set():
+                    return
+                continue
+            self._evaluate(job.key, [job])
+
+    def _evaluate(self, key: tuple, jobs: list):
+        jobs = [job for job in jobs if job.future.set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        now = time.perf_counter()
+        for job in jobs:
+            self._queue_wait.observe(now - job.queued)
+        try:
+            if jobs[0].X is None:
+                # Sweeps carry their own options and are evaluated one by one, off the batching threads
+                results = [self.evaluate_fn(key, None, job.options) for job in jobs]
+            else:
+                X = jobs[0].X if len(jobs) == 1 else np.concatenate([job.X for job in jobs])
+                columns = self.evaluate_fn(key, X)
+                bounds = np.cumsum([0] + [job.rows for job in jobs])
+                results = [{name: values[start:stop] for name, values in columns.items()}
+                           for start, stop in zip(bounds[:-1], bounds[1:])]
+        except Exception as exc:
+            self.failed += len(jobs)
+            for job in jobs:
+                job.future.set_exception(exc)
+            return
+        self.batches += 1
+        self.rows += sum(job.rows for job in jobs)
+        self._batch_rows.observe(sum(job.rows for job in jobs))
+        for job, result in zip(jobs, results):
+            job.future.set_result(result)
+
+    def close(self, timeout: float = None):
+        """Stops accepting jobs, finishes the queued ones and stops the threads."""
+        self._closed.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+# === [4] HTTP Server ===
+ROUTES = ("/damage", "/batch", "/ttk", "/sweep")
+
+
+def _response(result: dict, many: bool) -> dict:
+    if "totals" in result:
+        return result
+    if many:
+        return {name: np.asarray(values).tolist() for name, values in result.items()}
+    return {name: np.asarray(values)[0].item() for name, values in result.items()}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "CapybaraDamageAPI/1.0"
+    # Headers and body go out as two writes; with Nagle on, keep-alive clients stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def _send(self, status: int, body, headers: dict = None):
+        data = body if isinstance(body, bytes) else json.dumps(body, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json" if not isinstance(body, bytes) else CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+        route = self.path if self.path in ROUTES or self.path in ("/health", "/metrics") else "other"
+        self.server.requests.inc(route=route, status=status)
+        self.server.latency.observe(time.perf_counter() - self._started, route=route)
+
+    def do_GET(self):
+        self._started = time.perf_counter()
+        if self.path == "/metrics":
+            return self._send(200, self.server.metrics.render().encode("utf-8"))
+        if self.path != "/health":
+            return self._send(404, {"error": f"Unknown path: {self.path}"})
+        batcher = self.server.batcher
+        self._send(200, {
+            "status": "ok", "queue": batcher.depth, "sweep_queue": batcher.sweep_depth, "submitted": batcher.submitted, "rejected": batcher.rejected,
+            "batches": batcher.batches, "rows": batcher.rows, "failed": batcher.failed,
+        })
+
+    def do_POST(self):
+        self._started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > API_MAX_BODY:
+            # The unread body would desynchronize the connection, so it is closed
+            self.close_connection = True
+            return self._send(413, {"error": f"Request body above {API_MAX_BODY} bytes"})
+        body = self.rfile.read(length)
+        if self.path not in ROUTES:
+            return self._send(404, {"error": f"Unknown path: {self.path}"})
+        try:
+            key, X, many, options = parse_request(self.path, json.loads(body or b"{}"))
+        except (TypeError, ValueError) as e:
+            return self._send(400, {"error": str(e)})
+
+        try:
+            future = self.server.batcher.submit(key, X, options)
+        except QueueFull as e:
+            return self._send(503, {"error": str(e)}, {"Retry-After": "1"})
+        try:
+            result = future.result(timeout=API_TIMEOUT)
+        except FutureTimeout:
+            future.cancel()
+            return self._send(504, {"error": f"No result within {API_TIMEOUT:g}s"})
+        except Exception as e:
+            logger.exception("Evaluation failed for %s", self.path)
+            return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+        self._send(200, _response(result, many))
+
+    def log_message(self, format, *args):
+        # Per-request lines at thousands of requests a second go to debug, not stderr
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class DamageServer(ThreadingHTTPServer):
+    """Threaded HTTP server (one thread per connection) feeding one MicroBatcher."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address: tuple, batcher: MicroBatcher = None):
+        self.batcher = batcher or MicroBatcher()
+        self.metrics = self.batcher.metrics
+        self.requests = self.metrics.counter("api_requests_total", "Requests answered", ["route", "status"])
+        self.latency = self.metrics.histogram("api_request_seconds", "Time from request read to response", ["route"])
+        super().__init__(address, ApiHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, warm: bool = True) -> DamageServer:
+    """Starts a server in a background thread and returns it; call shutdown() and server_close() to stop."""
+    if warm:
+        warm_up()
+    server = DamageServer((host, port))
+    threading.Thread(target=server.serve_forever, name="api-server", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+    host = os.getenv("API_HOST", "127.0.0.1")
+    port = int(os.getenv("API_PORT", 8080))
+
+    warm_up()
+    with DamageServer((host, port)) as server:
+        logger.info("Damage API listening on http://%s:%d", host, port)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
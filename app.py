@@ -6,21 +6,62 @@ and houses the Gradio interface for interactive analysis.
 """
 
 import os
-import pandas as pd
+import logging
+import threading
+import matplotlib.pyplot as plt
 import gradio as gr
 
 # Import all the necessary components from your new modules
 from config.constants import *
 from config.scenarios import BASE_CONFIG
 
-from simulation.simulation import run_full_simulation
+from simulation.incremental import IncrementalSimulation
 from utils.analysis import (
-    plot_damage_analysis,
+    plot_damage_analysis, build_breakdown_table,
     plot_normalized_total_damage, plot_total_cumulative_damage
 )
 from utils.config_tools import (
     format_config_dict, format_config_diff, copy_s1_to_s2
 )
+from utils.arrow_export import write_results
+from utils.compact import result_footprint
+from utils.concurrency import canonical_scenario_hash, executor_from_env
+from utils.instrumentation import PROFILING_ENABLED, add_span_listener, collect, span, logger as profile_logger
+from utils.metrics import REGISTRY, start_metrics_dump, start_metrics_server
+
+# Heavy jobs run on a bounded pool; identical in-flight requests share one run
+EXECUTOR = executor_from_env()
+
+# Re-runs patch the previous result, recomputing only cells whose inputs changed
+INCREMENTAL = IncrementalSimulation()
+
+# Gradio's own limit is kept above MAX_HEAVY_JOBS so duplicate clicks can
+# reach the executor and be coalesced instead of waiting in Gradio's queue.
+QUEUE_CONCURRENCY = int(os.getenv("QUEUE_CONCURRENCY", 16))
+
+# pyplot keeps global state, so figure rendering is serialized across workers
+_RENDER_LOCK = threading.Lock()
+
+# Latest results are also written here as Arrow IPC files for notebooks, when set
+ARROW_EXPORT_DIR = os.getenv("ARROW_EXPORT_DIR")
+
+# Prometheus metrics on this port, and/or a JSON snapshot logged every N seconds, when set
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_DUMP_S = os.getenv("METRICS_DUMP_S")
+
+STAGE_SECONDS = REGISTRY.histogram("capybara_stage_seconds", "Wall time of each instrumented stage", ["stage"])
+FIGURES_RENDERED = REGISTRY.counter("capybara_figures_rendered_total", "Figures rendered", ["plot"])
+REGISTRY.gauge("capybara_jobs_inflight", "Distinct simulation jobs running or waiting", fn=lambda: EXECUTOR.inflight)
+REGISTRY.gauge("capybara_jobs_queued", "Simulation jobs waiting for a heavy-job slot", fn=lambda: EXECUTOR.queued)
+REGISTRY.counter("capybara_jobs_total", "Simulation job submissions by outcome", ["outcome"], fn=lambda: {
+    ("submitted",): EXECUTOR.submitted, ("coalesced",): EXECUTOR.coalesced,
+    ("completed",): EXECUTOR.completed, ("failed",): EXECUTOR.failed,
+})
+REGISTRY.counter("capybara_incremental_runs_total", "Simulation runs by how much was recomputed", ["kind"], fn=lambda: {
+    ("full",): INCREMENTAL.full_runs, ("patched",): INCREMENTAL.patched_runs, ("reused",): INCREMENTAL.reused_runs,
+})
+REGISTRY.counter("capybara_incremental_patched_cells_total", "Adventurer levels recomputed by patched runs",
+                 fn=lambda: INCREMENTAL.patched_cells)
 
 # Create tabs for one scenario and return list of input components
 def create_scenario_tabs(scenario: dict):
@@ -47,44 +88,57 @@ def create_scenario_tabs(scenario: dict):
     return components
 
 
-def run_analysis_with_inputs(*args):
+def render_analysis(s1_values: dict, s2_values: dict, request_key: str = None):
+    """Runs the simulation and builds every plot and table for the UI."""
+    with collect() as spans:
+        with span("request"):
+            with span("simulation"):
+                df_skills, df_rounds = INCREMENTAL.run(s1_values, s2_values)
+
+            if ARROW_EXPORT_DIR:
+                with span("arrow_export"):
+                    write_results(ARROW_EXPORT_DIR, df_skills, df_rounds)
+
+            SCENARIO_NAME_MAP = {
+                "Scenario 1": "Scenario 1",
+                "Scenario 2": "Scenario 2",
+            }
+
+            # === Plots ===
+            with _RENDER_LOCK, span("plots"):
+                fig1 = plot_damage_analysis(df_skills, df_rounds, "gagarin", SCENARIO_NAME_MAP, "Gagarin Damage")
+                fig2 = plot_damage_analysis(df_skills, df_rounds, "leonardo", SCENARIO_NAME_MAP, "Leonardo Damage")
+                fig3 = plot_damage_analysis(df_skills, df_rounds, "dragon_girl", SCENARIO_NAME_MAP, "Dragon Girl Damage")
+                fig4 = plot_total_cumulative_damage(df_rounds, scenario_name_map=SCENARIO_NAME_MAP)
+                fig5 = plot_normalized_total_damage(df_rounds, scenario_name_map=SCENARIO_NAME_MAP)
+
+                # Figures stay renderable after close; this only drops pyplot's reference
+                for fig in (fig1, fig2, fig3, fig4, fig5):
+                    plt.close(fig)
+            for plot in ("gagarin", "leonardo", "dragon_girl", "total_cumulative", "normalized_total"):
+                FIGURES_RENDERED.inc(plot=plot)
+
+            # === DataTables ===
+            df_skills_clean = df_skills.drop(columns=["breakdowns"], errors="ignore")
+            with span("breakdowns"):
+                df_breakdowns = build_breakdown_table(df_skills)
+
+    df_diagnostics = spans.to_frame()
+    # Measured outside the request span; it compacts a copy of the result only to size it
+    df_memory = result_footprint(df_skills, df_rounds) if PROFILING_ENABLED else None
+    if PROFILING_ENABLED:
+        profile_logger.info(spans.to_log_line(event="analysis", request=request_key))
+
+    return fig1, fig2, fig3, fig4, fig5, df_skills_clean, df_breakdowns, df_diagnostics, df_memory
+
+async def run_analysis_with_inputs(*args):
     num_keys = len([k for _, keys in GROUP_SECTIONS for k in keys])
     s1_values = dict(zip([k for _, keys in GROUP_SECTIONS for k in keys], args[:num_keys]))
     s2_values = dict(zip([k for _, keys in GROUP_SECTIONS for k in keys], args[num_keys:]))
 
-    df_skills, df_rounds = run_full_simulation(s1_values, s2_values)
-
-    SCENARIO_NAME_MAP = {
-        "Scenario 1": "Scenario 1",
-        "Scenario 2": "Scenario 2",
-    }
-
-    # === Plots ===
-    fig1 = plot_damage_analysis(df_skills, df_rounds, "gagarin", SCENARIO_NAME_MAP, "Gagarin Damage")
-    fig2 = plot_damage_analysis(df_skills, df_rounds, "leonardo", SCENARIO_NAME_MAP, "Leonardo Damage")
-    fig3 = plot_damage_analysis(df_skills, df_rounds, "dragon_girl", SCENARIO_NAME_MAP, "Dragon Girl Damage")
-    fig4 = plot_total_cumulative_damage(df_rounds, scenario_name_map=SCENARIO_NAME_MAP)
-    fig5 = plot_normalized_total_damage(df_rounds, scenario_name_map=SCENARIO_NAME_MAP)
-
-    # === DataTables ===
-    df_skills_clean = df_skills.drop(columns=["breakdowns"], errors="ignore")
-
-    breakdown_rows = []
-    for _, row in df_skills.iterrows():
-        if isinstance(row.get("breakdowns"), dict):
-            for skill, breakdown in row["breakdowns"].items():
-                if breakdown:
-                    breakdown_dict = breakdown.as_dict()
-                    breakdown_dict.update({
-                        "Source": row["source"],
-                        "Scenario": row["scenario"],
-                        "Level": row["level"]
-                    })
-                    breakdown_rows.append(breakdown_dict)
-
-    df_breakdowns = pd.DataFrame(breakdown_rows)
-
-    return fig1, fig2, fig3, fig4, fig5, df_skills_clean, df_breakdowns
+    # Identical scenario pairs that are already running share one computation
+    key = canonical_scenario_hash(s1_values, s2_values)
+    return await EXECUTOR.run(key, render_analysis, s1_values, s2_values, request_key=key)
 
 def update_config_preview(*args):
     keys = [k for _, group in GROUP_SECTIONS for k in group]
@@ -177,21 +231,38 @@ with gr.Blocks() as demo:
     with gr.Tab("Detailed Coefficient Breakdown"):
         df_breakdown_view = gr.Dataframe(label="Per-Skill Breakdown", interactive=False)
 
+    # Only shown when the app is started with PROFILE=true
+    with gr.Tab("Diagnostics", visible=PROFILING_ENABLED):
+        df_diagnostics_view = gr.Dataframe(label="Request Timing (inclusive, ms)", interactive=False)
+        df_memory_view = gr.Dataframe(label="Result Memory (as returned and compact)", interactive=False)
+
 
     run_btn.click(
         fn=run_analysis_with_inputs,
         inputs=s1_inputs + s2_inputs,
-        outputs=[fig1, fig2, fig3, fig4, fig5, df_skills_view, df_breakdown_view]
+        outputs=[fig1, fig2, fig3, fig4, fig5, df_skills_view, df_breakdown_view, df_diagnostics_view, df_memory_view],
+        concurrency_limit=QUEUE_CONCURRENCY,
     )
 
+    demo.queue(default_concurrency_limit=QUEUE_CONCURRENCY)
+
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
     # Optional environment variables to control behavior
     use_share = os.getenv("SHARE", "false").lower() == "true"
     use_auth = os.getenv("AUTH", "false").lower() == "true"
     port = int(os.getenv("PORT", 7860))
     inbrowser = os.getenv("INBROWSER", "false").lower() == "true"
 
+    if METRICS_PORT or METRICS_DUMP_S:
+        add_span_listener(lambda name, duration: STAGE_SECONDS.observe(duration, stage=name))
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+    if METRICS_DUMP_S:
+        start_metrics_dump(float(METRICS_DUMP_S))
+
     launch_kwargs = {
         "share": use_share,
         "inbrowser": inbrowser,
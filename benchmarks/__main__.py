@@ -0,0 +1,153 @@
+# benchmarks/__main__.py
+
+"""
+Command line entry point for the benchmark suite.
+
+    python -m benchmarks run --output benchmarks/baselines/baseline.json
+    python -m benchmarks run --compare benchmarks/baselines/baseline.json
+    python -m benchmarks compare baseline.json current.json --threshold 0.15
+    python -m benchmarks load --target app --concurrency 8 --duration 120 --think 2
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks.suite import BENCHMARKS, run_benchmarks, compare_results
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "baselines", "baseline.json")
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _missing_baseline(path: str) -> bool:
+    if os.path.exists(path):
+        return False
+    print(f"No baseline at {path}; record one with `make bench-baseline` "
+          f"(python -m benchmarks run --output {path}).")
+    return True
+
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def _save(path: str, results: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    payload = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f}{unit}"
+    return f"{seconds / 1e-9:.1f}ns"
+
+
+def _print_comparison(rows: list, threshold: float) -> bool:
+    regressed = False
+    print(f"{'benchmark':<48} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        regressed |= row["regressed"]
+        print(
+            f"{row['name']:<48} {_format_seconds(row['baseline_s']):>12} "
+            f"{_format_seconds(row['current_s']):>12} {row['ratio']:>7.2f}x{flag}"
+        )
+    if regressed:
+        print(f"\nRegressions beyond {threshold:.0%} detected.")
+    return regressed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="Run the benchmark suite")
+    run_p.add_argument("-k", "--filter", action="append", help="Only run cases whose name contains this text")
+    run_p.add_argument("--repeat", type=int, default=5)
+    run_p.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timing sample")
+    run_p.add_argument("--output", help="Write results as a JSON baseline to this path")
+    run_p.add_argument("--compare", help="Compare against this JSON baseline after running")
+    run_p.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown before flagging")
+
+    cmp_p = sub.add_parser("compare", help="Compare two JSON result files")
+    cmp_p.add_argument("baseline", nargs="?", default=DEFAULT_BASELINE)
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--threshold", type=float, default=0.15)
+
+    sub.add_parser("list", help="List the registered benchmark cases")
+
+    load_p = sub.add_parser("load", help="Drive the app or the API with concurrent virtual users")
+    load_p.add_argument("--target", choices=["app", "api"], default="app")
+    load_p.add_argument("--url", help="Use a server already running here instead of launching one")
+    load_p.add_argument("--pid", type=int, help="Process ID of the --url server, to sample its memory")
+    load_p.add_argument("--port", type=int, help="Port for the launched server (a free one by default)")
+    load_p.add_argument("--concurrency", type=int, default=4, help="Virtual users")
+    load_p.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    load_p.add_argument("--think", type=float, default=1.0, help="Mean think time between requests, in seconds")
+    load_p.add_argument("--mix", help='Operation weights, e.g. "run=1,preview=5" or "damage=8,batch=1,ttk=1"')
+    load_p.add_argument("--scenarios", type=int, default=20, help="Distinct scenarios requests are drawn from")
+    load_p.add_argument("--sample", type=float, default=1.0, help="Seconds between server memory samples")
+    load_p.add_argument("--seed", type=int, default=0)
+    load_p.add_argument("--output", help="Write the report, with memory samples, as JSON to this path")
+    load_p.add_argument("--fail-on-error", action="store_true", help="Exit with 1 if any request failed")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, case in BENCHMARKS.items():
+            print(f"{case.group:<12} {name}")
+        return 0
+
+    if args.command == "load":
+        from benchmarks.load import main as load_main
+        return load_main(args)
+
+    if args.command == "compare":
+        if _missing_baseline(args.baseline):
+            return 1
+        rows = compare_results(_load(args.baseline), _load(args.current), args.threshold)
+        return 1 if _print_comparison(rows, args.threshold) else 0
+
+    def progress(name, result):
+        print(f"{name:<48} {_format_seconds(result['median_s']):>12}  (x{result['number']})", flush=True)
+
+    results = run_benchmarks(args.filter, repeat=args.repeat, min_time=args.min_time, progress=progress)
+    if args.output:
+        _save(args.output, results)
+        print(f"\nSaved {len(results)} results to {args.output}")
+    if args.compare:
+        print()
+        if _missing_baseline(args.compare):
+            return 0
+        rows = compare_results(_load(args.compare), results, args.threshold)
+        return 1 if _print_comparison(rows, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
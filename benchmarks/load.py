@@ -0,0 +1,330 @@
+# benchmarks/load.py
+
+"""
+Load generator for the Gradio app and the damage API. Virtual users run
+concurrently against a locally launched server (or one already running),
+each drawing operations from a weighted mix and pausing for an exponential
+think time between them:
+
+    app     run      run_analysis_with_inputs, through gradio_client
+            preview  update_config_preview
+    api     damage, batch, ttk   POST to api.py over keep-alive connections
+
+Scenarios are drawn from a fixed pool, so a small pool exercises request
+coalescing and the incremental cache while a large one mostly misses.
+The report gives p50/p95/p99 latency and throughput per operation, and
+the server's resident memory sampled over the run. Nothing leaves the box.
+"""
+
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmarks.suite import make_config_batch, ui_values
+from config.scenarios import BASE_CONFIG
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIXES = {"app": "run=1,preview=5", "api": "damage=8,batch=1,ttk=1"}
+# Seconds to wait for a launched server to answer
+LAUNCH_TIMEOUT = 180
+# Builds per /batch request
+API_BATCH = 100
+
+
+# === [1] Scenario Mixes ===
+def parse_mix(text: str, operations: tuple) -> dict:
+    """{operation: weight} from "run=1,preview=5"."""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in operations:
+            raise ValueError(f"Unknown operation {name!r}; expected one of {list(operations)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The operation mix needs a positive weight")
+    return mix
+
+
+def scenario_pool(size: int, seed: int = 0) -> list:
+    """`size` configs: the base config and builds scattered around the heavy one."""
+    return [dict(BASE_CONFIG)] + make_config_batch(max(size - 1, 0), seed=seed)
+
+
+# === [2] Targets ===
+class AppTarget:
+    """The Gradio app, driven through gradio_client like the browser drives it."""
+
+    operations = ("run", "preview")
+    endpoints = {"run": "/run_analysis_with_inputs", "preview": "/update_config_preview"}
+
+    def __init__(self, url: str, pool: list):
+        self.url = url
+        self.pool = [list(ui_values(config).values()) for config in pool]
+
+    def session(self):
+        from gradio_client import Client
+        return Client(self.url, verbose=False)
+
+    def call(self, client, operation: str, rng: random.Random):
+        args = rng.choice(self.pool) + rng.choice(self.pool)
+        client.predict(*args, api_name=self.endpoints[operation])
+
+
+class ApiTarget:
+    """api.py, one keep-alive connection per virtual user."""
+
+    operations = ("damage", "batch", "ttk")
+
+    def __init__(self, url: str, pool: list):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname, parsed.port)
+        self.pool = pool
+        from simulation.adventurers import ADVENTURER_LEVELS
+        self.levels = [(source, level) for source, levels in ADVENTURER_LEVELS.items() for level in levels]
+
+    def session(self):
+        return http.client.HTTPConnection(*self.address)
+
+    def call(self, conn, operation: str, rng: random.Random):
+        source, level = rng.choice(self.levels)
+        body = {"source": source, "level": level}
+        if operation == "batch":
+            body["configs"] = rng.sample(self.pool, min(API_BATCH, len(self.pool)))
+        else:
+            body["config"] = rng.choice(self.pool)
+        conn.request("POST", "/batch" if operation == "batch" else f"/{operation}", json.dumps(body),
+                     {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}: {data[:200].decode(errors='replace')}")
+
+
+TARGETS = {"app": AppTarget, "api": ApiTarget}
+
+
+# === [3] Local Servers ===
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _ready(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=10):
+            return True
+    except OSError:
+        return False
+
+
+def _logged(path: str, marker: str) -> bool:
+    with open(path, errors="replace") as f:
+        return marker in f.read()
+
+
+def launch(target: str, port: int = None) -> tuple:
+    """Starts app.py or api.py on a free local port. Returns (process, url, log path)."""
+    port = port or free_port()
+    env = {**os.environ, "MPLBACKEND": "Agg", "GRADIO_ANALYTICS_ENABLED": "False"}
+    if target == "app":
+        env.update(PORT=str(port), SHARE="false", INBROWSER="false", AUTH="false")
+        # Gradio checks its own page right after binding and gives up when that is slow, so the probe
+        # is a cheap route and users start only once Gradio has printed the line following that check
+        script, url, marker = "app.py", f"http://127.0.0.1:{port}/", "share=True"
+        probe = f"{url}config"
+    else:
+        env.update(API_HOST="127.0.0.1", API_PORT=str(port))
+        script, url, marker = "api.py", f"http://127.0.0.1:{port}", None
+        probe = f"{url}/health"
+    log = tempfile.NamedTemporaryFile(prefix=f"load-{target}-", suffix=".log", delete=False)
+    process = subprocess.Popen([sys.executable, script], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + LAUNCH_TIMEOUT
+    while not (_ready(probe) and (marker is None or _logged(log.name, marker))):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            with open(log.name, errors="replace") as f:
+                tail = f.read()[-2000:]
+            raise RuntimeError(f"{script} did not come up on port {port}:\n{tail}")
+        time.sleep(1)
+    return process, url, log.name
+
+
+def rss_mb(pid: int):
+    """Resident memory of a process in MB, read from /proc; None where that is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+# === [4] Runner ===
+@dataclass
+class LoadResult:
+    target: str
+    concurrency: int
+    think_s: float
+    mix: dict
+    duration_s: float = 0.0
+    # (start offset s, operation, latency s, error or None) per request
+    requests: list = field(default_factory=list)
+    # (offset s, server RSS MB) samples
+    memory: list = field(default_factory=list)
+
+    def summary(self) -> list:
+        """Per operation, then overall: requests, errors, throughput and latency percentiles."""
+        rows = []
+        for operation in list(self.mix) + [None]:
+            chosen = [r for r in self.requests if operation is None or r[1] == operation]
+            latencies = np.array([r[2] for r in chosen if r[3] is None]) * 1e3
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+            rows.append({
+                "operation": operation or "all", "requests": len(chosen),
+                "errors": sum(r[3] is not None for r in chosen),
+                "rps": len(chosen) / self.duration_s if self.duration_s else 0.0,
+                "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+            })
+        return rows
+
+    def memory_summary(self) -> dict:
+        """Server RSS at start, end and peak, and its growth over the run (MB and MB/min by linear fit)."""
+        if not self.memory:
+            return {}
+        t, mb = np.array(self.memory).T
+        slope = float(np.polyfit(t, mb, 1)[0]) * 60 if len(t) > 1 and np.ptp(t) > 0 else 0.0
+        return {"start_mb": float(mb[0]), "end_mb": float(mb[-1]), "peak_mb": float(mb.max()),
+                "growth_mb": float(mb[-1] - mb[0]), "growth_mb_per_min": slope}
+
+    def errors(self, limit: int = 5) -> list:
+        seen = []
+        for request in self.requests:
+            if request[3] is not None and request[3] not in seen:
+                seen.append(request[3])
+        return seen[:limit]
+
+    def to_dict(self) -> dict:
+        return {
+            "target": self.target, "concurrency": self.concurrency, "think_s": self.think_s, "mix": self.mix,
+            "duration_s": self.duration_s, "summary": self.summary(), "memory": self.memory_summary(),
+            "memory_samples": self.memory, "errors": self.errors(),
+        }
+
+
+def run_load(target, concurrency: int, duration_s: float, think_s: float, mix: dict, name: str = "",
+             pid: int = None, sample_s: float = 1.0, seed: int = 0) -> LoadResult:
+    """
+    Runs `concurrency` virtual users against `target` for `duration_s`
+    seconds. Requests still in flight at the deadline are waited for and
+    counted. Server memory is sampled every `sample_s` seconds when `pid`
+    is given.
+    """
+    result = LoadResult(target=name, concurrency=concurrency, think_s=think_s, mix=mix)
+    operations, weights = list(mix), list(mix.values())
+    sessions = [target.session() for _ in range(concurrency)]
+    lock = threading.Lock()
+    done = threading.Event()
+    started = time.perf_counter()
+    deadline = started + duration_s
+
+    def user(index: int):
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            begin = time.perf_counter()
+            try:
+                target.call(sessions[index], operation, rng)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"[:300]
+            with lock:
+                result.requests.append((begin - started, operation, time.perf_counter() - begin, error))
+            if think_s > 0:
+                time.sleep(min(rng.expovariate(1 / think_s), max(deadline - time.perf_counter(), 0)))
+
+    def sampler():
+        while True:
+            mb = rss_mb(pid)
+            if mb is not None:
+                result.memory.append((time.perf_counter() - started, mb))
+            if done.wait(sample_s):
+                return
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(concurrency)]
+    monitor = threading.Thread(target=sampler, daemon=True) if pid else None
+    for thread in threads + ([monitor] if monitor else []):
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.duration_s = time.perf_counter() - started
+    done.set()
+    if monitor:
+        monitor.join()
+    for session in sessions:
+        close = getattr(session, "close", None)
+        if close:
+            close()
+    return result
+
+
+def format_report(result: LoadResult) -> str:
+    lines = [f"{result.target}: {result.concurrency} users, think {result.think_s:g}s, {result.duration_s:.1f}s",
+             f"{'operation':<12} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"]
+    for row in result.summary():
+        lines.append(f"{row['operation']:<12} {row['requests']:>9} {row['errors']:>7} {row['rps']:>9.2f} "
+                     f"{row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} {row['p99_ms']:>10.1f}")
+    memory = result.memory_summary()
+    if memory:
+        lines.append(f"server RSS: {memory['start_mb']:.0f} -> {memory['end_mb']:.0f} MB "
+                     f"(peak {memory['peak_mb']:.0f}, growth {memory['growth_mb']:+.1f} MB, "
+                     f"{memory['growth_mb_per_min']:+.2f} MB/min)")
+    for error in result.errors():
+        lines.append(f"error: {error}")
+    return "\n".join(lines)
+
+
+def main(args) -> int:
+    """Entry point of `python -m benchmarks load`."""
+    target_cls = TARGETS[args.target]
+    mix = parse_mix(args.mix or DEFAULT_MIXES[args.target], target_cls.operations)
+    process = None
+    if args.url:
+        url, pid = args.url, args.pid
+    else:
+        process, url, log = launch(args.target, args.port)
+        pid = process.pid
+        print(f"Launched {args.target} at {url} (pid {pid}, log {log})", flush=True)
+    try:
+        target = target_cls(url, scenario_pool(args.scenarios, args.seed))
+        result = run_load(target, args.concurrency, args.duration, args.think, mix, name=args.target,
+                          pid=pid, sample_s=args.sample, seed=args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    print(format_report(result))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result.to_dict(), f, indent=2)
+        print(f"\nSaved load report to {args.output}")
+    return 1 if any(request[3] for request in result.requests) and args.fail_on_error else 0
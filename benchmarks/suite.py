@@ -0,0 +1,537 @@
+# benchmarks/suite.py
+
+"""
+Benchmark cases for the simulator. Each case is registered with a setup
+function that prepares fixed, representative inputs and returns the
+zero-argument callable to be timed. Setups holding processes, threads or
+servers return (callable, cleanup) instead; cleanup runs once the case is
+timed, so nothing it started lingers into the cases after it.
+"""
+
+import asyncio
+import random
+import statistics
+import time
+from dataclasses import dataclass
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from config.constants import *
+from config.scenarios import BASE_CONFIG, apply_scenario_config
+
+# === [1] Fixed Inputs ===
+# A late-game build that exercises every shared skill and most modifiers
+HEAVY_OVERRIDES = {
+    P_ATK: 25_000_000, P_ATK_pct: 5200, P_Global_ATK_pct: 410,
+    Crit_Chance_pct: 65, Skill_Crit_Chance_pct: 20, Weapon_Crit_Chance_pct: 15, Crit_DMG_pct: 900,
+    Skill_DMG_pct: 320, Physical_DMG_pct: 140, Dagger_DMG_pct: 180, Bolt_DMG_pct: 90,
+    Chi_DMG_pct: 75, Fire_DMG_pct: 60, Lightning_DMG_pct: 110, Poison_DMG_pct: 40, Burn_DMG_pct: 55,
+    Global_Skill_DMG_pct: 45, Global_Dagger_DMG_pct: 30, Global_Bolt_DMG_pct: 25, Global_DMG_pct: 20,
+    Bonus_Dagger_Coef: 0.25, Bonus_Bolt_Coef: 0.15, Bonus_Chi_Coef: 0.1,
+    Num_Daggers: 14, Num_Bolts: 6, Num_Death_Bolts: 2, Num_Chi_Hits: 4, Num_Icy_Spikes: 3,
+    Num_Poisons: 2, Num_Burns: 2, Num_Light_Spears: 3, Num_Counter_Attacks: 2, Num_Ninjutsu_Skills: 2,
+}
+HEAVY_CONFIG = apply_scenario_config(BASE_CONFIG, HEAVY_OVERRIDES)
+
+BATCH_SIZE = 1000
+
+
+def make_config_batch(size: int = BATCH_SIZE, seed: int = 42) -> list:
+    """Builds a reproducible batch of configs scattered around HEAVY_CONFIG."""
+    rng = random.Random(seed)
+    batch = []
+    for _ in range(size):
+        cfg = dict(HEAVY_CONFIG)
+        for key, value in HEAVY_OVERRIDES.items():
+            cfg[key] = value * rng.uniform(0.5, 1.5)
+        batch.append(cfg)
+    return batch
+
+
+def ui_values(config: dict) -> dict:
+    """Restricts a config to the keys exposed as inputs in the UI."""
+    return {k: config.get(k, 0) for _, keys in GROUP_SECTIONS for k in keys}
+
+
+# === [2] Registry ===
+@dataclass
+class BenchmarkCase:
+    name: str
+    group: str
+    setup: callable
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str, group: str):
+    """Registers a setup function returning the callable to time, or (callable, cleanup)."""
+    def decorator(setup):
+        BENCHMARKS[name] = BenchmarkCase(name=name, group=group, setup=setup)
+        return setup
+    return decorator
+
+
+# === [3] Engine ===
+@benchmark("engine.calculate_final_atk", "engine")
+def _bench_final_atk():
+    from simulation.engine import calculate_final_atk
+    return lambda: calculate_final_atk(BASE_CONFIG)
+
+@benchmark("engine.compute_all_damage.base", "engine")
+def _bench_all_damage_base():
+    from simulation.engine import compute_all_damage
+    return lambda: compute_all_damage(BASE_CONFIG)
+
+@benchmark("engine.compute_all_damage.heavy", "engine")
+def _bench_all_damage_heavy():
+    from simulation.engine import compute_all_damage
+    return lambda: compute_all_damage(HEAVY_CONFIG)
+
+@benchmark("engine.compute_all_damage.batch", "engine")
+def _bench_all_damage_batch():
+    from simulation.engine import compute_all_damage
+    batch = make_config_batch()
+    return lambda: [compute_all_damage(cfg) for cfg in batch]
+
+
+# === [4] Adventurers ===
+@benchmark("adventurers.gagarin_damage", "adventurers")
+def _bench_gagarin_damage():
+    from simulation.adventurers import gagarin_damage
+    return lambda: gagarin_damage(10, HEAVY_CONFIG)
+
+@benchmark("adventurers.leo_damage", "adventurers")
+def _bench_leo_damage():
+    from simulation.adventurers import leo_damage
+    return lambda: leo_damage(10, HEAVY_CONFIG)
+
+@benchmark("adventurers.dg_damage", "adventurers")
+def _bench_dg_damage():
+    from simulation.adventurers import dg_damage
+    return lambda: dg_damage(10, HEAVY_CONFIG)
+
+@benchmark("adventurers.batch", "adventurers")
+def _bench_adventurers_batch():
+    from simulation.adventurers import gagarin_damage, leo_damage, dg_damage
+    batch = make_config_batch()
+
+    def run():
+        for cfg in batch:
+            gagarin_damage(10, cfg)
+            leo_damage(10, cfg)
+            dg_damage(10, cfg)
+    return run
+
+@benchmark("adventurers.run_gagarin_scenario", "adventurers")
+def _bench_run_gagarin():
+    from simulation.adventurers import run_gagarin_scenario
+    return lambda: run_gagarin_scenario(HEAVY_CONFIG, "Scenario 1")
+
+@benchmark("adventurers.run_leo_scenario", "adventurers")
+def _bench_run_leo():
+    from simulation.adventurers import run_leo_scenario
+    return lambda: run_leo_scenario(HEAVY_CONFIG, "Scenario 1")
+
+@benchmark("adventurers.run_dragon_girl_scenario", "adventurers")
+def _bench_run_dragon_girl():
+    from simulation.adventurers import run_dragon_girl_scenario
+    return lambda: run_dragon_girl_scenario(HEAVY_CONFIG, "Scenario 1")
+
+
+# === [5] Simulation ===
+@benchmark("simulation.run_full_simulation", "simulation")
+def _bench_full_simulation():
+    from simulation.simulation import run_full_simulation
+    return lambda: run_full_simulation(BASE_CONFIG, HEAVY_CONFIG)
+
+@benchmark("simulation.incremental_patch", "simulation")
+def _bench_incremental_patch():
+    from simulation.incremental import IncrementalSimulation
+    incremental = IncrementalSimulation()
+    incremental.run(BASE_CONFIG, HEAVY_CONFIG)
+    changed = dict(HEAVY_CONFIG)
+    state = {"value": 0}
+
+    def run():
+        state["value"] = (state["value"] + 1) % 100
+        changed[Bolt_DMG_pct] = state["value"]
+        incremental.run(BASE_CONFIG, changed)
+    return run
+
+
+@benchmark("instrumentation.span", "simulation")
+def _bench_instrumentation_span():
+    # Measures the per-span cost in the current PROFILE mode (near zero when off)
+    from utils.instrumentation import span
+
+    def run():
+        with span("benchmark"):
+            pass
+    return run
+
+
+# === [6] Batch Engine and Timeline ===
+@benchmark("batch.adventurers", "batch")
+def _bench_batch_adventurers():
+    from simulation.batch import configs_to_matrix, adventurer_damage_batch
+    X = configs_to_matrix(make_config_batch())
+
+    def run():
+        for source in ("gagarin", "leonardo", "dragon_girl"):
+            adventurer_damage_batch(source, X, 10)
+    return run
+
+@benchmark("batch.dg_stack_sweep", "batch")
+def _bench_dg_stack_sweep():
+    # 1000 builds x 0-50 flame stacks in one call
+    import numpy as np
+    from simulation.batch import configs_to_matrix, dg_stack_sweep_batch
+    X = configs_to_matrix(make_config_batch())
+    return lambda: dg_stack_sweep_batch(X, 10, np.arange(51))
+
+@benchmark("timeline.scenario_level", "batch")
+def _bench_timeline_scenario_level():
+    # One level of the UI path: a single build over the standard fight length
+    from simulation.adventurers import leo_damage, adventurer_timeline
+    dmg = leo_damage(10, HEAVY_CONFIG)
+    return lambda: adventurer_timeline("leonardo", dmg, HEAVY_CONFIG, 10)
+
+@benchmark("timeline.builds_1000_rounds_1000", "batch")
+def _bench_timeline_long_fight():
+    from simulation.batch import configs_to_matrix, adventurer_damage_batch, adventurer_timeline_batch
+    X = configs_to_matrix(make_config_batch())
+    dmg = adventurer_damage_batch("gagarin", X, 10)
+    return lambda: adventurer_timeline_batch("gagarin", X, 10, rounds=1000, dmg=dmg)
+
+@benchmark("ttk.kill_rounds.paired_10000", "batch")
+def _bench_kill_rounds_paired():
+    # One enemy HP per build, the common "which round does it die" query
+    import numpy as np
+    from simulation.batch import configs_to_matrix
+    from simulation.ttk import kill_rounds_batch
+    X = configs_to_matrix(make_config_batch(10_000))
+    hp = np.random.default_rng(42).uniform(1e11, 1e14, size=(len(X), 1))
+    return lambda: kill_rounds_batch("leonardo", X, 10, hp)
+
+@benchmark("ttk.kill_rounds.grid_1000x20", "batch")
+def _bench_kill_rounds_grid():
+    import numpy as np
+    from simulation.batch import configs_to_matrix
+    from simulation.ttk import kill_rounds_batch
+    X = configs_to_matrix(make_config_batch())
+    return lambda: kill_rounds_batch("gagarin", X, 10, np.logspace(11, 14, 20))
+
+@benchmark("hp_axis.roster_1000x50", "batch")
+def _bench_hp_roster():
+    # Whole-fight damage of 1000 builds against 50 bosses
+    import numpy as np
+    from simulation.batch import configs_to_matrix, adventurer_hp_curve
+    X = configs_to_matrix(make_config_batch())
+    roster = np.logspace(9, 14, 50)
+    return lambda: adventurer_hp_curve("dragon_girl", X, 10).totals(roster)
+
+@benchmark("frontier.pareto_mask_1m_x9", "batch")
+def _bench_pareto_mask():
+    # Non-dominated sort of 10^6 correlated builds over 9 (adventurer, level) objectives
+    import numpy as np
+    from optimize.frontier import pareto_mask
+    rng = np.random.default_rng(42)
+    F = rng.lognormal(size=(1_000_000, 1)) * rng.lognormal(sigma=0.2, size=(1_000_000, 9))
+    return lambda: pareto_mask(F)
+
+@benchmark("gear.best_loadout_8x6", "batch")
+def _bench_best_loadout():
+    # 8 slots of 6 items (1.7M loadouts) with two set bonuses
+    from optimize.gear import GearItem, best_loadout
+    rng = random.Random(42)
+    keys = list(HEAVY_OVERRIDES)
+    items = [
+        GearItem(f"slot{s}_{i}", f"slot{s}", {key: HEAVY_OVERRIDES[key] * rng.uniform(0.02, 0.1) for key in rng.sample(keys, 2)},
+                 rng.choice(["A", "B", None]))
+        for s in range(8) for i in range(6)
+    ]
+    sets = {"A": [(2, {Crit_DMG_pct: 80}), (4, {P_ATK_pct: 300})], "B": [(3, {Skill_DMG_pct: 150})]}
+    return lambda: best_loadout(HEAVY_CONFIG, items, "gagarin", 10, sets)
+
+@benchmark("rotation.optimize_10000", "batch")
+def _bench_optimize_rotation():
+    # Best counts of every skill under a 40-action round, for 10000 builds
+    from simulation.batch import configs_to_matrix
+    from optimize.rotation import optimize_rotation
+    X = configs_to_matrix(make_config_batch(10_000))
+    costs = {"rage": 5, "death_bolt": 3, "chi": 2}
+    return lambda: optimize_rotation(X, 40, costs, limits={"rage": 2})
+
+@benchmark("upgrades.plan_budget_400", "batch")
+def _bench_plan_upgrades():
+    # Five stat options and three level ladders for a three-adventurer team
+    from optimize.upgrades import Upgrade, plan_upgrades
+    upgrades = [
+        Upgrade("atk", 10, key=P_ATK_pct, amount=200, limit=20),
+        Upgrade("crit_dmg", 8, key=Crit_DMG_pct, amount=50, limit=20),
+        Upgrade("skill_dmg", 6, key=Skill_DMG_pct, amount=30, limit=20),
+        Upgrade("dagger", 12, key=Num_Daggers, amount=1, limit=5),
+        Upgrade("combo", 9, key=Num_Combos, amount=1, limit=5),
+    ] + [Upgrade(f"{source}_level", 0, source=source, step_costs=(15, 25, 40, 60, 90, 120))
+         for source in ("gagarin", "leonardo", "dragon_girl")]
+    levels = {"gagarin": 2, "leonardo": 0, "dragon_girl": 4}
+    return lambda: plan_upgrades(HEAVY_CONFIG, levels, upgrades, 400)
+
+@benchmark("team.evaluate_teams_1000", "batch")
+def _bench_evaluate_teams():
+    # Every team of 3 from every adventurer level (294 teams), for 1000 builds
+    from simulation.batch import configs_to_matrix
+    from simulation.team import evaluate_teams
+    X = configs_to_matrix(make_config_batch(1000))
+    return lambda: evaluate_teams(X)
+
+@benchmark("sweep.grid_1m_level_10", "batch")
+def _bench_grid_sweep():
+    # Crit_DMG_pct 0-1000 step 10 x Skill_DMG_pct 0-500 step 5 x 100 P_ATK_pct values, every adventurer at level 10
+    import numpy as np
+    from simulation.sweep import grid_sweep, sweep_range
+    axes = {Crit_DMG_pct: sweep_range(0, 1000, 10), Skill_DMG_pct: sweep_range(0, 500, 5),
+            P_ATK_pct: np.linspace(1000, 5000, 100)}
+    return lambda: grid_sweep(axes, base=HEAVY_CONFIG, levels=[10])
+
+@benchmark("sparse.fight_damage_100000", "batch")
+def _bench_sparse_fight_damage():
+    # 100 copies of the 1000-build batch stored sparse, evaluated chunk by chunk
+    import numpy as np
+    from simulation.batch import configs_to_matrix
+    from simulation.sparse import SparseConfigs, fight_damage_sparse
+    S = SparseConfigs.from_matrix(np.tile(configs_to_matrix(make_config_batch()), (100, 1)))
+    return lambda: fight_damage_sparse("leonardo", S, 10)
+
+@benchmark("archive.append_1000", "batch")
+def _bench_archive_append():
+    # Every level of every adventurer for 1000 builds, written to a fresh archive
+    import tempfile
+    from simulation.batch import configs_to_matrix
+    from simulation.archive import ResultArchive
+    X = configs_to_matrix(make_config_batch())
+    def run():
+        with tempfile.TemporaryDirectory() as path:
+            ResultArchive.create(path).append(X)
+    return run
+
+@benchmark("pool.startup", "batch")
+def _bench_pool_startup():
+    # Spawning one worker, importing the engine and warming every adventurer level
+    from simulation.pool import BatchPool
+    return lambda: BatchPool(1).close()
+
+@benchmark("pool.task_overhead_1_row", "batch")
+def _bench_pool_task_overhead():
+    # Round trip of a single-row task: the per-call cost on top of the evaluation
+    from simulation.batch import configs_to_matrix
+    from simulation.pool import BatchPool
+    pool = BatchPool(2)
+    X = configs_to_matrix([HEAVY_CONFIG])
+    return lambda: pool.fight_damage("gagarin", X, 10), pool.close
+
+@benchmark("pool.evaluate_100000x3", "batch")
+def _bench_pool_evaluate():
+    import numpy as np
+    from simulation.batch import configs_to_matrix
+    from simulation.pool import BatchPool
+    pool = BatchPool()
+    X = np.tile(configs_to_matrix(make_config_batch()), (100, 1))
+    return lambda: pool.evaluate(X, [("gagarin", 10), ("leonardo", 10), ("dragon_girl", 10)]), pool.close
+
+@benchmark("compact.results_10000_scenarios", "batch")
+def _bench_compact_results():
+    # The two-scenario result relabeled as 10000 scenarios: 200k skill and 2.35M round rows
+    import pandas as pd
+    from simulation.simulation import run_full_simulation
+    from utils.compact import compact_results
+    df_skills, df_rounds = run_full_simulation(BASE_CONFIG, HEAVY_CONFIG)
+    copies = 5000
+
+    def relabel(frame):
+        frame = pd.concat([frame] * copies, ignore_index=True)
+        copy = pd.Series(range(len(frame))) // (len(frame) // copies)
+        frame["scenario"] = frame["scenario"].str.slice(-1) + "/" + copy.astype(str)
+        return frame
+    df_skills, df_rounds = relabel(df_skills), relabel(df_rounds)
+    return lambda: compact_results(df_skills, df_rounds, float32=True)
+
+@benchmark("api.damage_requests_1000x8", "batch")
+def _bench_api_requests():
+    # 1000 single-build requests over 8 keep-alive connections, micro-batched by the server
+    import http.client
+    import json
+    import threading
+    from api import serve
+    server = serve(port=0)
+    bodies = [json.dumps({"config": cfg, "source": "leonardo", "level": 10}) for cfg in make_config_batch()]
+
+    def client(offset):
+        conn = http.client.HTTPConnection(*server.server_address)
+        for body in bodies[offset::8]:
+            conn.request("POST", "/damage", body, {"Content-Type": "application/json"})
+            conn.getresponse().read()
+        conn.close()
+
+    def run():
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def cleanup():
+        server.shutdown()
+        server.server_close()
+    return run, cleanup
+
+@benchmark("inverse.min_atk_pct_for_kill", "batch")
+def _bench_min_stat_for_kill():
+    # Smallest P_ATK_pct killing by round 5, for 1000 builds
+    from simulation.batch import configs_to_matrix
+    from optimize.inverse import min_stat_for_kill
+    X = configs_to_matrix(make_config_batch())
+    return lambda: min_stat_for_kill("leonardo", X, 10, P_ATK_pct, 5)
+
+
+# === [7] Plots ===
+def _simulated_frames():
+    from simulation.simulation import run_full_simulation
+    return run_full_simulation(BASE_CONFIG, HEAVY_CONFIG)
+
+def _closing(plot):
+    # Plots are timed including figure creation; pyplot's reference is dropped after
+    def run():
+        plt.close(plot())
+    return run
+
+SCENARIO_NAME_MAP = {"Scenario 1": "Scenario 1", "Scenario 2": "Scenario 2"}
+
+@benchmark("plots.plot_damage_analysis", "plots")
+def _bench_plot_damage_analysis():
+    from utils.analysis import plot_damage_analysis
+    df_skills, df_rounds = _simulated_frames()
+    return _closing(lambda: plot_damage_analysis(df_skills, df_rounds, "gagarin", SCENARIO_NAME_MAP))
+
+@benchmark("plots.plot_total_cumulative_damage", "plots")
+def _bench_plot_total_cumulative():
+    from utils.analysis import plot_total_cumulative_damage
+    _, df_rounds = _simulated_frames()
+    return _closing(lambda: plot_total_cumulative_damage(df_rounds, SCENARIO_NAME_MAP))
+
+@benchmark("plots.plot_normalized_total_damage", "plots")
+def _bench_plot_normalized_total():
+    from utils.analysis import plot_normalized_total_damage
+    _, df_rounds = _simulated_frames()
+    return _closing(lambda: plot_normalized_total_damage(df_rounds.copy(), SCENARIO_NAME_MAP))
+
+@benchmark("plots.plot_damage_per_use", "plots")
+def _bench_plot_damage_per_use():
+    from utils.analysis import plot_damage_per_use
+    df_skills, _ = _simulated_frames()
+    return _closing(lambda: plot_damage_per_use(df_skills.copy(), SCENARIO_NAME_MAP))
+
+@benchmark("plots.plot_normalized_damage_per_use", "plots")
+def _bench_plot_normalized_per_use():
+    from utils.analysis import plot_normalized_damage_per_use
+    df_skills, _ = _simulated_frames()
+    return _closing(lambda: plot_normalized_damage_per_use(df_skills.copy(), SCENARIO_NAME_MAP))
+
+
+# === [8] End to End ===
+@benchmark("app.run_analysis_with_inputs", "app")
+def _bench_run_analysis():
+    import app
+    keys = [k for _, group in GROUP_SECTIONS for k in group]
+    s1, s2 = ui_values(BASE_CONFIG), ui_values(HEAVY_CONFIG)
+    args = [s1[k] for k in keys] + [s2[k] for k in keys]
+
+    def run():
+        # Cold path: drop the incremental state so every call simulates fully
+        app.INCREMENTAL.reset()
+        asyncio.run(app.run_analysis_with_inputs(*args))
+    return run
+
+@benchmark("app.metrics_stage_observe_x1000", "app")
+def _bench_metrics_observe():
+    # What the metrics span listener adds per stage: one labeled histogram observation
+    from utils.metrics import MetricsRegistry
+    histogram = MetricsRegistry().histogram("stage_seconds", "Stage wall time", ["stage"])
+
+    def run():
+        for _ in range(1000):
+            histogram.observe(0.0125, stage="simulation")
+    return run
+
+
+# === [9] Runner ===
+def time_case(fn, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """Times a callable, calibrating the inner loop like timeit.autorange."""
+    fn()  # warm-up
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 2 if elapsed * 2 >= min_time else 10
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(names=None, repeat: int = 5, min_time: float = 0.2, progress=None) -> dict:
+    """Runs the selected benchmark cases and returns their timing results."""
+    results = {}
+    for name, case in BENCHMARKS.items():
+        if names and not any(pattern in name for pattern in names):
+            continue
+        prepared = case.setup()
+        fn, cleanup = prepared if isinstance(prepared, tuple) else (prepared, None)
+        try:
+            results[name] = {"group": case.group, **time_case(fn, repeat=repeat, min_time=min_time)}
+        finally:
+            if cleanup:
+                cleanup()
+        if progress:
+            progress(name, results[name])
+    return results
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.15) -> list:
+    """
+    Compares median timings. Returns one row per shared case with the
+    current/baseline ratio and whether it regressed beyond `threshold`.
+    """
+    rows = []
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]["median_s"]
+        ratio = result["median_s"] / base if base else float("inf")
+        rows.append({
+            "name": name,
+            "baseline_s": base,
+            "current_s": result["median_s"],
+            "ratio": ratio,
+            "regressed": ratio > 1 + threshold,
+        })
+    return rows
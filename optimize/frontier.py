@@ -0,0 +1,140 @@
+# optimize/frontier.py
+
+"""
+Pareto frontier of builds across adventurers and levels: the builds that no
+other build beats on every (adventurer, level) objective at once, i.e. the
+candidates for some team composition.
+
+The non-dominated rows are found by a sort-filter sweep instead of
+comparing every pair. Rows are ordered by a score that can only drop along
+a dominance chain, so a row can only be dominated by rows ahead of it. The
+leading rows that survive among themselves are on the frontier, and every
+row they dominate is dropped at once; with correlated objectives a handful
+of passes clears millions of builds. Two objectives take a single
+O(n log n) sweep.
+"""
+
+import numpy as np
+import pandas as pd
+
+from simulation.adventurers import ADVENTURER_LEVELS
+from simulation.batch import configs_to_matrix
+from .inverse import damage_after_rounds
+
+# Leading rows checked for the frontier per pass
+PIVOTS = 32
+
+
+# === [1] Objectives ===
+def frontier_objectives(sources=None, levels=None) -> list:
+    """
+    (source, level) pairs to rank builds on. `levels` is a list applied to
+    every adventurer or a {source: levels} dict; None takes all levels.
+    """
+    objectives = []
+    for source in sources or ADVENTURER_LEVELS:
+        chosen = levels.get(source) if isinstance(levels, dict) else levels
+        objectives += [(source, level) for level in ADVENTURER_LEVELS[source] if chosen is None or level in chosen]
+    return objectives
+
+
+def objective_matrix(X: np.ndarray, objectives: list) -> np.ndarray:
+    """(N, D) fight damage of every build for each (source, level) objective."""
+    return np.column_stack([damage_after_rounds(source, X, level) for source, level in objectives])
+
+
+# === [2] Non-Dominated Sort ===
+def _dominated_by(columns: np.ndarray, pivots: np.ndarray) -> np.ndarray:
+    """Whether some pivot is >= a row everywhere and > somewhere, for rows given as (D, n) columns."""
+    out = np.zeros(columns.shape[1], dtype=bool)
+    for pivot in pivots:
+        ge = np.ones(columns.shape[1], dtype=bool)
+        gt = np.zeros(columns.shape[1], dtype=bool)
+        for values, bound in zip(columns, pivot):
+            ge &= values <= bound
+            gt |= values < bound
+        out |= ge & gt
+    return out
+
+
+def _sort_filter(points: np.ndarray, score: np.ndarray) -> np.ndarray:
+    """Non-dominated mask by pivot elimination, given a score no dominated row can exceed its dominator's."""
+    keep = np.zeros(len(points), dtype=bool)
+    index = np.argsort(-score, kind="stable")
+    columns, score = np.ascontiguousarray(points[index].T), score[index]
+    while len(index):
+        # Rows ahead can only be beaten by each other or by a tie, so ties join the head
+        size = min(PIVOTS, len(index))
+        size += np.searchsorted(-score[size:], -score[size - 1], side="right")
+        head = columns[:, :size]
+        winners = ~_dominated_by(head, head.T)
+        keep[index[:size][winners]] = True
+
+        # Drop every remaining row a new frontier row dominates
+        index, columns, score = index[size:], columns[:, size:], score[size:]
+        remain = ~_dominated_by(columns, head.T[winners])
+        index, columns, score = index[remain], columns[:, remain], score[remain]
+    return keep
+
+
+def _front_2d(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Non-dominated mask for two objectives: one sweep in descending order of a."""
+    order = np.argsort(-a, kind="stable")
+    a, b = a[order], b[order]
+    starts = np.nonzero(np.concatenate([[True], a[1:] != a[:-1]]))[0]
+    group = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(a))))
+    # Best b among rows with a strictly larger a, and the best b within the same a
+    best = np.maximum.reduceat(b, starts)
+    before = np.concatenate([[-np.inf], np.maximum.accumulate(best)[:-1]])
+    keep = np.empty(len(a), dtype=bool)
+    keep[order] = (b > before[group]) & (b == best[group])
+    return keep
+
+
+def pareto_mask(F: np.ndarray) -> np.ndarray:
+    """
+    Boolean mask of the rows of F (N, D) that no other row dominates, i.e.
+    is >= on every column and > on at least one (larger is better). NaN
+    counts as the worst value. Identical rows are kept or dropped together.
+    """
+    F = np.asarray(F, dtype=float)
+    if F.ndim == 1:
+        F = F[:, None]
+    if not len(F):
+        return np.zeros(0, dtype=bool)
+
+    # Non-finite values become finite ones of the same rank, which leaves dominance unchanged
+    finite = np.isfinite(F)
+    low = np.min(np.where(finite, F, np.inf), axis=0)
+    high = np.max(np.where(finite, F, -np.inf), axis=0)
+    low, high = np.where(np.isfinite(low), low, 0), np.where(np.isfinite(high), high, 0)
+    span = np.maximum(high - low, 1.0)
+    F = np.where(finite, F, np.where(F == np.inf, high + span, low - span))
+
+    if F.shape[1] == 1:
+        return F[:, 0] == F[:, 0].max()
+    if F.shape[1] == 2:
+        return _front_2d(F[:, 0], F[:, 1])
+    # Rounding is monotone, so a dominating row never scores lower than the row it dominates
+    scale = np.maximum(np.max(np.abs(F), axis=0), np.finfo(float).tiny)
+    return _sort_filter(F, (F / scale).sum(axis=1))
+
+
+# === [3] Frontier Table ===
+def pareto_frontier(configs, sources=None, levels=None) -> pd.DataFrame:
+    """
+    Builds on the Pareto frontier of fight damage over every selected
+    (adventurer, level), one row per build with its index in `configs` (a
+    list of config dicts or a config matrix) and one column per objective,
+    sorted by total normalized damage.
+    """
+    X = configs if isinstance(configs, np.ndarray) else configs_to_matrix(configs)
+    objectives = frontier_objectives(sources, levels)
+    F = objective_matrix(X, objectives)
+    rows = np.nonzero(pareto_mask(F))[0]
+
+    frame = pd.DataFrame(F[rows], columns=[f"{source}_L{level}" for source, level in objectives])
+    frame.insert(0, "build", rows)
+    scale = np.nanmax(np.abs(F), axis=0)
+    order = np.argsort(-(F[rows] / np.where(scale > 0, scale, 1)).sum(axis=1), kind="stable")
+    return frame.iloc[order].reset_index(drop=True)
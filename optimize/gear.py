@@ -0,0 +1,214 @@
+# optimize/gear.py
+
+"""
+Loadout search: picks one item per slot from a player's inventory (gear,
+relics, brands), plus any set bonuses, to maximize the fight damage of one
+adventurer level.
+
+Enumerating every combination explodes quickly, so the search leans on the
+fact that every stat only ever adds damage:
+- Within a slot, an item another item beats on every key (and set) is
+  dropped. Set bonuses may subtract, so a set item only displaces a
+  setless one when its set has no negative tier.
+- Filling the open slots of a partial loadout with an "ideal" item (the
+  per-key best of the slot) bounds every completion from above. Branches
+  whose bound cannot beat the best loadout found so far are cut.
+- A swap-by-swap local search provides that first loadout. Loadouts are
+  rows of a config matrix, so a swap is a delta added to a row and all
+  swaps of a slot are scored in one batch evaluation.
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from simulation.batch import BATCH_KEYS, KEY_INDEX, configs_to_matrix, matrix_to_configs
+from .inverse import damage_after_rounds
+
+# Partial loadouts expanded per batch evaluation
+BRANCH_CHUNK = 4096
+# Relative slack on bounds for floating point rounding
+BOUND_SLACK = 1e-12
+
+
+# === [1] Inventory ===
+@dataclass
+class GearItem:
+    """One piece of equipment: the slot it goes in, its stat deltas and the set it belongs to."""
+    name: str
+    slot: str
+    deltas: dict = field(default_factory=dict)
+    set_name: Optional[str] = None
+
+
+@dataclass
+class Loadout:
+    """Best loadout found: {slot: item}, its fight damage and the resulting config."""
+    items: dict
+    damage: float
+    config: dict
+    evaluated: int = 0
+
+
+def _delta_row(deltas: dict) -> np.ndarray:
+    row = np.zeros(len(BATCH_KEYS))
+    for key, value in deltas.items():
+        if key not in KEY_INDEX:
+            raise ValueError(f"Unknown config key in gear deltas: {key!r}")
+        row[KEY_INDEX[key]] += value
+    return row
+
+
+def prune_dominated(items: list, set_bonuses: dict = None) -> list:
+    """
+    Drops the items beaten within their slot by another item at least as
+    good on every key and in the same set. A setless item can also be beaten
+    by an item of a set whose tiers only add stats, since the extra piece
+    can then only help; a set with a negative tier delta is compared within
+    itself only. Of identical items only the first is kept.
+    """
+    rows = [_delta_row(item.deltas) for item in items]
+    gaining = {
+        item.set_name for item in items
+        if item.set_name and all(np.all(_delta_row(deltas) >= 0)
+                                 for _, deltas in (set_bonuses or {}).get(item.set_name, []))
+    }
+    kept = []
+    for i, item in enumerate(items):
+        beaten = False
+        for j, other in enumerate(items):
+            if i == j or other.slot != item.slot:
+                continue
+            if other.set_name != item.set_name and not (item.set_name is None and other.set_name in gaining):
+                continue
+            if np.all(rows[j] >= rows[i]) and (np.any(rows[j] > rows[i]) or other.set_name != item.set_name or j < i):
+                beaten = True
+                break
+        if not beaten:
+            kept.append(item)
+    return kept
+
+
+# === [2] Search ===
+class _Problem:
+    """Slot item deltas, set tiers and the objective for one search."""
+
+    def __init__(self, base_config: dict, items: list, source: str, level: int, set_bonuses: dict, rounds: int):
+        self.base = configs_to_matrix([base_config])[0]
+        self.source, self.level, self.rounds = source, level, rounds
+        self.slots = sorted({item.slot for item in items}, key=lambda s: -sum(item.slot == s for item in items))
+        self.items = [[item for item in items if item.slot == slot] for slot in self.slots]
+        self.deltas = [np.array([_delta_row(item.deltas) for item in slot_items]) for slot_items in self.items]
+
+        self.sets = sorted({item.set_name for item in items if item.set_name} | set(set_bonuses or {}))
+        self.set_of = [np.array([self.sets.index(item.set_name) if item.set_name else -1 for item in slot_items])
+                       for slot_items in self.items]
+        self.tiers = [(s, pieces, _delta_row(deltas)) for s, name in enumerate(self.sets)
+                      for pieces, deltas in (set_bonuses or {}).get(name, [])]
+
+        # Per-key best of each slot, summed over the slots from each depth on
+        ideal = [d.max(axis=0) for d in self.deltas] + [np.zeros(len(BATCH_KEYS))]
+        self.open_ideal = np.cumsum(ideal[::-1], axis=0)[::-1]
+        has_set = np.array([[np.any(set_of == s) for s in range(len(self.sets))] for set_of in self.set_of] +
+                           [np.zeros(len(self.sets), dtype=bool)]).reshape(len(self.slots) + 1, len(self.sets))
+        self.open_sets = np.cumsum(has_set[::-1], axis=0)[::-1]
+        self.evaluated = 0
+
+    def bonus(self, counts: np.ndarray, optimistic: bool = False) -> np.ndarray:
+        """Set bonus rows for piece counts (P, S); optimistic keeps only the gains of every reachable tier."""
+        out = np.zeros((len(counts), len(BATCH_KEYS)))
+        for s, pieces, row in self.tiers:
+            out += (counts[:, s] >= pieces)[:, None] * (np.maximum(row, 0) if optimistic else row)
+        return out
+
+    def score(self, rows: np.ndarray) -> np.ndarray:
+        self.evaluated += len(rows)
+        damage = damage_after_rounds(self.source, self.base + rows, self.level, self.rounds)
+        return np.where(np.isnan(damage), -np.inf, damage)
+
+    def counts(self, picks: np.ndarray) -> np.ndarray:
+        counts = np.zeros((len(picks), len(self.sets)))
+        for depth in range(picks.shape[1]):
+            owner = self.set_of[depth][picks[:, depth]]
+            has = owner >= 0
+            np.add.at(counts, (np.nonzero(has)[0], owner[has]), 1)
+        return counts
+
+    def evaluate(self, picks: np.ndarray) -> np.ndarray:
+        """Exact damage of complete loadouts, one row of item indices per loadout."""
+        rows = sum(self.deltas[depth][picks[:, depth]] for depth in range(len(self.slots)))
+        return self.score(rows + self.bonus(self.counts(picks)))
+
+
+def _local_search(problem: _Problem) -> tuple:
+    """Coordinate ascent from the best single items: swaps one slot at a time, every candidate swap in one batch."""
+    picks = np.array([[int(np.argmax(problem.score(d))) for d in problem.deltas]])
+    best = problem.evaluate(picks)[0]
+    improved = True
+    while improved:
+        improved = False
+        for depth, deltas in enumerate(problem.deltas):
+            trial = np.repeat(picks, len(deltas), axis=0)
+            trial[:, depth] = np.arange(len(deltas))
+            damage = problem.evaluate(trial)
+            i = int(np.argmax(damage))
+            if damage[i] > best:
+                picks, best, improved = trial[i:i + 1], damage[i], True
+    return picks[0], best
+
+
+def _branch(problem: _Problem, picks: np.ndarray, rows: np.ndarray, incumbent: list):
+    """Depth-first branch and bound over chunks of partial loadouts, best bound first."""
+    depth = picks.shape[1]
+    deltas = problem.deltas[depth]
+    picks = np.column_stack([np.repeat(picks, len(deltas), axis=0), np.tile(np.arange(len(deltas)), len(picks))])
+    rows = np.repeat(rows, len(deltas), axis=0) + np.tile(deltas, (len(rows), 1))
+    counts = problem.counts(picks)
+
+    if depth + 1 == len(problem.slots):
+        damage = problem.score(rows + problem.bonus(counts))
+        i = int(np.argmax(damage))
+        if damage[i] > incumbent[1]:
+            incumbent[:] = [picks[i], damage[i]]
+        return
+
+    reachable = counts + problem.open_sets[depth + 1]
+    bound = problem.score(rows + problem.open_ideal[depth + 1] + problem.bonus(reachable, optimistic=True))
+    alive = np.nonzero(bound * (1 + BOUND_SLACK) > incumbent[1])[0]
+    alive = alive[np.argsort(-bound[alive], kind="stable")]
+    step = max(1, BRANCH_CHUNK // len(problem.deltas[depth + 1]))
+    for start in range(0, len(alive), step):
+        chunk = alive[start:start + step]
+        # The incumbent may have improved since the bound was taken
+        chunk = chunk[bound[chunk] * (1 + BOUND_SLACK) > incumbent[1]]
+        if len(chunk):
+            _branch(problem, picks[chunk], rows[chunk], incumbent)
+
+
+def best_loadout(base_config: dict, items: list, source: str, level: int, set_bonuses: dict = None,
+                 rounds: int = None) -> Loadout:
+    """
+    Best one-item-per-slot loadout of `items` on top of `base_config` for
+    one adventurer level, by fight damage over `rounds` rounds (the
+    standard fight by default). `set_bonuses` maps a set name to its tiers,
+    [(pieces, deltas), ...], each applied once that many pieces are worn.
+    """
+    problem = _Problem(base_config, prune_dominated(items, set_bonuses), source, level, set_bonuses, rounds)
+    if not problem.slots:
+        damage = problem.score(np.zeros((1, len(BATCH_KEYS))))[0]
+        return Loadout(items={}, damage=float(damage), config=dict(base_config), evaluated=problem.evaluated)
+
+    incumbent = list(_local_search(problem))
+    _branch(problem, np.empty((1, 0), dtype=int), np.zeros((1, len(BATCH_KEYS))), incumbent)
+
+    picks = np.asarray(incumbent[0])
+    rows = sum(problem.deltas[depth][picks[depth]] for depth in range(len(problem.slots)))
+    rows = rows + problem.bonus(problem.counts(picks[None, :]))[0]
+    config = {**base_config, **matrix_to_configs((problem.base + rows)[None, :])[0]}
+    return Loadout(
+        items={slot: problem.items[depth][picks[depth]] for depth, slot in enumerate(problem.slots)},
+        damage=float(incumbent[1]),
+        config=config,
+        evaluated=problem.evaluated,
+    )
@@ -0,0 +1,219 @@
+# optimize/inverse.py
+
+"""
+Inverse solver: the smallest value of one config key with which a build
+reaches a damage target, or kills an enemy by a given round.
+
+Cumulative damage is monotone in each stat and, between breakpoints, a
+polynomial of low degree in any single key, because every hit is a product
+of factors that are affine in that key. The breakpoints are where a min()
+switches branch: the crit chance clamp at 100%, the HP caps of the
+adventurer formulas and the DoT stack caps. They are located first. The
+piece containing the target is then sampled at Chebyshev-Lobatto nodes,
+which pins down its polynomial exactly, and that polynomial is solved
+without further engine calls.
+"""
+
+import numpy as np
+
+from simulation.adventurers import ADVENTURER_HP_CAPS, ADVENTURER_ROUNDS, DOT_STACK_SKILLS, adventurer_schedule
+from simulation.batch import (
+    KEY_INDEX, column, configs_to_matrix, adventurer_damage_batch, adventurer_final_atk_batch,
+    adventurer_timeline_batch
+)
+from simulation.engine import DAMAGE_SKILLS, crit_chance_keys
+from config.constants import *
+
+# Highest degree of damage in a single key between two breakpoints
+PIECE_DEGREE = 6
+# Relative misfit above which a piece is bisected on the engine instead
+FIT_TOLERANCE = 1e-7
+# Key values are not searched beyond this
+MAX_VALUE = 1e18
+# Rows evaluated per engine call
+EVAL_CHUNK = 100_000
+
+_NODES = -np.cos(np.pi * np.arange(PIECE_DEGREE + 1) / PIECE_DEGREE)
+_VANDERMONDE_INV = np.linalg.inv(np.vander(_NODES, increasing=True))
+_CHECK_NODE = 0.377
+
+
+# === [1] Damage Evaluation ===
+def damage_after_rounds(source: str, X: np.ndarray, level: int, rounds: int = None,
+                        stacks=True, target_hp=None) -> np.ndarray:
+    """Cumulative damage of one adventurer level after `rounds` rounds, per build."""
+    rounds = rounds or ADVENTURER_ROUNDS[source]
+    out = np.empty(X.shape[0])
+    for start in range(0, X.shape[0], EVAL_CHUNK):
+        part = slice(start, start + EVAL_CHUNK)
+        hp = target_hp[part] if np.ndim(target_hp) else target_hp
+        dmg = adventurer_damage_batch(source, X[part], level, stacks, target_hp=hp)
+        timeline = adventurer_timeline_batch(source, X[part], level, rounds, dmg=dmg, per_skill=False)
+        out[part] = timeline.cumulative()[:, -1]
+    return out
+
+
+def _with_values(X: np.ndarray, key: str, values: np.ndarray) -> np.ndarray:
+    """Repeats each build once per value in its row of `values`, with `key` set to that value."""
+    Xv = np.repeat(X, values.shape[1], axis=0)
+    Xv[:, KEY_INDEX[key]] = values.ravel()
+    return Xv
+
+
+# === [2] Breakpoints ===
+def stat_breakpoints(source: str, X: np.ndarray, level: int, key: str, rounds: int = None,
+                     target_hp=None) -> np.ndarray:
+    """
+    Values of `key` at which the damage of one adventurer level changes
+    formula, as an (N, B) array (NaN where a breakpoint does not exist).
+    HP caps are taken against `target_hp`, each build's ENEMY_HP by default.
+    """
+    rounds = rounds or ADVENTURER_ROUNDS[source]
+    target_hp = column(X, ENEMY_HP) if target_hp is None else np.broadcast_to(target_hp, X.shape[:1])
+    points = []
+
+    # Crit chance clamped at 100%
+    crit_sets = {tuple(crit_chance_keys(skill)) for skill in DAMAGE_SKILLS}
+    for keys in crit_sets:
+        if key in keys:
+            others = sum(column(X, k) for k in keys if k != key)
+            points.append(100 - others)
+
+    # HP caps: min(fraction * hp, multiple * final ATK) switches where both sides are equal.
+    # Both are affine in any single key, so two evaluations locate the crossing.
+    for _, min_level, hp_key, fraction, multiple in ADVENTURER_HP_CAPS[source]:
+        if level < min_level:
+            continue
+        gaps = []
+        for value in (0.0, 1.0):
+            Xv = X.copy()
+            Xv[:, KEY_INDEX[key]] = value
+            hp = target_hp if hp_key == ENEMY_HP and key != ENEMY_HP else column(Xv, hp_key)
+            gaps.append(fraction * hp - multiple * adventurer_final_atk_batch(source, Xv, level))
+        slope = gaps[1] - gaps[0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            points.append(np.where(slope != 0, -gaps[0] / slope, np.nan))
+
+    # DoT stacks: min(cap, applications * t) switches once per round
+    scheduled = {event.skill for event in adventurer_schedule(source, level)}
+    t = np.arange(1, rounds + 1)
+    for skill, (count_key, cap_key) in DOT_STACK_SKILLS.items():
+        if skill not in scheduled:
+            continue
+        if key == count_key:
+            points.extend((column(X, cap_key)[:, None] / t).T)
+        elif key == cap_key:
+            points.extend((column(X, count_key)[:, None] * t).T)
+
+    if not points:
+        return np.empty((X.shape[0], 0))
+    return np.column_stack(points)
+
+
+# === [3] Solvers ===
+def _horner(coef: np.ndarray, x) -> np.ndarray:
+    result = np.zeros(coef.shape[0])
+    for i in range(coef.shape[1] - 1, -1, -1):
+        result = result * x + coef[:, i]
+    return result
+
+
+def _bisect(f, lo: np.ndarray, hi: np.ndarray, target: np.ndarray, iterations: int = 64) -> np.ndarray:
+    """Smallest x in [lo, hi] with f(x) >= target, for a nondecreasing f vectorized over rows."""
+    lo, hi = lo.copy(), hi.copy()
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        below = f(mid) < target
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+    return hi
+
+
+def min_stat_for_damage(source: str, X, level: int, key: str, target, rounds: int = None,
+                        lower: float = 0.0, upper: float = None, stacks=True, target_hp=None,
+                        integer: bool = False) -> np.ndarray:
+    """
+    Smallest value of `key`, per build, at which one adventurer level deals
+    at least `target` damage after `rounds` rounds (the standard fight by
+    default). Searched in [lower, upper]; without `upper` the bound grows
+    until the target is reached. NaN where it cannot be reached. With
+    `integer`, the smallest whole value is returned.
+    """
+    X = np.asarray(X if isinstance(X, np.ndarray) else configs_to_matrix(X), dtype=float)
+    builds = X.shape[0]
+    rounds = rounds or ADVENTURER_ROUNDS[source]
+    target = np.broadcast_to(np.asarray(target, dtype=float), (builds,))
+    hp = column(X, ENEMY_HP) if target_hp is None else np.broadcast_to(np.asarray(target_hp, dtype=float), (builds,))
+
+    def damage_at(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        Xv = _with_values(X[rows], key, values)
+        hp_v = column(Xv, ENEMY_HP) if key == ENEMY_HP else np.repeat(hp[rows], values.shape[1])
+        return damage_after_rounds(source, Xv, level, rounds, stacks, hp_v).reshape(values.shape)
+
+    everyone = np.arange(builds)
+    lo = np.full(builds, float(lower))
+    result = np.full(builds, np.nan)
+    met = damage_at(lo[:, None], everyone)[:, 0] >= target
+    result[met] = lo[met]
+
+    # Upper bound
+    current = np.abs(X[:, KEY_INDEX[key]])
+    hi = np.full(builds, float(upper)) if upper is not None else lo + np.maximum(2 * current, 1.0)
+    f_hi = np.full(builds, -np.inf)
+    pending = np.nonzero(~met)[0]
+    f_hi[pending] = damage_at(hi[pending, None], pending)[:, 0]
+    while upper is None:
+        grow = np.nonzero(~met & (f_hi < target) & (hi < MAX_VALUE))[0]
+        if not len(grow):
+            break
+        hi[grow] = lo[grow] + 8 * (hi[grow] - lo[grow])
+        f_hi[grow] = damage_at(hi[grow, None], grow)[:, 0]
+
+    rows = np.nonzero(~met & (f_hi >= target))[0]
+    if not len(rows):
+        return result
+
+    # Pieces between breakpoints; pick the first whose end reaches the target
+    points = stat_breakpoints(source, X[rows], level, key, rounds, hp[rows])
+    points = np.where(np.isnan(points), hi[rows, None], np.clip(points, lo[rows, None], hi[rows, None]))
+    edges = np.sort(np.column_stack([lo[rows], points, hi[rows]]), axis=1)
+    reached = damage_at(edges, rows) >= target[rows, None]
+    j = np.argmax(reached, axis=1)
+    index = np.arange(len(rows))
+    a, b = edges[index, j - 1], edges[index, j]
+
+    # Exact polynomial of the piece from its Lobatto samples, checked off-node
+    mid, half = (a + b) / 2, (b - a) / 2
+    samples = damage_at(mid[:, None] + half[:, None] * np.append(_NODES, _CHECK_NODE), rows)
+    coef = samples[:, :-1] @ _VANDERMONDE_INV.T
+    check = samples[:, -1]
+    trusted = np.abs(_horner(coef, _CHECK_NODE) - check) <= FIT_TOLERANCE * np.maximum(np.abs(check), 1.0)
+
+    x = _bisect(lambda x: _horner(coef, x), -np.ones(len(rows)), np.ones(len(rows)), target[rows])
+    values = mid + half * x
+
+    untrusted = np.nonzero(~trusted)[0]
+    if len(untrusted):
+        sub = rows[untrusted]
+        values[untrusted] = _bisect(lambda v: damage_at(v[:, None], sub)[:, 0], a[untrusted], b[untrusted], target[sub])
+
+    if integer:
+        floor = np.floor(values)
+        enough = (floor >= lo[rows]) & (damage_at(floor[:, None], rows)[:, 0] >= target[rows])
+        values = np.where(enough, floor, np.ceil(values))
+
+    result[rows] = values
+    return result
+
+
+def min_stat_for_kill(source: str, X, level: int, key: str, kill_round: int, enemy_hp=None, **kwargs) -> np.ndarray:
+    """
+    Smallest value of `key`, per build, that kills the enemy by `kill_round`,
+    i.e. whose damage after that many rounds reaches the enemy HP (each
+    build's ENEMY_HP by default). Takes the options of min_stat_for_damage.
+    """
+    if key == ENEMY_HP:
+        raise ValueError("ENEMY_HP is the kill target and cannot be solved for")
+    X = np.asarray(X if isinstance(X, np.ndarray) else configs_to_matrix(X), dtype=float)
+    hp = column(X, ENEMY_HP) if enemy_hp is None else np.broadcast_to(np.asarray(enemy_hp, dtype=float), X.shape[:1])
+    return min_stat_for_damage(source, X, level, key, target=hp, rounds=kill_round, target_hp=hp, **kwargs)
@@ -0,0 +1,150 @@
+# optimize/rotation.py
+
+"""
+Skill rotation optimizer: the skill counts (Num_Daggers, Num_Bolts, ...)
+that deal the most damage in a round under an action or energy budget.
+
+Every skill use costs a whole number of actions and deals its per-hit
+damage from the engine, so a round is a bounded knapsack: items are skill
+uses, the capacity is the budget. It is solved by dynamic programming over
+the budget, vectorized across builds, with each skill's use limit split
+into 1, 2, 4, ... bundles so that a bundle is taken at most once.
+"""
+
+import numpy as np
+import pandas as pd
+
+from simulation.adventurers import ADVENTURER_NAMES
+from simulation.batch import (
+    KEY_INDEX, column, configs_to_matrix, apply_passives_batch, final_atk_batch, hit_damage_batch
+)
+from simulation.engine import DAMAGE_SKILLS
+from config.constants import *
+
+# Skills with a fixed coefficient; dragon_flame_skill's comes from the adventurer
+ROTATION_SKILLS = [skill for skill, meta in DAMAGE_SKILLS.items() if meta.get("coef") is not None]
+# Builds solved per dynamic programming pass
+ROTATION_CHUNK = 20_000
+
+
+# === [1] Item Values ===
+def rotation_count_keys(skills: list) -> list:
+    """Config key holding the count of each skill."""
+    return [DAMAGE_SKILLS[skill]["count_key"] for skill in skills]
+
+
+def hit_values(X: np.ndarray, skills: list = None, source: str = None, level: int = 0) -> np.ndarray:
+    """
+    (N, S) damage of one use of each skill, as compute_damage gives it.
+    With `source`, the adventurer's passives at `level` are applied first.
+    """
+    skills = skills or ROTATION_SKILLS
+    strength = 1.15
+    if source is not None:
+        X = apply_passives_batch(X, level, ADVENTURER_NAMES[source])
+        strength = column(X, P_Strength)
+    final_atk = final_atk_batch(X, strength)
+    values = []
+    for skill in skills:
+        base_coef = column(X, Rage_ATK_coef) if skill == "rage" else DAMAGE_SKILLS[skill]["coef"]
+        values.append(hit_damage_batch(X, skill, final_atk, base_coef))
+    return np.column_stack(values)
+
+
+# === [2] Bounded Knapsack ===
+def _bundles(costs: np.ndarray, limits: np.ndarray, budget: int) -> list:
+    """(skill, uses, cost) bundles of 1, 2, 4, ... uses covering each skill's limit."""
+    bundles = []
+    for s, (cost, limit) in enumerate(zip(costs, limits)):
+        limit = min(limit, budget // cost)
+        size = 1
+        while limit > 0:
+            uses = min(size, limit)
+            bundles.append((s, uses, uses * cost))
+            limit -= uses
+            size *= 2
+    return bundles
+
+
+def _solve_chunk(values: np.ndarray, bundles: list, budget: int, skills: int) -> tuple:
+    builds = values.shape[0]
+    best = np.zeros((builds, budget + 1))
+    taken = []
+    for s, uses, weight in bundles:
+        gain = best[:, :budget + 1 - weight] + values[:, s:s + 1] * uses
+        take = np.zeros((builds, budget + 1), dtype=bool)
+        take[:, weight:] = gain > best[:, weight:]
+        best[:, weight:] = np.where(take[:, weight:], gain, best[:, weight:])
+        taken.append(take)
+
+    # Walk the bundles back from the full budget
+    counts = np.zeros((builds, skills), dtype=np.int64)
+    capacity = np.full(builds, budget)
+    rows = np.arange(builds)
+    for (s, uses, weight), take in zip(reversed(bundles), reversed(taken)):
+        chosen = take[rows, capacity]
+        counts[:, s] += chosen * uses
+        capacity -= chosen * weight
+    return counts, best[:, budget]
+
+
+def best_rotation_batch(X: np.ndarray, budget: int, costs: dict = None, limits: dict = None, skills: list = None,
+                        source: str = None, level: int = 0) -> tuple:
+    """
+    Best skill counts of every build for one round: at most `budget` actions,
+    each use of a skill costing `costs[skill]` (1 by default) and used at
+    most `limits[skill]` times. Skills costing 0 are used up to their limit.
+    Returns ((N, S) counts, (N,) damage) in the order of `skills`.
+    """
+    skills = skills or ROTATION_SKILLS
+    costs, limits = costs or {}, limits or {}
+    cost = np.array([costs.get(skill, 1) for skill in skills])
+    if np.any(cost < 0) or np.any(cost != np.round(cost)):
+        raise ValueError("Skill costs must be non-negative whole numbers")
+    cost = cost.astype(np.int64)
+    free = cost == 0
+    if any(skill not in limits for skill, is_free in zip(skills, free) if is_free):
+        raise ValueError("Skills costing 0 actions need a limit")
+    limit = np.array([limits.get(skill, budget) for skill in skills], dtype=np.int64)
+
+    values = np.maximum(np.nan_to_num(hit_values(X, skills, source, level)), 0)
+    bundles = _bundles(cost[~free], limit[~free], budget)
+    paid = np.nonzero(~free)[0]
+
+    counts = np.zeros(values.shape, dtype=np.int64)
+    damage = np.zeros(X.shape[0])
+    for start in range(0, X.shape[0], ROTATION_CHUNK):
+        part = slice(start, start + ROTATION_CHUNK)
+        chosen, best = _solve_chunk(values[part][:, paid], bundles, budget, len(paid))
+        counts[part, paid] = chosen
+        counts[part, free] = np.where(values[part][:, free] > 0, limit[free], 0)
+        damage[part] = best + (counts[part, free] * values[part][:, free]).sum(axis=1)
+    return counts, damage
+
+
+# === [3] Rotation Table ===
+def optimize_rotation(configs, budget: int, costs: dict = None, limits: dict = None, skills: list = None,
+                      source: str = None, level: int = 0) -> pd.DataFrame:
+    """
+    One row per build: the damage of its current counts and of the best
+    rotation within the budget, the gap between them, and the best count of
+    every skill. `configs` is a list of config dicts or a config matrix.
+    """
+    X = configs if isinstance(configs, np.ndarray) else configs_to_matrix(configs)
+    skills = skills or ROTATION_SKILLS
+    keys = rotation_count_keys(skills)
+    counts, best = best_rotation_batch(X, budget, costs, limits, skills, source, level)
+
+    values = np.nan_to_num(hit_values(X, skills, source, level))
+    current = X[:, [KEY_INDEX[key] for key in keys]]
+    current_damage = (current * values).sum(axis=1)
+
+    frame = pd.DataFrame({
+        "build": np.arange(X.shape[0]),
+        "current_damage": current_damage,
+        "best_damage": best,
+        "gap": best - current_damage,
+        "gap_pct": np.divide(best - current_damage, current_damage, out=np.full(len(best), np.nan),
+                             where=current_damage != 0) * 100,
+    })
+    return pd.concat([frame, pd.DataFrame(counts, columns=keys)], axis=1)
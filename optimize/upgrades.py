@@ -0,0 +1,178 @@
+# optimize/upgrades.py
+
+"""
+Upgrade planner: the order in which to spend a resource budget on stat
+increments and adventurer level-ups for the most damage per resource.
+
+Options wait in a priority queue keyed by damage gained per resource
+spent. After an upgrade is taken, the other options' gains are out of
+date, but they are not all re-simulated. An option is only re-evaluated
+when it reaches the top of the queue with a stale gain, and then together
+with the next stale options, in one batch. It is taken once its gain is
+current and still the best.
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from simulation.adventurers import ADVENTURER_LEVELS
+from simulation.batch import KEY_INDEX, configs_to_matrix, matrix_to_configs
+from .inverse import damage_after_rounds
+
+# Stale options re-evaluated together when the top of the queue is stale
+REFRESH_BATCH = 16
+
+
+# === [1] Options ===
+@dataclass(frozen=True)
+class Upgrade:
+    """
+    A purchasable upgrade: either `amount` added to config `key`, or
+    `source` moved to the next level of its ADVENTURER_LEVELS ladder. It
+    can be bought `limit` times; the k-th purchase costs `step_costs[k]`
+    when given, `cost` otherwise.
+    """
+    name: str
+    cost: float
+    key: Optional[str] = None
+    amount: float = 0.0
+    source: Optional[str] = None
+    limit: int = 1
+    step_costs: Optional[tuple] = None
+
+    def __post_init__(self):
+        if (self.key is None) == (self.source is None):
+            raise ValueError(f"Upgrade {self.name!r} needs exactly one of key or source")
+        if self.key is not None and self.key not in KEY_INDEX:
+            raise ValueError(f"Unknown config key for upgrade {self.name!r}: {self.key!r}")
+        if self.source is not None and self.source not in ADVENTURER_LEVELS:
+            raise ValueError(f"Unknown adventurer source for upgrade {self.name!r}: {self.source!r}")
+
+    def price(self, bought: int) -> float:
+        return self.step_costs[bought] if self.step_costs else self.cost
+
+
+class _Plan:
+    """Current build, adventurer levels and per-adventurer damage while the plan is built."""
+
+    def __init__(self, config: dict, levels: dict, upgrades: list, rounds: Optional[int]):
+        self.row = configs_to_matrix([config])[0]
+        self.levels = dict(levels)
+        self.upgrades = upgrades
+        self.rounds = rounds
+        self.bought = [0] * len(upgrades)
+        self.damage = {source: self._damage(source, self.row[None, :], level)[0] for source, level in self.levels.items()}
+
+    def _damage(self, source: str, rows: np.ndarray, level: int) -> np.ndarray:
+        return damage_after_rounds(source, rows, level, self.rounds)
+
+    def next_level(self, source: str) -> Optional[int]:
+        ladder = ADVENTURER_LEVELS[source]
+        higher = [level for level in ladder if level > self.levels.get(source, ladder[0])]
+        return higher[0] if higher else None
+
+    def available(self, i: int) -> bool:
+        upgrade = self.upgrades[i]
+        if self.bought[i] >= (len(upgrade.step_costs) if upgrade.step_costs else upgrade.limit):
+            return False
+        return upgrade.key is not None or self.next_level(upgrade.source) is not None
+
+    def gains(self, options: list) -> np.ndarray:
+        """Damage gained by each option from the current state, stat options batched per adventurer."""
+        gains = np.zeros(len(options))
+        stats = [j for j, i in enumerate(options) if self.upgrades[i].key is not None]
+        if stats:
+            rows = np.repeat(self.row[None, :], len(stats), axis=0)
+            for j, row in zip(stats, rows):
+                upgrade = self.upgrades[options[j]]
+                row[KEY_INDEX[upgrade.key]] += upgrade.amount
+            for source, level in self.levels.items():
+                gains[stats] += self._damage(source, rows, level) - self.damage[source]
+        for j, i in enumerate(options):
+            source = self.upgrades[i].source
+            if source is not None:
+                gains[j] = self._damage(source, self.row[None, :], self.next_level(source))[0] - self.damage.get(source, 0.0)
+        return gains
+
+    def apply(self, i: int):
+        upgrade = self.upgrades[i]
+        self.bought[i] += 1
+        if upgrade.key is not None:
+            self.row[KEY_INDEX[upgrade.key]] += upgrade.amount
+            changed = list(self.levels)
+        else:
+            self.levels[upgrade.source] = self.next_level(upgrade.source)
+            changed = [upgrade.source]
+        for source in changed:
+            self.damage[source] = self._damage(source, self.row[None, :], self.levels[source])[0]
+
+
+# === [2] Planner ===
+def plan_upgrades(config: dict, levels: dict, upgrades: list, budget: float, rounds: int = None) -> pd.DataFrame:
+    """
+    Ordered upgrade path within `budget`, greedily taking the best damage
+    gained per resource spent. `levels` maps each adventurer in the team to
+    its current level; damage is their summed fight damage over `rounds`
+    rounds (each adventurer's standard fight by default). One row per
+    upgrade taken, with the running spend, damage and levels.
+    """
+    plan = _Plan(config, levels, upgrades, rounds)
+    spent, version, steps = 0.0, 0, []
+
+    def ratio(i: int, gain: float) -> float:
+        return gain / plan.upgrades[i].price(plan.bought[i]) if plan.upgrades[i].price(plan.bought[i]) > 0 else np.inf
+
+    options = [i for i in range(len(upgrades)) if plan.available(i)]
+    queue = [(-ratio(i, gain), version, i, gain) for i, gain in zip(options, plan.gains(options))]
+    heapq.heapify(queue)
+
+    while queue:
+        _, seen, i, gain = heapq.heappop(queue)
+        price = plan.upgrades[i].price(plan.bought[i])
+        if not plan.available(i) or spent + price > budget:
+            continue
+        if seen != version:
+            # Refresh this option and the next stale ones in one batch
+            stale = [i]
+            while queue and len(stale) < REFRESH_BATCH and queue[0][1] != version:
+                stale.append(heapq.heappop(queue)[2])
+            stale = [j for j in stale if plan.available(j)]
+            for j, fresh in zip(stale, plan.gains(stale)):
+                heapq.heappush(queue, (-ratio(j, fresh), version, j, fresh))
+            continue
+        if gain <= 0:
+            continue
+
+        plan.apply(i)
+        spent += price
+        version += 1
+        steps.append({
+            "step": len(steps) + 1,
+            "upgrade": plan.upgrades[i].name,
+            "cost": price,
+            "gain": gain,
+            "gain_per_cost": gain / price if price else np.inf,
+            "spent": spent,
+            "damage": sum(plan.damage.values()),
+            **{f"{source}_level": level for source, level in plan.levels.items()},
+        })
+        if plan.available(i):
+            heapq.heappush(queue, (-ratio(i, gain), version - 1, i, gain))
+
+    return pd.DataFrame(steps, columns=["step", "upgrade", "cost", "gain", "gain_per_cost", "spent", "damage"] +
+                        [f"{source}_level" for source in plan.levels])
+
+
+def upgraded_config(config: dict, plan: pd.DataFrame, upgrades: list) -> dict:
+    """The config after every stat upgrade of a plan from plan_upgrades."""
+    by_name = {upgrade.name: upgrade for upgrade in upgrades}
+    row = configs_to_matrix([config])[0]
+    for name in plan["upgrade"]:
+        upgrade = by_name[name]
+        if upgrade.key is not None:
+            row[KEY_INDEX[upgrade.key]] += upgrade.amount
+    return {**config, **matrix_to_configs(row[None, :])[0]}
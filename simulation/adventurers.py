@@ -7,6 +7,7 @@ by applying adventurer-specific rules on top of the core engine.
 """
 
 import copy
+import numpy as np
 import pandas as pd
 
 # Core engine and configuration imports
@@ -16,38 +17,91 @@ from .engine import (
 )
 from config.constants import *
 from config.scenarios import BASE_CONFIG, apply_scenario_config
+from .timeline import DamageTimeline, SkillEvent, dot_stack_curve, simulate_timeline
+from utils.instrumentation import span, timed
+
+# === [0] Adventurer Ladders ===
+# Skill levels and fight length used by each run_*_scenario function.
+ADVENTURER_LEVELS = {
+    "gagarin": [0, 2, 4, 5, 7, 10],
+    "leonardo": [0, 2, 4, 5, 7, 8, 10],
+    "dragon_girl": [0, 2, 4, 5, 7, 8, 10],
+}
+ADVENTURER_ROUNDS = {"gagarin": 10, "leonardo": 10, "dragon_girl": 15}
 
 # === [1] Passive Injection per Adventurer ===
+# Strength set by each adventurer and the flat bonuses unlocked per level,
+# as (minimum level, config key, amount), applied in order.
+ADVENTURER_PASSIVES = {
+    "Gagarin": {
+        "strength": 1.20,
+        "bonuses": [
+            (10, Global_Skill_DMG_pct, 30),
+            (10, Global_Dagger_DMG_pct, 30),
+        ],
+    },
+    "Leonardo": {
+        "strength": 1.10,
+        "bonuses": [
+            (5, Ninjutsu_DMG_pct, 100),
+            (5, Fire_DMG_pct, 100),
+            (5, Lightning_DMG_pct, 100),
+            (5, Physical_DMG_pct, 100),
+            (10, Global_Fire_DMG_pct, 60),
+            (10, Global_Lightning_DMG_pct, 60),
+            (10, Global_Physical_DMG_pct, 60),
+        ],
+    },
+    "DragonGirl": {
+        "strength": 1.15,
+        "bonuses": [
+            (4, Global_Dragon_Flame_DMG_pct, 30),
+            (7, Global_Dragon_Flame_DMG_pct, 30),
+            (8, Final_DMG_pct, 30),
+        ],
+    },
+}
+
+# Passive table entry of each simulation source
+ADVENTURER_NAMES = {"gagarin": "Gagarin", "leonardo": "Leonardo", "dragon_girl": "DragonGirl"}
+
+@timed("passives")
 def apply_adventurer_passives(config: dict, level: int, adventurer: str) -> dict:
     """Applies passive buffs to a config based on adventurer and level."""
     cfg = copy.deepcopy(config)
 
-    if adventurer == "Gagarin":
-        cfg[P_Strength] = 1.20
-        if level >= 10:
-            cfg[Global_Skill_DMG_pct] += 30
-            cfg[Global_Dagger_DMG_pct] += 30
-    elif adventurer == "Leonardo":
-        cfg[P_Strength] = 1.10
-        if level >= 5:
-            cfg[Ninjutsu_DMG_pct] += 100
-            cfg[Fire_DMG_pct] += 100
-            cfg[Lightning_DMG_pct] += 100
-            cfg[Physical_DMG_pct] += 100
-        if level >= 10:
-            cfg[Global_Fire_DMG_pct] += 60
-            cfg[Global_Lightning_DMG_pct] += 60
-            cfg[Global_Physical_DMG_pct] += 60
-    elif adventurer == "DragonGirl":
-        cfg[P_Strength] = 1.15
-        if level >= 4: cfg[Global_Dragon_Flame_DMG_pct] += 30
-        if level >= 7: cfg[Global_Dragon_Flame_DMG_pct] += 30
-        if level >= 5: cfg[Global_Dragon_Flame_DMG_pct] += 100
-        if level >= 8: cfg[Final_DMG_pct] += 30
+    passives = ADVENTURER_PASSIVES.get(adventurer)
+    if passives:
+        cfg[P_Strength] = passives["strength"]
+        for min_level, key, amount in passives["bonuses"]:
+            if level >= min_level:
+                cfg[key] += amount
     return cfg
 
+# Dragon Girl's flame stacks: from level 5 each one adds 5% Global Dragon Flame damage
+DG_FLAME_STACK_LEVEL = 5
+DG_FLAME_PCT_PER_STACK = 5
+DG_FLAME_STACK_CAP = 20
+
+def dg_flame_stacks(stacks, cap: float = DG_FLAME_STACK_CAP):
+    """Resolves a `stacks` argument: True is fully ramped (cap), False none, a number that count up to the cap."""
+    if stacks is True:
+        return cap
+    if stacks is False or stacks is None:
+        return 0
+    return np.clip(stacks, 0, cap)
+
+def dg_stack_curve(rounds: int, gain: float = 1, cap: float = DG_FLAME_STACK_CAP) -> np.ndarray:
+    """Flame stacks held in each round when `gain` stacks are gained per round, up to the cap."""
+    return dot_stack_curve(gain, cap, rounds)[0]
+
+def leo_hsd_cooldown(level: int) -> int:
+    """Rounds between two of Leonardo's HSD casts."""
+    return 2 if level >= 7 else 3
+
 # === [2] Adventurer-Specific Damage Functions ===
-def gagarin_damage(level: int, config: dict, target_hp: float = 3_500_000_000_000):
+@timed("adventurer.gagarin")
+def gagarin_damage(level: int, config: dict, target_hp: float = 3_500_000_000_000, trace=None):
     cfg = apply_adventurer_passives(config, level, "Gagarin")
 
     final_atk = calculate_final_atk(cfg, strength=cfg[P_Strength])
@@ -145,51 +199,20 @@ def gagarin_damage(level: int, config: dict, target_hp: float = 3_500_000_000_00
         if isinstance(v, (int, float)) and k not in non_damage_keys
     )
 
+    if trace is not None:
+        trace.record(source="gagarin", level=level, config=config, passive_config=cfg,
+                     final_atk=final_atk, strength=cfg[P_Strength], breakdowns=shared_breakdowns)
     return output
 
-def run_gagarin_scenario(scenario_dict: dict, name: str):
+def run_gagarin_scenario(scenario_dict: dict, name: str, trace=None):
     skill_rows = []
     round_rows = []
-    debug_rows = []
 
-    levels = [0, 2, 4, 5, 7, 10]
-    rounds = 10
-
-    for lvl in levels:
-        base_cfg = apply_scenario_config(BASE_CONFIG, scenario_dict)
-
-        dmg = gagarin_damage(lvl, base_cfg, target_hp=base_cfg.get(ENEMY_HP, 3_500_000_000_000))
-        dmg["scenario"] = name
-        dmg["source"] = "gagarin"
+    for lvl in ADVENTURER_LEVELS["gagarin"]:
+        dmg, totals = evaluate_adventurer_level("gagarin", scenario_dict, lvl, name, trace=trace)
         skill_rows.append(dmg)
 
-        cfg_with_passives = apply_adventurer_passives(base_cfg, lvl, "Gagarin")
-        debug_rows.append({
-            "level": lvl,
-            P_Strength: cfg_with_passives.get(P_Strength, 0),
-            Global_Skill_DMG_pct: cfg_with_passives.get(Global_Skill_DMG_pct, 0),
-            Global_Dagger_DMG_pct: cfg_with_passives.get(Global_Dagger_DMG_pct, 0),
-            Bonus_Dagger_Coef: cfg_with_passives.get(Bonus_Dagger_Coef, 0),
-            Num_Daggers: cfg_with_passives.get(Num_Daggers, 0),
-            Rage_ATK_coef: cfg_with_passives.get(Rage_ATK_coef, 0),
-            Global_DMG_pct: cfg_with_passives.get(Global_DMG_pct, 0),
-            Dagger_DMG_pct: cfg_with_passives.get(Dagger_DMG_pct, 0),
-            Num_Light_Spears: cfg_with_passives.get(Num_Light_Spears, 0),
-        })
-
-        # Only sum relevant keys
-        non_damage_keys = {"level", "scenario", "source", "total_gagarin", "breakdowns"}
-        cumulative_keys = [k for k in dmg if isinstance(dmg[k], (int, float)) and k not in non_damage_keys and k != "bomb"]
-
-        running_total = 0
-        for rnd in range(1, rounds + 1):
-            per_round = sum(dmg[k] for k in cumulative_keys)
-
-            # Add bomb damage only on specific rounds
-            if rnd >= 3 and rnd % 2 == 1:
-                per_round += dmg.get("bomb", 0)
-
-            running_total += per_round
+        for rnd, running_total in enumerate(totals, start=1):
             round_rows.append({
                 "round": rnd,
                 "level": lvl,
@@ -198,9 +221,11 @@ def run_gagarin_scenario(scenario_dict: dict, name: str):
                 "total_damage": running_total
             })
 
-    return pd.DataFrame(skill_rows), pd.DataFrame(round_rows), pd.DataFrame(debug_rows)
+    with span("frames"):
+        return pd.DataFrame(skill_rows), pd.DataFrame(round_rows)
 
-def leo_damage(level: int, config: dict, target_hp: float = 3_500_000_000_000):
+@timed("adventurer.leonardo")
+def leo_damage(level: int, config: dict, target_hp: float = 3_500_000_000_000, trace=None):
     cfg = apply_adventurer_passives(config, level, adventurer="Leonardo")
     strength = cfg.get(P_Strength, 1.10)
     final_atk = calculate_final_atk(cfg, strength)
@@ -245,9 +270,6 @@ def leo_damage(level: int, config: dict, target_hp: float = 3_500_000_000_000):
             base += 5 * min(hp_val, hp_cap)
         return base
 
-    def hsd_cd():
-        return 2 if level >= 7 else 3
-
     def wts_damage():
         if level < 8:
             return 0
@@ -264,7 +286,7 @@ def leo_damage(level: int, config: dict, target_hp: float = 3_500_000_000_000):
     hsd = hsd_damage()
     wts = wts_damage() * cfg.get(Num_Rage_Strikes, 1)
     rage_atk = rage_damage() * cfg.get(Num_Rage_Strikes, 1)
-    cooldown = hsd_cd()
+    cooldown = leo_hsd_cooldown(level)
 
     # === Shared breakdowns ===
     shared_output = compute_all_damage(cfg, strength)
@@ -324,52 +346,23 @@ def leo_damage(level: int, config: dict, target_hp: float = 3_500_000_000_000):
         if isinstance(v, (int, float)) and k not in {"level", "scenario", "source", "breakdowns", "total_leonardo", "cooldown"}
     )
 
+    if trace is not None:
+        trace.record(source="leonardo", level=level, config=config, passive_config=cfg,
+                     final_atk=final_atk, strength=strength, breakdowns=shared_breakdowns)
     return output
 
 
 
 
-def run_leo_scenario(scenario_dict: dict, name: str):
-    levels = [0, 2, 4, 5, 7, 8, 10]
-
+def run_leo_scenario(scenario_dict: dict, name: str, trace=None):
     skill_rows = []
     round_rows = []
-    debug_rows = []
 
-    for lvl in levels:
-        base_cfg = apply_scenario_config(BASE_CONFIG, scenario_dict)
-        cfg_with_passives = apply_adventurer_passives(base_cfg, lvl, "Leonardo")
-
-        debug_rows.append({
-            "level": lvl,
-            P_Strength: cfg_with_passives.get(P_Strength, 0),
-            Ninjutsu_DMG_pct: cfg_with_passives.get(Ninjutsu_DMG_pct, 0),
-            Rage_ATK_coef: cfg_with_passives.get(Rage_ATK_coef, 0),
-            Global_DMG_pct: cfg_with_passives.get(Global_DMG_pct, 0),
-            Global_Skill_DMG_pct: cfg_with_passives.get(Global_Skill_DMG_pct, 0),
-            "Final_ATK": calculate_final_atk(cfg_with_passives, cfg_with_passives.get(P_Strength, 1.10)),
-        })
-
-        dmg = leo_damage(lvl, base_cfg, target_hp=base_cfg.get(ENEMY_HP, 3_500_000_000_000))
-        skill_rows.append({
-            "source": "leonardo",
-            "scenario": name,
-            "level": lvl,
-            **{k: v for k, v in dmg.items() if k != "cooldown"}
-        })
-
-        # === Round-by-round damage accounting ===
-        total = 0
-        for rnd in range(1, 11):
-            round_dmg = (
-                dmg["sbs"] * base_cfg.get(Num_Combos, 1)
-                + dmg["wts"]
-                + dmg["rage"]
-            )
-            if rnd % dmg["cooldown"] == 0:
-                round_dmg += dmg["hsd"]
-
-            total += round_dmg
+    for lvl in ADVENTURER_LEVELS["leonardo"]:
+        row, totals = evaluate_adventurer_level("leonardo", scenario_dict, lvl, name, trace=trace)
+        skill_rows.append(row)
+
+        for rnd, total in enumerate(totals, start=1):
             round_rows.append({
                 "source": "leonardo",
                 "scenario": name,
@@ -378,10 +371,15 @@ def run_leo_scenario(scenario_dict: dict, name: str):
                 "total_damage": total
             })
 
-    return pd.DataFrame(skill_rows), pd.DataFrame(round_rows), pd.DataFrame(debug_rows)
+    with span("frames"):
+        return pd.DataFrame(skill_rows), pd.DataFrame(round_rows)
 
-def dg_damage(level: int, config: dict, stacks: bool = True, target_hp=3_500_000_000_000):
+@timed("adventurer.dragon_girl")
+def dg_damage(level: int, config: dict, stacks=True, target_hp=3_500_000_000_000, trace=None,
+              stack_cap: float = DG_FLAME_STACK_CAP):
     cfg = apply_adventurer_passives(config, level, adventurer="DragonGirl")
+    if level >= DG_FLAME_STACK_LEVEL:
+        cfg[Global_Dragon_Flame_DMG_pct] += DG_FLAME_PCT_PER_STACK * dg_flame_stacks(stacks, stack_cap)
     strength = cfg.get(P_Strength, 1.15)
     final_atk = calculate_final_atk(cfg, strength)
 
@@ -495,56 +493,29 @@ def dg_damage(level: int, config: dict, stacks: bool = True, target_hp=3_500_000
         if isinstance(v, (int, float)) and k not in non_damage_keys
     )
 
+    if trace is not None:
+        trace.record(source="dragon_girl", level=level, config=config, passive_config=cfg,
+                     final_atk=final_atk, strength=strength, breakdowns=shared_breakdowns)
     return output
 
 
 
-def run_dragon_girl_scenario(config: dict, scenario_label: str, stacks: bool = True):
-    levels = [0, 2, 4, 5, 7, 8, 10]
-    rounds = list(range(1, 16))
+def run_dragon_girl_scenario(config: dict, scenario_label: str, stacks=True, trace=None,
+                             stack_gain: float = None, stack_cap: float = DG_FLAME_STACK_CAP):
+    """
+    `stacks` holds the flame stacks fixed for the whole fight (True = cap).
+    With `stack_gain`, stacks instead start at 0 and grow by that many per
+    round up to `stack_cap`; skill rows then show the fully ramped state.
+    """
     skill_rows = []
     round_rows = []
-    debug_rows = []
-
-    for lvl in levels:
-        cfg = apply_adventurer_passives(config, lvl, "DragonGirl")
-        dmg = dg_damage(lvl, cfg, stacks)
-
-        final_atk = calculate_final_atk(cfg, cfg.get(P_Strength, 1.20))
-        debug_rows.append({
-            "level": lvl,
-            P_Strength: cfg.get(P_Strength, 0),
-            Skill_DMG_pct: cfg.get(Skill_DMG_pct, 0),
-            Global_Skill_DMG_pct: cfg.get(Global_Skill_DMG_pct, 0),
-            Dragon_Flame_DMG_pct: cfg.get(Dragon_Flame_DMG_pct, 0),
-            Global_Dragon_Flame_DMG_pct: cfg.get("Global_Dragon_Flame_DMG_pct", 0),
-            Global_Dagger_DMG_pct: cfg.get(Global_Dagger_DMG_pct, 0),
-            Rage_ATK_coef: cfg.get(Rage_ATK_coef, 0),
-            Global_DMG_pct: cfg.get(Global_DMG_pct, 0),
-            "Final_ATK": final_atk,
-        })
-
-        skill_rows.append({
-            "source": "dragon_girl",
-            "scenario": scenario_label,
-            "level": lvl,
-            **dmg  # includes breakdowns
-        })
-
-        total = 0
-        for rnd in rounds:
-            round_dmg = (
-                dmg["basic_attack"]
-                + dmg["combo_attack"]
-                + dmg["breath"]
-                + dmg["rage"]
-            )
-            if lvl >= 4 and rnd % 2 == 1:
-                round_dmg += dmg["catastrophic"]
-            if lvl >= 8:
-                round_dmg += dmg["dragon_wrath"]
-
-            total += round_dmg
+
+    for lvl in ADVENTURER_LEVELS["dragon_girl"]:
+        row, totals = evaluate_adventurer_level("dragon_girl", config, lvl, scenario_label, stacks, trace=trace,
+                                                stack_gain=stack_gain, stack_cap=stack_cap)
+        skill_rows.append(row)
+
+        for rnd, total in enumerate(totals, start=1):
             round_rows.append({
                 "source": "dragon_girl",
                 "scenario": scenario_label,
@@ -553,4 +524,198 @@ def run_dragon_girl_scenario(config: dict, scenario_label: str, stacks: bool = T
                 "total_damage": total
             })
 
-    return pd.DataFrame(skill_rows), pd.DataFrame(round_rows), pd.DataFrame(debug_rows)
+    with span("frames"):
+        return pd.DataFrame(skill_rows), pd.DataFrame(round_rows)
+
+
+# === [3] Combat Schedules ===
+# Columns of Gagarin's skill row that hit every round (the bomb is scheduled apart)
+GAGARIN_ROUND_SKILLS = ["dagger", "missiles", "rage"] + [k for k in DAMAGE_SKILLS if k not in ("dagger", "rage")]
+
+# Config keys multiplying a column's damage in every round it is cast
+ADVENTURER_ROUND_SCALES = {
+    "gagarin": {},
+    "leonardo": {"sbs": Num_Combos},
+    "dragon_girl": {},
+}
+
+# DoT skills whose ticks build up in stacks: {skill: (applications per round key, stack cap key)}
+DOT_STACK_SKILLS = {
+    skill: (meta["count_key"], meta["stack_param"])
+    for skill, meta in DAMAGE_SKILLS.items() if meta.get("stack_param")
+}
+
+def dot_round_amounts(damage, applications, cap, rounds: int) -> np.ndarray:
+    """
+    Per-round DoT damage as (builds, rounds). `damage` is the skill row value,
+    i.e. one tick of every stack applied in a round, uncapped; ticks grow with
+    the stack count until it reaches the cap. Round 1 equals the skill row
+    while `applications` stays within the cap and is the cap's worth of
+    ticks beyond it.
+    """
+    damage = np.atleast_1d(np.asarray(damage, dtype=float))
+    applications = np.atleast_1d(np.asarray(applications, dtype=float))
+    per_stack = np.divide(damage, applications, out=np.zeros(np.broadcast(damage, applications).shape),
+                          where=applications != 0)
+    return per_stack[:, None] * dot_stack_curve(applications, cap, rounds)
+
+def adventurer_schedule(source: str, level: int) -> list:
+    """Returns the SkillEvents laying out one adventurer's skill row over a fight."""
+    if source == "gagarin":
+        # The bomb goes off on odd rounds from round 3
+        return [SkillEvent(skill) for skill in GAGARIN_ROUND_SKILLS] + [SkillEvent("bomb", start=3, period=2)]
+
+    if source == "leonardo":
+        cooldown = leo_hsd_cooldown(level)
+        return [SkillEvent("sbs"), SkillEvent("wts"), SkillEvent("rage"),
+                SkillEvent("hsd", start=cooldown, period=cooldown)]
+
+    if source == "dragon_girl":
+        events = [SkillEvent(skill) for skill in ("basic_attack", "combo_attack", "breath", "rage")]
+        if level >= 4:
+            events.append(SkillEvent("catastrophic", start=1, period=2))
+        if level >= 8:
+            events.append(SkillEvent("dragon_wrath"))
+        return events
+
+    raise ValueError(f"Unknown adventurer source: {source!r}")
+
+def adventurer_round_amounts(source: str, dmg: dict, events: list, scale, rounds: int) -> dict:
+    """
+    Damage per cast of each scheduled skill; DoT skills get their per-round
+    stack build-up. `scale(key)` looks up config values, either scalars or
+    per-build columns.
+    """
+    amounts = {event.skill: dmg.get(event.skill, 0.0) for event in events}
+    for column, key in ADVENTURER_ROUND_SCALES[source].items():
+        amounts[column] = amounts[column] * scale(key)
+    for skill, (count_key, cap_key) in DOT_STACK_SKILLS.items():
+        if skill in amounts:
+            amounts[skill] = dot_round_amounts(amounts[skill], scale(count_key), scale(cap_key), rounds)
+    return amounts
+
+def dg_stack_amounts(empty: dict, full: dict, stacks, cap: float) -> dict:
+    """
+    Dragon Girl's damage columns at any stack count. Flame stacks only add to
+    one multiplier of each term, so damage is affine in the stack count and
+    two evaluations (0 stacks and `cap` stacks) give every other count:
+    damage(s) = empty + (full - empty) * s / cap. Returns (builds, len(stacks))
+    arrays, e.g. per round for a stack curve or per value for a sweep.
+    """
+    stacks = np.clip(np.asarray(stacks, dtype=float), 0, cap)
+    share = stacks / cap if cap else np.zeros_like(stacks)
+    amounts = {}
+    for key, low in empty.items():
+        if not isinstance(low, (int, float, np.ndarray)) or isinstance(low, bool):
+            continue
+        low, high = np.atleast_1d(np.asarray(low, dtype=float)), np.atleast_1d(np.asarray(full[key], dtype=float))
+        amounts[key] = low[:, None] + (high - low)[:, None] * share
+    return amounts
+
+def adventurer_timeline(source: str, dmg: dict, config: dict, level: int, rounds: int = None) -> DamageTimeline:
+    """Runs one adventurer level's skill row through the combat timeline."""
+    rounds = rounds or ADVENTURER_ROUNDS[source]
+    events = adventurer_schedule(source, level)
+    amounts = adventurer_round_amounts(source, dmg, events, lambda key: config.get(key, 0), rounds)
+    return simulate_timeline(events, amounts, rounds, builds=1)
+
+
+# === [4] Per-Level Evaluation ===
+def evaluate_adventurer_level(source: str, scenario_dict: dict, level: int, name: str, stacks=True, trace=None,
+                              stack_gain: float = None, stack_cap: float = DG_FLAME_STACK_CAP):
+    """
+    Computes the skill row and cumulative round totals of one adventurer level,
+    exactly as the matching run_*_scenario function does. Pass a
+    SimulationTrace as `trace` to record the intermediate values.
+    """
+    rounds = ADVENTURER_ROUNDS[source]
+    if trace is not None:
+        trace = trace.bind(scenario=name)
+
+    if source == "gagarin":
+        base_cfg = apply_scenario_config(BASE_CONFIG, scenario_dict)
+        dmg = gagarin_damage(level, base_cfg, target_hp=base_cfg.get(ENEMY_HP, 3_500_000_000_000), trace=trace)
+        dmg["scenario"] = name
+        dmg["source"] = "gagarin"
+        timeline = adventurer_timeline(source, dmg, base_cfg, level, rounds)
+        return dmg, timeline.cumulative()[0].tolist()
+
+    if source == "leonardo":
+        base_cfg = apply_scenario_config(BASE_CONFIG, scenario_dict)
+        dmg = leo_damage(level, base_cfg, target_hp=base_cfg.get(ENEMY_HP, 3_500_000_000_000), trace=trace)
+        row = {
+            "source": "leonardo",
+            "scenario": name,
+            "level": level,
+            **{k: v for k, v in dmg.items() if k != "cooldown"}
+        }
+        timeline = adventurer_timeline(source, dmg, base_cfg, level, rounds)
+        return row, timeline.cumulative()[0].tolist()
+
+    if source == "dragon_girl":
+        ramped = stack_gain is not None
+        target_hp = scenario_dict.get(ENEMY_HP, 3_500_000_000_000)
+        dmg = dg_damage(level, scenario_dict, stack_cap if ramped else stacks, target_hp=target_hp, trace=trace,
+                        stack_cap=stack_cap)
+        row = {
+            "source": "dragon_girl",
+            "scenario": name,
+            "level": level,
+            **dmg  # includes breakdowns
+        }
+        amounts = dmg
+        if ramped:
+            empty = dg_damage(level, scenario_dict, 0, target_hp=target_hp, stack_cap=stack_cap)
+            amounts = dg_stack_amounts(empty, dmg, dg_stack_curve(rounds, stack_gain, stack_cap), stack_cap)
+        timeline = adventurer_timeline(source, amounts, scenario_dict, level, rounds)
+        return row, timeline.cumulative()[0].tolist()
+
+    raise ValueError(f"Unknown adventurer source: {source!r}")
+
+
+# === [5] Output Dependencies ===
+# Engine skills and extra config keys that feed each adventurer-specific
+# output column. Every column also depends on the final ATK keys. Columns not
+# listed here come straight from compute_all_damage and depend only on their
+# own DAMAGE_SKILLS entry.
+ADVENTURER_OUTPUT_DEPENDENCIES = {
+    "gagarin": {
+        "dagger": (["dagger"], [Num_Daggers, Bonus_Dagger_Coef]),
+        "missiles": (["dagger"], [Num_Daggers, Bonus_Dagger_Coef]),
+        "bomb": (["dagger"], [Bonus_Dagger_Coef, ENEMY_HP]),
+        "rage": (["rage"], [Rage_ATK_coef]),
+    },
+    "leonardo": {
+        "sbs": (["basic_attack", "ninjutsu_skill"], [Num_Basic_Attacks, Num_Combos]),
+        "hsd": (["ninjutsu_skill"], [ENEMY_HP]),
+        "wts": (["ninjutsu_skill"], [Num_Rage_Strikes]),
+        "rage": (["rage"], [Rage_ATK_coef, Num_Rage_Strikes]),
+        "basic_attack": ([], []),
+        "combo_attack": ([], []),
+    },
+    "dragon_girl": {
+        "basic_attack": (["basic_attack"], [Num_Basic_Attacks, Global_Dragon_Flame_DMG_pct]),
+        "combo_attack": (["combo_attack"], [Num_Combos, Global_Dragon_Flame_DMG_pct]),
+        "rage": (["rage"], [Rage_ATK_coef, Num_Rage_Strikes, Global_Dragon_Flame_DMG_pct]),
+        "breath": (["dragon_flame_skill"], [Num_Basic_Attacks, Num_Combos, Num_Rage_Strikes]),
+        "catastrophic": (["dragon_flame_skill"], []),
+        "dragon_wrath": ([], [MAX_HP, ENEMY_HP]),
+    },
+}
+
+# Extra keys read by the round accounting of each adventurer
+ADVENTURER_ROUND_DEPENDENCIES = {
+    source: list(scales.values()) for source, scales in ADVENTURER_ROUND_SCALES.items()
+}
+ADVENTURER_ROUND_DEPENDENCIES["gagarin"] += [cap_key for _, cap_key in DOT_STACK_SKILLS.values()]
+
+
+# === [6] HP Caps ===
+# Terms capped by HP: from `min_level`, min(hp_fraction * <hp_key>, atk_multiple * final ATK)
+# is added to the column. ENEMY_HP stands for the target HP each function is evaluated against.
+ADVENTURER_HP_CAPS = {
+    "gagarin": [("bomb", 7, ENEMY_HP, 0.10, 100)],
+    # HSD hits 5 times: 5 * min(0.02 * HP, 20 * ATK)
+    "leonardo": [("hsd", 7, ENEMY_HP, 0.10, 100)],
+    "dragon_girl": [("dragon_wrath", 8, MAX_HP, 0.10, 100), ("dragon_wrath", 8, ENEMY_HP, 0.10, 100)],
+}
@@ -0,0 +1,286 @@
+# simulation/archive.py
+
+"""
+On-disk result archive for sweeps too large for pandas frames. Every
+adventurer's per-skill totals and cumulative round series are stored as
+flat binary files, opened as memory-mapped numpy arrays, next to an index
+of build IDs and config hashes:
+
+    archive.json                    sources, levels, skill columns, rounds
+    rows                            rows reserved so far (int64)
+    build_ids, config_hashes, committed
+    <source>.skills                 (rows, levels, skills)
+    <source>.rounds                 (rows, levels, rounds)
+
+Appends may come from several processes at once. Under a file lock, a
+writer only reserves a block of rows and grows the files; it then computes
+and writes its block through its own mapping of that region and marks the
+rows committed. Reads are slices of read-only memory maps, so selecting an
+adventurer, a level or a build range copies nothing until the data is used.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .adventurers import ADVENTURER_LEVELS, ADVENTURER_ROUNDS
+from .batch import BATCH_KEYS, configs_to_matrix, adventurer_damage_batch, adventurer_timeline_batch
+from .sparse import SparseConfigs
+from config.scenarios import BASE_CONFIG
+
+# Builds evaluated and written per block while appending
+ARCHIVE_CHUNK = 50_000
+META_FILE = "archive.json"
+LOCK_FILE = ".lock"
+# Hex digest of a build's config row
+HASH_DTYPE = "S32"
+
+
+def config_hashes(X: np.ndarray) -> np.ndarray:
+    """(N,) content hash of each config row, over its BATCH_KEYS values."""
+    X = np.ascontiguousarray(X, dtype=float)
+    return np.array([hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest() for row in X], dtype=HASH_DTYPE)
+
+
+def _config_chunks(configs, chunk: int):
+    """Yields dense config matrices of at most `chunk` rows from dicts, a matrix or SparseConfigs."""
+    if isinstance(configs, SparseConfigs):
+        for _, _, X in configs.chunks(chunk):
+            yield X
+        return
+    for start in range(0, len(configs), chunk):
+        part = configs[start:start + chunk]
+        yield part if isinstance(part, np.ndarray) else configs_to_matrix(part)
+
+
+class ResultArchive:
+    """Memory-mapped per-skill and per-round results of many builds, appendable from parallel workers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta["keys"] != BATCH_KEYS:
+            raise ValueError(f"{path} was written with different config keys")
+        self.dtype = np.dtype(self.meta["dtype"])
+        self.sources = self.meta["sources"]
+
+    @classmethod
+    def create(cls, path: str, sources=None, levels=None, rounds: dict = None, dtype="float64",
+               stacks=True) -> "ResultArchive":
+        """
+        New empty archive for the given adventurers (all by default) at
+        `levels` (a list or {source: levels}), over `rounds` rounds per
+        adventurer (their standard fight by default).
+        """
+        if os.path.exists(os.path.join(path, META_FILE)):
+            raise ValueError(f"An archive already exists at {path}")
+        os.makedirs(path, exist_ok=True)
+        probe = configs_to_matrix([BASE_CONFIG])
+        layout = {}
+        for source in sources or ADVENTURER_LEVELS:
+            chosen = levels.get(source) if isinstance(levels, dict) else levels
+            source_levels = [level for level in ADVENTURER_LEVELS[source] if chosen is None or level in chosen]
+            skills = [name for name in adventurer_damage_batch(source, probe, source_levels[0]) if name != "cooldown"]
+            layout[source] = {
+                "levels": source_levels,
+                "skills": skills,
+                "rounds": (rounds or {}).get(source, ADVENTURER_ROUNDS[source]),
+            }
+        meta = {"keys": BATCH_KEYS, "dtype": np.dtype(dtype).name, "stacks": stacks, "sources": layout}
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump(meta, f, indent=1)
+        np.zeros(1, dtype=np.int64).tofile(os.path.join(path, "rows"))
+        for name, _, _ in cls._files(meta):
+            open(os.path.join(path, name), "wb").close()
+        return cls(path)
+
+    # --- Layout ---
+    @staticmethod
+    def _files(meta: dict) -> list:
+        """(file name, dtype, per-row shape) of every array in the archive."""
+        files = [("build_ids", np.dtype(np.int64), ()), ("config_hashes", np.dtype(HASH_DTYPE), ()),
+                 ("committed", np.dtype(np.uint8), ())]
+        for source, layout in meta["sources"].items():
+            levels = len(layout["levels"])
+            files.append((f"{source}.skills", np.dtype(meta["dtype"]), (levels, len(layout["skills"]))))
+            files.append((f"{source}.rounds", np.dtype(meta["dtype"]), (levels, layout["rounds"])))
+        return files
+
+    def _layout(self, name: str) -> tuple:
+        for file, dtype, shape in self._files(self.meta):
+            if file == name:
+                return dtype, shape
+        raise ValueError(f"Unknown archive array: {name!r}")
+
+    def _map(self, name: str, start: int, stop: int, mode: str = "r") -> np.ndarray:
+        """Memory map of rows [start, stop) of one array."""
+        dtype, shape = self._layout(name)
+        if stop <= start:
+            return np.empty((0,) + shape, dtype=dtype)
+        row_bytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode=mode, offset=start * row_bytes,
+                         shape=(stop - start,) + shape)
+
+    def __len__(self) -> int:
+        """Rows reserved so far, committed or still being written."""
+        return int(np.fromfile(os.path.join(self.path, "rows"), dtype=np.int64)[0])
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.path, LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _reserve(self, count: int) -> int:
+        """Claims `count` new rows and grows every file to hold them. Returns the first row."""
+        with self._locked():
+            start = len(self)
+            for name, dtype, shape in self._files(self.meta):
+                row_bytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+                os.truncate(os.path.join(self.path, name), (start + count) * row_bytes)
+            np.array([start + count], dtype=np.int64).tofile(os.path.join(self.path, "rows"))
+        return start
+
+    # --- Writing ---
+    def append(self, configs, build_ids=None, chunk: int = ARCHIVE_CHUNK) -> tuple:
+        """
+        Evaluates and stores builds (config dicts, a config matrix or
+        SparseConfigs). `build_ids` default to the row numbers. Returns the
+        (start, stop) rows written.
+        """
+        count = len(configs)
+        if build_ids is not None and len(build_ids) != count:
+            raise ValueError(f"Got {len(build_ids)} build IDs for {count} builds")
+        start = self._reserve(count)
+        build_ids = np.arange(start, start + count) if build_ids is None else np.asarray(build_ids, dtype=np.int64)
+
+        row = start
+        for X in _config_chunks(configs, chunk):
+            stop = row + len(X)
+            for source, layout in self.sources.items():
+                skills = self._map(f"{source}.skills", row, stop, "r+")
+                rounds = self._map(f"{source}.rounds", row, stop, "r+")
+                for i, level in enumerate(layout["levels"]):
+                    dmg = adventurer_damage_batch(source, X, level, self.meta["stacks"])
+                    skills[:, i] = np.column_stack([dmg[name] for name in layout["skills"]])
+                    timeline = adventurer_timeline_batch(source, X, level, layout["rounds"], dmg=dmg, per_skill=False)
+                    rounds[:, i] = timeline.cumulative()
+                skills.flush()
+                rounds.flush()
+            index = {"build_ids": build_ids[row - start:stop - start], "config_hashes": config_hashes(X)}
+            for name, values in index.items():
+                mapped = self._map(name, row, stop, "r+")
+                mapped[:] = values
+                mapped.flush()
+            committed = self._map("committed", row, stop, "r+")
+            committed[:] = 1
+            committed.flush()
+            row = stop
+        return start, start + count
+
+    # --- Reading ---
+    def _level_index(self, source: str, level) -> object:
+        if level is None:
+            return slice(None)
+        return self.sources[source]["levels"].index(level)
+
+    def skill_columns(self, source: str) -> list:
+        return list(self.sources[source]["skills"])
+
+    def skills(self, source: str, level: int = None, builds: slice = slice(None)) -> np.ndarray:
+        """Per-skill totals, (builds, skills) at one level or (builds, levels, skills), as a read-only memory map."""
+        start, stop, _ = builds.indices(len(self))
+        return self._map(f"{source}.skills", start, stop)[::builds.step or 1, self._level_index(source, level)]
+
+    def rounds(self, source: str, level: int = None, builds: slice = slice(None)) -> np.ndarray:
+        """Cumulative damage per round, (builds, rounds) at one level or (builds, levels, rounds)."""
+        start, stop, _ = builds.indices(len(self))
+        return self._map(f"{source}.rounds", start, stop)[::builds.step or 1, self._level_index(source, level)]
+
+    def totals(self, source: str, level: int = None, builds: slice = slice(None)) -> np.ndarray:
+        """Whole-fight damage, the last round of `rounds`."""
+        return self.rounds(source, level, builds)[..., -1]
+
+    def build_ids(self, builds: slice = slice(None)) -> np.ndarray:
+        start, stop, step = builds.indices(len(self))
+        return self._map("build_ids", start, stop)[::step]
+
+    def config_hashes(self, builds: slice = slice(None)) -> np.ndarray:
+        start, stop, step = builds.indices(len(self))
+        return self._map("config_hashes", start, stop)[::step]
+
+    def committed(self, builds: slice = slice(None)) -> np.ndarray:
+        """Whether each row has been fully written; rows still being appended read as False."""
+        start, stop, step = builds.indices(len(self))
+        return self._map("committed", start, stop)[::step].astype(bool)
+
+    def rows_of(self, build_ids) -> np.ndarray:
+        """Row of each build ID (-1 where absent), scanning the index a chunk at a time."""
+        build_ids = np.asarray(build_ids, dtype=np.int64)
+        rows = np.full(len(build_ids), -1, dtype=np.int64)
+        for start in range(0, len(self), ARCHIVE_CHUNK):
+            ids = self._map("build_ids", start, min(len(self), start + ARCHIVE_CHUNK))
+            found = self._map("committed", start, start + len(ids)).astype(bool) & np.isin(ids, build_ids)
+            for row in np.nonzero(found)[0]:
+                rows[build_ids == ids[row]] = start + row
+        return rows
+
+    # --- Analysis Frames ---
+    def _selection(self, builds: slice, sources, levels):
+        start, stop, step = builds.indices(len(self))
+        ids = self.build_ids(builds)
+        keep = self.committed(builds)
+        for source in sources or self.sources:
+            for level in self.sources[source]["levels"]:
+                if levels is None or level in levels:
+                    yield source, level, ids[keep], slice(start, stop, step), keep
+
+    def _labels(self, source: str, level: int, ids: np.ndarray, repeat: int, compact: bool) -> dict:
+        """source, scenario and level columns of one selection; categorical and narrow when `compact`."""
+        if not compact:
+            return {"source": source, "scenario": np.repeat([f"build {i}" for i in ids], repeat), "level": level}
+        # Every selection of one call names the same builds, so the categories line up and concat keeps them
+        scenarios = pd.Categorical.from_codes(np.repeat(np.arange(len(ids)), repeat), [f"build {i}" for i in ids])
+        sources = pd.Categorical.from_codes(np.full(len(ids) * repeat, list(self.sources).index(source)),
+                                            list(self.sources))
+        return {"source": sources, "scenario": scenarios, "level": np.full(len(ids) * repeat, level, dtype=np.int8)}
+
+    def skill_frame(self, builds: slice = slice(None), sources=None, levels=None, compact: bool = False) -> pd.DataFrame:
+        """
+        Committed rows of a build range in the layout of run_full_simulation's
+        skill results (one row per source, level and build, the build as
+        the scenario), for the utils.analysis tables and plots. With
+        `compact`, labels are categorical and the level is int8, as
+        utils.compact gives them, without building a string per row first.
+        """
+        frames = []
+        for source, level, ids, rows, keep in self._selection(builds, sources, levels):
+            frame = pd.DataFrame(np.asarray(self.skills(source, level, rows))[keep], columns=self.skill_columns(source))
+            for position, (name, values) in enumerate(self._labels(source, level, ids, 1, compact).items()):
+                frame.insert(position, name, values)
+            frames.append(frame)
+        table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        totals = [column for column in table.columns if column.startswith("total_")]
+        if totals:
+            table["total"] = table[totals].max(axis=1)
+        return table
+
+    def round_frame(self, builds: slice = slice(None), sources=None, levels=None, compact: bool = False) -> pd.DataFrame:
+        """Committed rows of a build range in the layout of run_full_simulation's round results."""
+        frames = []
+        for source, level, ids, rows, keep in self._selection(builds, sources, levels):
+            series = np.asarray(self.rounds(source, level, rows))[keep]
+            frame = self._labels(source, level, ids, series.shape[1], compact)
+            frame["round"] = np.tile(np.arange(1, series.shape[1] + 1, dtype=np.int16 if compact else None), len(ids))
+            frame["total_damage"] = series.ravel()
+            frames.append(pd.DataFrame(frame))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -0,0 +1,441 @@
+# simulation/batch.py
+
+"""
+Vectorized counterpart of the engine and adventurer damage functions. Many
+configs are stacked into an (N, K) matrix over BATCH_KEYS and every formula
+is evaluated for all of them at once with numpy. Results match the scalar
+functions up to floating point rounding, so the dict-based code stays the
+reference and this module is what large sweeps and fights run on.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from .engine import DAMAGE_SKILLS, crit_chance_keys
+from .adventurers import (
+    ADVENTURER_PASSIVES, ADVENTURER_NAMES, ADVENTURER_ROUNDS, ADVENTURER_HP_CAPS, GAGARIN_ROUND_SKILLS,
+    DG_FLAME_STACK_LEVEL, DG_FLAME_PCT_PER_STACK, DG_FLAME_STACK_CAP,
+    adventurer_schedule, adventurer_round_amounts, dg_flame_stacks, dg_stack_amounts, dg_stack_curve,
+    leo_hsd_cooldown
+)
+from .timeline import DamageTimeline, simulate_timeline
+from config.constants import *
+from config.scenarios import BASE_CONFIG
+
+# === [1] Config Matrix ===
+BATCH_KEYS = list(dict.fromkeys(ALL_KEYS + [Rage_ATK_coef]))
+KEY_INDEX = {key: i for i, key in enumerate(BATCH_KEYS)}
+
+
+def configs_to_matrix(configs, base: dict = BASE_CONFIG) -> np.ndarray:
+    """Stacks configs into an (N, K) matrix. Keys a config leaves out take their `base` value."""
+    defaults = [float(base.get(key, 0)) for key in BATCH_KEYS]
+    rows = [[float(cfg.get(key, default)) for key, default in zip(BATCH_KEYS, defaults)] for cfg in configs]
+    return np.array(rows, dtype=float).reshape(len(rows), len(BATCH_KEYS))
+
+
+def matrix_to_configs(X: np.ndarray) -> list:
+    """Turns the rows of a config matrix back into config dicts."""
+    return [dict(zip(BATCH_KEYS, row)) for row in np.asarray(X, dtype=float).tolist()]
+
+
+def column(X: np.ndarray, key: str) -> np.ndarray:
+    """(N,) values of one config key."""
+    return X[:, KEY_INDEX[key]]
+
+
+def _indices(keys) -> np.ndarray:
+    # Keys outside the matrix read as 0 in the scalar code and are dropped
+    return np.array([KEY_INDEX[k] for k in keys if k in KEY_INDEX], dtype=int)
+
+
+def _sum_columns(X: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    # Column by column, which avoids gathering a copy (contiguous reads for column-major X)
+    if len(idx) == 0:
+        return np.zeros(X.shape[0])
+    out = X[:, idx[0]].copy()
+    for i in idx[1:]:
+        out += X[:, i]
+    return out
+
+
+# === [2] Engine ===
+@lru_cache(maxsize=None)
+def _skill_columns(skill: str, extra_mods: tuple = ()) -> tuple:
+    """Column indices feeding compute_damage for a skill: bonus, local, global, final."""
+    meta = DAMAGE_SKILLS.get(skill, {})
+    local_mods = list(meta.get("local_mods", []))
+    global_mods = list(meta.get("global_mods", []))
+    local_mods += [m for m in extra_mods if m not in local_mods]
+    global_mods += [f"Global_{m}" for m in extra_mods if f"Global_{m}" not in global_mods]
+
+    bonus_key = meta.get("bonus_coef_key")
+    bonus_keys = bonus_key if isinstance(bonus_key, list) else [bonus_key] if bonus_key else []
+    final_keys = [meta["final_bonus_type"]] if meta.get("final_bonus_type") else []
+    return _indices(bonus_keys), _indices(local_mods), _indices(global_mods), _indices(final_keys)
+
+
+def final_atk_batch(X: np.ndarray, strength=1.15) -> np.ndarray:
+    """Vectorized calculate_final_atk. `strength` is a scalar or an (N,) array."""
+    return (
+        column(X, P_ATK) * strength *
+        (1 + column(X, P_ATK_pct) / 100) *
+        (1 + column(X, P_Global_ATK_pct) / 100) *
+        (1 + column(X, Final_DMG_pct) / 100)
+    )
+
+
+def crit_multiplier_batch(X: np.ndarray, skill: str) -> np.ndarray:
+    """Vectorized get_expected_crit_multiplier."""
+    keys = crit_chance_keys(skill)
+    if not keys:
+        return np.ones(X.shape[0])
+    crit_chance = np.minimum(100, _sum_columns(X, _indices(keys)))
+    return (1 - crit_chance / 100) + (crit_chance / 100) * (1 + column(X, Crit_DMG_pct) / 100)
+
+
+def hit_damage_batch(X: np.ndarray, skill: str, final_atk: np.ndarray, base_coef=1.0, extra_mods=()) -> np.ndarray:
+    """Vectorized compute_damage: damage of one hit of `skill` for every build."""
+    bonus, local, global_, final = _skill_columns(skill, tuple(extra_mods))
+    return (
+        final_atk
+        * (base_coef + _sum_columns(X, bonus))
+        * (1 + _sum_columns(X, local) / 100)
+        * (1 + _sum_columns(X, global_) / 100)
+        * (1 + _sum_columns(X, final) / 100)
+        * crit_multiplier_batch(X, skill)
+    )
+
+
+def _count_key(skill: str, meta: dict) -> str:
+    count_key = meta.get("count_key") or meta.get("stack_param")
+    if not count_key:
+        raw = skill.replace("_dot", "")
+        count_key = "Num_" + "".join(w.capitalize() for w in raw.split("_")) + "s"
+    return count_key
+
+
+def all_damage_batch(X: np.ndarray, strength=1.15, final_atk: np.ndarray = None) -> dict:
+    """
+    Vectorized compute_all_damage totals: {skill: (N,) damage}, 0 where the
+    skill is not used. Skills without a coefficient (dragon_flame_skill)
+    come out as NaN where they are used, where the scalar engine raises.
+    """
+    if final_atk is None:
+        final_atk = final_atk_batch(X, strength)
+
+    results = {}
+    for skill, meta in DAMAGE_SKILLS.items():
+        count_key = _count_key(skill, meta)
+        count = column(X, count_key) if count_key in KEY_INDEX else np.zeros(X.shape[0])
+        if skill == "rage":
+            base_coef = column(X, Rage_ATK_coef)
+        else:
+            base_coef = meta["coef"] if meta.get("coef") is not None else np.nan
+        with np.errstate(invalid="ignore"):
+            damage = hit_damage_batch(X, skill, final_atk, base_coef) * count
+        results[skill] = np.where(count == 0, 0.0, damage)
+    return results
+
+
+# === [3] Adventurer Passives ===
+def apply_passives_batch(X: np.ndarray, level: int, adventurer: str) -> np.ndarray:
+    """Vectorized apply_adventurer_passives. Returns a new matrix in the memory order of X."""
+    Xp = X.copy(order="K")
+    passives = ADVENTURER_PASSIVES.get(adventurer)
+    if passives:
+        Xp[:, KEY_INDEX[P_Strength]] = passives["strength"]
+        for min_level, key, amount in passives["bonuses"]:
+            if level >= min_level:
+                Xp[:, KEY_INDEX[key]] += amount
+    return Xp
+
+
+def adventurer_final_atk_batch(source: str, X: np.ndarray, level: int) -> np.ndarray:
+    """Final ATK of one adventurer level for every build, passives included."""
+    Xp = apply_passives_batch(X, level, ADVENTURER_NAMES[source])
+    return final_atk_batch(Xp, column(Xp, P_Strength))
+
+
+# === [4] Adventurer Damage ===
+def _with_total(output: dict, total_key: str) -> dict:
+    output[total_key] = sum(output.values())
+    return output
+
+
+def gagarin_damage_batch(X: np.ndarray, level: int, target_hp=None) -> dict:
+    """Vectorized gagarin_damage skill columns. `target_hp` defaults to each build's ENEMY_HP."""
+    Xp = apply_passives_batch(X, level, "Gagarin")
+    strength = column(Xp, P_Strength)
+    final_atk = final_atk_batch(Xp, strength)
+    shared = all_damage_batch(Xp, strength, final_atk)
+    target_hp = column(Xp, ENEMY_HP) if target_hp is None else target_hp
+
+    num_daggers = column(Xp, Num_Daggers)
+    missile_chance = 0.65 if level >= 5 else 0.50
+    missile_coef = 1.00 if level >= 2 else 0.80
+    bonus = column(Xp, Bonus_Dagger_Coef)
+
+    def dagger_hit(coef):
+        return hit_damage_batch(Xp, "dagger", final_atk, coef + bonus)
+
+    if level < 4:
+        bomb = np.zeros(X.shape[0])
+    elif level >= 7:
+        bomb = dagger_hit(18) + np.minimum(final_atk * 100, target_hp * 0.10)
+    else:
+        bomb = dagger_hit(9)
+
+    output = {
+        "dagger": dagger_hit(0.45) * ((1 - missile_chance) * num_daggers),
+        "missiles": dagger_hit(missile_coef) * (missile_chance * num_daggers),
+        "bomb": bomb,
+        "rage": shared["rage"],
+    }
+    output.update((k, shared[k]) for k in GAGARIN_ROUND_SKILLS if k not in output)
+    return _with_total(output, "total_gagarin")
+
+
+def leo_damage_batch(X: np.ndarray, level: int, target_hp=None) -> dict:
+    """Vectorized leo_damage skill columns. `target_hp` defaults to each build's ENEMY_HP."""
+    Xp = apply_passives_batch(X, level, "Leonardo")
+    strength = column(Xp, P_Strength)
+    final_atk = final_atk_batch(Xp, strength)
+    shared = all_damage_batch(Xp, strength, final_atk)
+    target_hp = column(Xp, ENEMY_HP) if target_hp is None else target_hp
+    zeros = np.zeros(X.shape[0])
+
+    def ninjutsu(coef):
+        return hit_damage_batch(Xp, "ninjutsu_skill", final_atk, coef)
+
+    base_damage = sum(hit_damage_batch(Xp, "basic_attack", final_atk, coef) for coef in (0.3, 0.7, 1.0))
+    sbs = base_damage + ninjutsu(1.0)
+    if level >= 2:
+        sbs = sbs + (1 - (1 - 0.7) ** 3) * ninjutsu(1.0)
+    sbs = sbs * (column(Xp, Num_Basic_Attacks) * column(Xp, Num_Combos))
+
+    hsd = zeros
+    if level >= 4:
+        hsd = 5 * ninjutsu(4 if level >= 7 else 2)
+        if level >= 7:
+            hsd = hsd + 5 * np.minimum(0.02 * target_hp, 20 * final_atk)
+
+    rage_strikes = column(Xp, Num_Rage_Strikes)
+    wts = 3 * ninjutsu(5 if level >= 10 else 3) * rage_strikes if level >= 8 else zeros
+    rage = zeros if level >= 8 else hit_damage_batch(Xp, "rage", final_atk, column(Xp, Rage_ATK_coef)) * rage_strikes
+
+    output = {"sbs": sbs, "hsd": hsd, "wts": wts, "rage": rage, "basic_attack": zeros, "combo_attack": zeros}
+    output.update((k, v) for k, v in shared.items() if k not in output)
+    output = _with_total(output, "total_leonardo")
+    output["cooldown"] = np.full(X.shape[0], leo_hsd_cooldown(level))
+    return output
+
+
+def dg_damage_batch(X: np.ndarray, level: int, stacks=True, target_hp=None,
+                    stack_cap: float = DG_FLAME_STACK_CAP) -> dict:
+    """
+    Vectorized dg_damage skill columns. `stacks` may also be an (N,) array of
+    stack counts. `target_hp` defaults to each build's ENEMY_HP.
+    """
+    Xp = apply_passives_batch(X, level, "DragonGirl")
+    if level >= DG_FLAME_STACK_LEVEL:
+        Xp[:, KEY_INDEX[Global_Dragon_Flame_DMG_pct]] += DG_FLAME_PCT_PER_STACK * dg_flame_stacks(stacks, stack_cap)
+    strength = column(Xp, P_Strength)
+    final_atk = final_atk_batch(Xp, strength)
+    shared = all_damage_batch(Xp, strength, final_atk)
+    zeros = np.zeros(X.shape[0])
+
+    flame = ["Global_Dragon_Flame_DMG_pct"] if level >= 5 else []
+    basic_hit = hit_damage_batch(Xp, "basic_attack", final_atk, 1.0, ["Basic_ATK_DMG_pct"] + flame)
+    combo_hit = hit_damage_batch(Xp, "combo_attack", final_atk, 1.0, ["Basic_ATK_DMG_pct", "Combo_DMG_pct"] + flame)
+    rage_hit = hit_damage_batch(Xp, "rage", final_atk, column(Xp, Rage_ATK_coef), ["Rage_DMG_pct", "Skill_DMG_pct"] + flame)
+
+    basic_attacks, combos, rage_strikes = column(Xp, Num_Basic_Attacks), column(Xp, Num_Combos), column(Xp, Num_Rage_Strikes)
+    breath_hit = hit_damage_batch(Xp, "dragon_flame_skill", final_atk, 0.9 if level < 2 else 1.8)
+
+    catastrophic = zeros
+    if level >= 4:
+        catastrophic = hit_damage_batch(Xp, "dragon_flame_skill", final_atk, 12 if level >= 7 else 6)
+
+    dragon_wrath = zeros
+    if level >= 8:
+        cap = 100 * final_atk
+        target_hp = column(Xp, ENEMY_HP) if target_hp is None else target_hp
+        dragon_wrath = np.minimum(0.10 * column(Xp, MAX_HP), cap) + np.minimum(0.10 * target_hp, cap)
+
+    output = {
+        "basic_attack": basic_attacks * basic_hit,
+        "combo_attack": combos * combo_hit,
+        "breath": breath_hit * (basic_attacks + combos) + breath_hit * rage_strikes,
+        "rage": rage_strikes * rage_hit,
+        "catastrophic": catastrophic,
+        "dragon_wrath": dragon_wrath,
+    }
+    output.update((k, v) for k, v in shared.items() if k not in output)
+    return _with_total(output, "total_dragon_girl")
+
+
+ADVENTURER_DAMAGE_BATCH = {
+    "gagarin": gagarin_damage_batch,
+    "leonardo": leo_damage_batch,
+    "dragon_girl": dg_damage_batch,
+}
+
+
+def adventurer_damage_batch(source: str, X: np.ndarray, level: int, stacks=True, target_hp=None) -> dict:
+    """
+    Skill columns of one adventurer level for every build, as
+    evaluate_adventurer_level computes them. `target_hp` (scalar or (N,))
+    overrides the HP each adventurer function caps against by default.
+    """
+    if source not in ADVENTURER_DAMAGE_BATCH:
+        raise ValueError(f"Unknown adventurer source: {source!r}")
+    kwargs = {} if target_hp is None else {"target_hp": target_hp}
+    if source == "dragon_girl":
+        return dg_damage_batch(X, level, stacks, **kwargs)
+    return ADVENTURER_DAMAGE_BATCH[source](X, level, **kwargs)
+
+
+def dg_stack_sweep_batch(X: np.ndarray, level: int, stack_counts, stack_cap: float = DG_FLAME_STACK_CAP) -> dict:
+    """
+    Dragon Girl's skill columns for every build at every stack count in one
+    call: {column: (N, len(stack_counts))}. Counts above the cap are clamped.
+    Only two engine evaluations are made, whatever the number of counts.
+    """
+    empty = dg_damage_batch(X, level, 0, stack_cap=stack_cap)
+    full = dg_damage_batch(X, level, stack_cap, stack_cap=stack_cap)
+    return dg_stack_amounts(empty, full, np.atleast_1d(stack_counts), stack_cap)
+
+
+# === [5] Combat Timeline ===
+def adventurer_timeline_batch(source: str, X: np.ndarray, level: int, rounds: int = None,
+                              dmg: dict = None, per_skill: bool = True, dtype=np.float64) -> DamageTimeline:
+    """
+    Runs one adventurer level through the combat timeline for every build.
+    Pass `dmg` to reuse skill columns already computed for X.
+    """
+    if dmg is None:
+        dmg = adventurer_damage_batch(source, X, level)
+    rounds = rounds or ADVENTURER_ROUNDS[source]
+    events = adventurer_schedule(source, level)
+    amounts = adventurer_round_amounts(source, dmg, events, lambda key: column(X, key), rounds)
+    return simulate_timeline(events, amounts, rounds, builds=X.shape[0], per_skill=per_skill, dtype=dtype)
+
+
+def fight_damage_batch(source: str, X: np.ndarray, level: int, rounds: int = None, stacks=True) -> np.ndarray:
+    """(N,) cumulative damage of one adventurer level over a fight of `rounds` rounds (its standard fight by default)."""
+    dmg = adventurer_damage_batch(source, X, level, stacks)
+    return adventurer_timeline_batch(source, X, level, rounds, dmg=dmg, per_skill=False).cumulative()[:, -1]
+
+
+def dg_stack_timeline_batch(X: np.ndarray, level: int, stack_gain: float = 1, stack_cap: float = DG_FLAME_STACK_CAP,
+                            rounds: int = None, per_skill: bool = True, dtype=np.float64) -> DamageTimeline:
+    """Dragon Girl's fight for every build with flame stacks growing by `stack_gain` per round."""
+    rounds = rounds or ADVENTURER_ROUNDS["dragon_girl"]
+    empty = dg_damage_batch(X, level, 0, stack_cap=stack_cap)
+    full = dg_damage_batch(X, level, stack_cap, stack_cap=stack_cap)
+    dmg = dg_stack_amounts(empty, full, dg_stack_curve(rounds, stack_gain, stack_cap), stack_cap)
+    return adventurer_timeline_batch("dragon_girl", X, level, rounds, dmg=dmg, per_skill=per_skill, dtype=dtype)
+
+
+# === [6] Enemy HP Axis ===
+def hp_grid(enemy_hp, builds: int) -> np.ndarray:
+    """Broadcasts enemy HP values to (builds, M): a scalar, an (M,) grid shared by all builds, or (builds, M)."""
+    hp = np.asarray(enemy_hp, dtype=float)
+    if hp.ndim < 2:
+        hp = np.atleast_1d(hp)[None, :]
+    return np.broadcast_to(hp, (builds, hp.shape[1]))
+
+
+def _enemy_hp_caps(source: str, level: int) -> list:
+    """(column, hp_fraction, atk_multiple) of the terms capped by the enemy's HP at this level."""
+    return [(col, fraction, multiple) for col, min_level, hp_key, fraction, multiple in ADVENTURER_HP_CAPS[source]
+            if hp_key == ENEMY_HP and level >= min_level]
+
+
+def hp_cap_breakpoints(source: str, X: np.ndarray, level: int) -> dict:
+    """
+    Enemy HP from which each HP-capped column stops growing, per build:
+    {column: (N,)}. Below it the term is hp_fraction * HP, above it
+    atk_multiple * final ATK.
+    """
+    final_atk = adventurer_final_atk_batch(source, X, level)
+    return {col: multiple * final_atk / fraction for col, fraction, multiple in _enemy_hp_caps(source, level)}
+
+
+def _hp_cap_terms(source: str, X: np.ndarray, level: int, hp: np.ndarray) -> dict:
+    """{column: (N, M)} value of each HP-capped term against every enemy HP in `hp`."""
+    breakpoints = hp_cap_breakpoints(source, X, level)
+    return {col: fraction * np.minimum(hp, breakpoints[col][:, None]) for col, fraction, _ in _enemy_hp_caps(source, level)}
+
+
+def adventurer_damage_over_hp(source: str, X: np.ndarray, level: int, enemy_hp, stacks=True) -> dict:
+    """
+    Skill columns of one adventurer level against every enemy HP in
+    `enemy_hp` ((M,) shared by all builds, or (N, M)). The engine runs once,
+    without the HP-capped terms, which are then added for each HP. Columns
+    that do not depend on HP come back as (N, 1), the others as (N, M).
+    """
+    hp = hp_grid(enemy_hp, X.shape[0])
+    dmg = adventurer_damage_batch(source, X, level, stacks, target_hp=0.0)
+    output = {key: np.asarray(value)[:, None] for key, value in dmg.items()}
+    for col, term in _hp_cap_terms(source, X, level, hp).items():
+        output[col] = output[col] + term
+        output[f"total_{source}"] = output[f"total_{source}"] + term
+    return output
+
+
+@dataclass
+class HPDamageCurve:
+    """
+    Cumulative damage of one adventurer level as a function of enemy HP.
+    Damage is linear in each HP-capped term, so
+    cumulative(hp) = base + sum(units[c] * term_c(hp)), where `base` is the
+    fight without the capped terms and `units[c]` the fight of column c at
+    one damage per cast, both (N, rounds).
+    """
+    base: np.ndarray
+    units: dict
+    breakpoints: dict
+    fractions: dict
+
+    def _terms(self, hp: np.ndarray) -> dict:
+        return {col: self.fractions[col] * np.minimum(hp, self.breakpoints[col][:, None]) for col in self.units}
+
+    def cumulative(self, enemy_hp) -> np.ndarray:
+        """(N, M, rounds) running damage totals against every enemy HP."""
+        hp = hp_grid(enemy_hp, self.base.shape[0])
+        out = np.repeat(self.base[:, None, :], hp.shape[1], axis=1)
+        for col, term in self._terms(hp).items():
+            out += self.units[col][:, None, :] * term[:, :, None]
+        return out
+
+    def totals(self, enemy_hp) -> np.ndarray:
+        """(N, M) damage over the whole fight against every enemy HP."""
+        hp = hp_grid(enemy_hp, self.base.shape[0])
+        out = np.repeat(self.base[:, -1:], hp.shape[1], axis=1)
+        for col, term in self._terms(hp).items():
+            out += self.units[col][:, -1:] * term
+        return out
+
+
+def adventurer_hp_curve(source: str, X: np.ndarray, level: int, rounds: int = None, stacks=True) -> HPDamageCurve:
+    """
+    HPDamageCurve of one adventurer level for every build. One engine
+    evaluation and one timeline per capped column cover any number of
+    enemy HP values, e.g. a whole boss roster.
+    """
+    rounds = rounds or ADVENTURER_ROUNDS[source]
+    dmg = adventurer_damage_batch(source, X, level, stacks, target_hp=0.0)
+    base = adventurer_timeline_batch(source, X, level, rounds, dmg=dmg, per_skill=False).cumulative()
+
+    caps = _enemy_hp_caps(source, level)
+    units = {}
+    for col, _, _ in caps:
+        unit = dict.fromkeys(dmg, 0.0)
+        unit[col] = np.ones(X.shape[0])
+        units[col] = adventurer_timeline_batch(source, X, level, rounds, dmg=unit, per_skill=False).cumulative()
+    return HPDamageCurve(base=base, units=units, breakpoints=hp_cap_breakpoints(source, X, level),
+                         fractions={col: fraction for col, fraction, _ in caps})
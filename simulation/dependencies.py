@@ -0,0 +1,71 @@
+# simulation/dependencies.py
+
+"""
+Derives the dependency graph between config keys and simulation outputs.
+Each config key maps to the (source, column) result cells it can change,
+built from DAMAGE_SKILLS and the adventurer output declarations.
+"""
+
+from collections import defaultdict
+
+from config.constants import *
+from .engine import DAMAGE_SKILLS, FINAL_ATK_KEYS, skill_dependencies
+from .adventurers import ADVENTURER_OUTPUT_DEPENDENCIES, ADVENTURER_ROUND_DEPENDENCIES
+
+# Name of the per-adventurer total column in the skill results
+TOTAL_COLUMNS = {
+    "gagarin": "total_gagarin",
+    "leonardo": "total_leonardo",
+    "dragon_girl": "total_dragon_girl",
+}
+
+
+def output_dependencies(source: str, column: str) -> set:
+    """Returns the config keys one output column of an adventurer depends on."""
+    declared = ADVENTURER_OUTPUT_DEPENDENCIES[source]
+    if column in declared:
+        skills, extra_keys = declared[column]
+        keys = set(FINAL_ATK_KEYS) | set(extra_keys)
+        for skill in skills:
+            keys |= skill_dependencies(skill)
+        return keys
+    return skill_dependencies(column)
+
+
+def build_dependency_graph() -> dict:
+    """Maps each config key to the set of (source, column) cells it affects."""
+    graph = defaultdict(set)
+    for source, declared in ADVENTURER_OUTPUT_DEPENDENCIES.items():
+        columns = set(DAMAGE_SKILLS) | set(declared)
+        for column in columns:
+            for key in output_dependencies(source, column):
+                graph[key].add((source, column))
+        for key in ADVENTURER_ROUND_DEPENDENCIES[source]:
+            graph[key].add((source, TOTAL_COLUMNS[source]))
+    return dict(graph)
+
+DEPENDENCY_GRAPH = build_dependency_graph()
+
+# Every key the simulation reads; anything else is unknown to the graph
+KNOWN_KEYS = set(ALL_KEYS) | {Rage_ATK_coef}
+
+
+def affected_outputs(changed_keys) -> dict:
+    """
+    Returns {source: set(columns)} for the outputs touched by the changed keys.
+    Keys unknown to the graph mark every output of every adventurer.
+    """
+    affected = defaultdict(set)
+    for key in changed_keys:
+        if key not in KNOWN_KEYS:
+            for source, declared in ADVENTURER_OUTPUT_DEPENDENCIES.items():
+                affected[source] |= set(DAMAGE_SKILLS) | set(declared)
+            continue
+        for source, column in DEPENDENCY_GRAPH.get(key, ()):
+            affected[source].add(column)
+    return dict(affected)
+
+
+def source_dependencies(source: str) -> set:
+    """Returns the config keys any output of one adventurer depends on."""
+    return {key for key, cells in DEPENDENCY_GRAPH.items() if any(cell[0] == source for cell in cells)}
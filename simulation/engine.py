@@ -10,6 +10,7 @@ from dataclasses import dataclass, field
 from typing import Optional, Dict
 
 from config.constants import *
+from utils.instrumentation import timed
 
 # === [1] Skill Definitions ===
 # This dictionary maps a skill identifier to its metadata, including damage
@@ -99,20 +100,23 @@ def calculate_final_atk(config: dict, strength: float = 1.15) -> float:
         (1 + config[Final_DMG_pct] / 100)
     )
 
-def get_expected_crit_multiplier(config: dict, skill_type: str) -> float:
-    """Calculates the expected critical hit multiplier for a given skill type."""
-    crit_chance = config.get(Crit_Chance_pct, 0)
-
+def crit_chance_keys(skill_type: str) -> list:
+    """Returns the crit chance keys that apply to a given skill type."""
     if skill_type == "basic_attack":
-        crit_chance += config.get(Basic_Crit_Chance_pct, 0) + config.get(Weapon_Crit_Chance_pct, 0)
+        return [Crit_Chance_pct, Basic_Crit_Chance_pct, Weapon_Crit_Chance_pct]
     elif skill_type in {"combo_attack", "rage", "counter"}:
-        crit_chance += config.get(Weapon_Crit_Chance_pct, 0)
+        return [Crit_Chance_pct, Weapon_Crit_Chance_pct]
     elif skill_type in {"burn_dot", "poison_dot"}:
+        return []
+    return [Crit_Chance_pct, Skill_Crit_Chance_pct]
+
+def get_expected_crit_multiplier(config: dict, skill_type: str) -> float:
+    """Calculates the expected critical hit multiplier for a given skill type."""
+    chance_keys = crit_chance_keys(skill_type)
+    if not chance_keys:
         return 1.0
-    else:
-        crit_chance += config.get(Skill_Crit_Chance_pct, 0)
 
-    crit_chance = min(100, crit_chance)
+    crit_chance = min(100, sum(config.get(k, 0) for k in chance_keys))
     crit_dmg = config.get(Crit_DMG_pct, 0)
     return (1 - crit_chance / 100) + (crit_chance / 100) * (1 + crit_dmg / 100)
 
@@ -186,6 +190,7 @@ def compute_damage(skill: str, config: dict, final_atk: float, base_coef: float
         * crit_multiplier
     )
 
+@timed("engine")
 def compute_all_damage(config: dict, strength: float = 1.15) -> dict:
     """
     Computes total damage and breakdowns for all skills defined in DAMAGE_SKILLS.
@@ -220,3 +225,30 @@ def to_bonus_key(skill: str) -> str:
     """Utility to guess a bonus coefficient key from a skill name."""
     parts = skill.replace("_dot", "").split("_")
     return "Bonus_" + "".join(p.capitalize() for p in parts) + "_Coef"
+
+# Keys feeding calculate_final_atk, shared by every skill
+FINAL_ATK_KEYS = [P_ATK, P_Strength, P_ATK_pct, P_Global_ATK_pct, Final_DMG_pct]
+
+def skill_dependencies(skill: str) -> set:
+    """Returns every config key that can change the damage of an engine skill."""
+    meta = DAMAGE_SKILLS.get(skill, {})
+    keys = set(FINAL_ATK_KEYS)
+
+    bonus_key = meta.get("bonus_coef_key")
+    if isinstance(bonus_key, list):
+        keys.update(bonus_key)
+    elif bonus_key:
+        keys.add(bonus_key)
+
+    keys.update(meta.get("local_mods", []))
+    keys.update(meta.get("global_mods", []))
+    for meta_key in ("count_key", "stack_param", "final_bonus_type"):
+        if meta.get(meta_key):
+            keys.add(meta[meta_key])
+
+    keys.update(crit_chance_keys(skill))
+    if crit_chance_keys(skill):
+        keys.add(Crit_DMG_pct)
+    if skill == "rage":
+        keys.add(Rage_ATK_coef)
+    return keys
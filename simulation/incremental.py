@@ -0,0 +1,98 @@
+# simulation/incremental.py
+
+"""
+Incremental re-run of the full simulation. The previous result is kept and,
+when only a few inputs change, just the skill/level cells reachable from the
+changed keys in the dependency graph are recomputed and patched in place.
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+
+from .simulation import run_full_simulation
+from .adventurers import evaluate_adventurer_level
+from .dependencies import TOTAL_COLUMNS, affected_outputs
+from utils.instrumentation import span
+
+SCENARIO_NAMES = ("Scenario 1", "Scenario 2")
+
+
+def changed_keys(previous: dict, current: dict) -> set:
+    """Returns the keys whose value differs between two scenario configs."""
+    return {k for k in set(previous) | set(current) if previous.get(k) != current.get(k)}
+
+
+class IncrementalSimulation:
+    """
+    Drop-in replacement for run_full_simulation that patches its previous
+    result. Returned frames are copies, so callers may mutate them freely.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+        # Counters, exposed for diagnostics
+        self.full_runs = 0
+        self.patched_runs = 0
+        self.reused_runs = 0
+        self.patched_cells = 0
+
+    def reset(self):
+        with self._lock:
+            self._state = None
+
+    def run(self, scenario1_config: dict, scenario2_config: dict):
+        configs = dict(zip(SCENARIO_NAMES, (dict(scenario1_config), dict(scenario2_config))))
+
+        with self._lock:
+            state = self._state
+
+        if state is None:
+            df_skills, df_rounds = run_full_simulation(*configs.values())
+            self.full_runs += 1
+        else:
+            previous, df_skills, df_rounds, _, _ = state
+            changes = {name: changed_keys(previous[name], configs[name]) for name in SCENARIO_NAMES}
+            if any(changes.values()):
+                with span("incremental.patch"):
+                    df_skills, df_rounds = df_skills.copy(), df_rounds.copy()
+                    for name, keys in changes.items():
+                        for source, columns in affected_outputs(keys).items():
+                            self._patch(state, df_skills, df_rounds, configs[name], name, source, columns)
+                self.patched_runs += 1
+            else:
+                self.reused_runs += 1
+
+        skill_index = df_skills.groupby(["source", "scenario"], sort=False).indices
+        round_index = df_rounds.groupby(["source", "scenario"], sort=False).indices
+        with self._lock:
+            self._state = (configs, df_skills, df_rounds, skill_index, round_index)
+
+        return df_skills.copy(), df_rounds.copy()
+
+    def _patch(self, state, df_skills, df_rounds, config, name, source, columns):
+        """Recomputes one adventurer/scenario and writes only the affected cells."""
+        _, _, _, skill_index, round_index = state
+        skill_rows = skill_index[(source, name)]
+        round_rows = round_index[(source, name)]
+
+        levels = df_skills["level"].to_numpy()[skill_rows]
+        results = [evaluate_adventurer_level(source, config, int(lvl), name) for lvl in levels]
+
+        total_column = TOTAL_COLUMNS[source]
+        write_columns = sorted((set(columns) | {total_column}) & set(df_skills.columns))
+        values = np.array([[float(row.get(column, 0) or 0) for column in write_columns] for row, _ in results])
+        df_skills.iloc[skill_rows, df_skills.columns.get_indexer(write_columns)] = values
+
+        all_totals = df_skills[list(TOTAL_COLUMNS.values())].to_numpy()[skill_rows]
+        df_skills.iloc[skill_rows, df_skills.columns.get_loc("total")] = np.nanmax(all_totals, axis=1)
+        if "breakdowns" in df_skills.columns:
+            index = df_skills.index[skill_rows]
+            breakdowns = pd.Series([row.get("breakdowns") for row, _ in results], index=index, dtype=object)
+            df_skills.loc[index, "breakdowns"] = breakdowns
+
+        totals = [total for _, cumulative in results for total in cumulative]
+        df_rounds.iloc[round_rows, df_rounds.columns.get_loc("total_damage")] = totals
+        self.patched_cells += len(skill_rows) * len(write_columns) + len(round_rows)
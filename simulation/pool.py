@@ -0,0 +1,222 @@
+# simulation/pool.py
+
+"""
+Persistent process pool for batch evaluation. Sending configs and frames to
+worker processes the naive way pickles every dict and DataFrame both ways,
+which costs about as much as the evaluation saves. Here:
+- Workers start once, import the engine and warm its column tables on
+  every adventurer level before reporting ready.
+- Config rows live in a shared memory block the parent fills once per call;
+  results are written by the workers into a second shared block in place.
+- A task is only a few numbers naming an (adventurer, level) and a row
+  range, so per-task overhead stays small whatever the batch size.
+"""
+
+import atexit
+import math
+import multiprocessing as mp
+import queue
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Rows per task at most, bounding each worker's temporaries
+POOL_BLOCK = 100_000
+# Seconds to wait for a worker before giving up
+WORKER_TIMEOUT = 600
+# Seconds between checks that every worker is still alive while waiting for results
+WORKER_POLL_S = 0.5
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Workers only borrow the parent's blocks. Before Python 3.13 attaching
+    # registers them again, with the resource tracker workers share with the
+    # parent, which is harmless: the parent unlinks them once.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _views(blocks: dict, task: tuple) -> tuple:
+    """Input (capacity, K) column-major and output (D, capacity) arrays over the named blocks."""
+    _, _, _, _, _, in_name, out_name, capacity, keys, objectives = task[:10]
+    # Blocks the parent has replaced are no longer named by any task
+    for name in set(blocks) - {in_name, out_name}:
+        blocks.pop(name).close()
+    for name in (in_name, out_name):
+        if name not in blocks:
+            blocks[name] = _attach(name)
+    X = np.ndarray((capacity, keys), dtype=np.float64, buffer=blocks[in_name].buf, order="F")
+    out = np.ndarray((objectives, capacity), dtype=np.float64, buffer=blocks[out_name].buf)
+    return X, out
+
+
+def _worker(tasks, results):
+    """Worker loop: warm up, then evaluate row ranges until a None task arrives."""
+    from .adventurers import ADVENTURER_LEVELS
+    from .batch import configs_to_matrix, fight_damage_batch
+
+    probe = np.asfortranarray(configs_to_matrix([{}]))
+    for source, levels in ADVENTURER_LEVELS.items():
+        for level in levels:
+            fight_damage_batch(source, probe, level)
+    results.put(("ready", None, 0.0))
+
+    blocks = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, source, level, rounds, stacks = task[:5]
+        objective, start, stop = task[10:]
+        started = time.perf_counter()
+        try:
+            X, out = _views(blocks, task)
+            out[objective, start:stop] = fight_damage_batch(source, X[start:stop], level, rounds, stacks)
+            del X, out
+            results.put((task_id, None, time.perf_counter() - started))
+        except Exception:
+            results.put((task_id, traceback.format_exc(), time.perf_counter() - started))
+    for block in blocks.values():
+        block.close()
+
+
+# === [1] Pool ===
+class BatchPool:
+    """
+    Worker processes evaluating fight damage of many builds for many
+    (adventurer, level) pairs, with inputs and outputs in shared memory.
+    Use as a context manager or call close(). One call runs at a time.
+    """
+
+    def __init__(self, workers: int = None, start_method: str = "spawn"):
+        self.workers = workers or mp.cpu_count()
+        context = mp.get_context(start_method)
+        self._tasks, self._results = context.Queue(), context.Queue()
+        started = time.perf_counter()
+        self._processes = [context.Process(target=_worker, args=(self._tasks, self._results), daemon=True)
+                           for _ in range(self.workers)]
+        self._input = self._output = None
+        self._lock = threading.Lock()
+        for process in self._processes:
+            process.start()
+        for _ in self._processes:
+            self._result()
+        self.startup_s = time.perf_counter() - started
+
+        self._next_task = 0
+        self.tasks_run = 0
+        self.worker_s = 0.0
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _result(self) -> tuple:
+        """
+        Next (task id, error, seconds) from the workers. A worker that dies
+        (killed, crashed) never answers, so the workers are checked on every
+        wake-up; a dead one, or no answer within WORKER_TIMEOUT, closes the
+        pool and raises RuntimeError.
+        """
+        deadline = time.monotonic() + WORKER_TIMEOUT
+        while True:
+            try:
+                result = self._results.get(timeout=WORKER_POLL_S)
+            except queue.Empty:
+                result = None
+            dead = [process for process in self._processes if process.exitcode is not None]
+            if dead:
+                self._terminate()
+                raise RuntimeError(f"Batch pool worker {dead[0].name} (pid {dead[0].pid}) died with exit code "
+                                   f"{dead[0].exitcode}; the pool is closed")
+            if result is not None:
+                return result
+            if time.monotonic() > deadline:
+                self._terminate()
+                raise RuntimeError(f"No batch pool result within {WORKER_TIMEOUT}s; the pool is closed")
+
+    def _block(self, current, size: int):
+        if current is not None and current.size >= size:
+            return current
+        if current is not None:
+            # Workers drop their mapping of the old block with their next task
+            current.close()
+            current.unlink()
+        return shared_memory.SharedMemory(create=True, size=max(size, 1))
+
+    def evaluate(self, X: np.ndarray, objectives: list, rounds: int = None, stacks=True) -> np.ndarray:
+        """(N, D) fight damage of every build for each (source, level) objective."""
+        with self._lock:
+            if not self._processes:
+                raise RuntimeError("The batch pool is closed")
+            builds, keys = X.shape
+            self._input = self._block(self._input, builds * keys * 8)
+            self._output = self._block(self._output, len(objectives) * builds * 8)
+            capacity = builds
+            shared_X = np.ndarray((capacity, keys), dtype=np.float64, buffer=self._input.buf, order="F")
+            shared_X[:] = X
+            del shared_X
+
+            step = max(1, min(POOL_BLOCK, math.ceil(builds / self.workers)))
+            pending = set()
+            for d, (source, level) in enumerate(objectives):
+                for start in range(0, builds, step):
+                    task_id = self._next_task
+                    self._next_task += 1
+                    self._tasks.put((task_id, source, level, rounds, stacks, self._input.name, self._output.name,
+                                     capacity, keys, len(objectives), d, start, min(builds, start + step)))
+                    pending.add(task_id)
+            errors = []
+            while pending:
+                task_id, error, seconds = self._result()
+                pending.discard(task_id)
+                self.tasks_run += 1
+                self.worker_s += seconds
+                if error:
+                    errors.append(error)
+            if errors:
+                raise RuntimeError(f"Batch pool task failed:\n{errors[0]}")
+
+            out = np.ndarray((len(objectives), capacity), dtype=np.float64, buffer=self._output.buf)
+            result = out[:, :builds].T.copy()
+            del out
+            return result
+
+    def fight_damage(self, source: str, X: np.ndarray, level: int, rounds: int = None, stacks=True) -> np.ndarray:
+        """(N,) fight damage of one adventurer level, as fight_damage_batch gives it."""
+        return self.evaluate(X, [(source, level)], rounds, stacks)[:, 0]
+
+    def close(self):
+        """Stops the workers and frees the shared memory. Safe to call twice."""
+        if not self._processes:
+            return
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=WORKER_TIMEOUT)
+        self._release()
+
+    def _terminate(self):
+        # Tasks still queued were meant for workers that are gone, so the survivors are stopped too
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join()
+        self._release()
+
+    def _release(self):
+        self._processes = []
+        for block in (self._input, self._output):
+            if block is not None:
+                block.close()
+                block.unlink()
+        self._input = self._output = None
+        atexit.unregister(self.close)
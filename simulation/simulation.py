@@ -4,51 +4,55 @@ from simulation.adventurers import (    run_gagarin_scenario,
     run_leo_scenario,
     run_dragon_girl_scenario
 )
+from utils.instrumentation import span
 
-def run_full_simulation(scenario1_config, scenario2_config):
+def run_full_simulation(scenario1_config, scenario2_config, trace=None):
     """
     Runs the entire simulation for all adventurers and both scenarios,
-    and returns the resulting dataframes.
+    and returns the resulting dataframes. Pass a SimulationTrace as `trace`
+    to record final ATK, per-skill multipliers and passive-adjusted keys.
     """
 
     # Apply scenario configurations
-    df_gaga_skill_1, df_gaga_rounds_1, _ = run_gagarin_scenario(scenario1_config, "Scenario 1")
-    df_gaga_skill_2, df_gaga_rounds_2, _ = run_gagarin_scenario(scenario2_config, "Scenario 2")
+    df_gaga_skill_1, df_gaga_rounds_1 = run_gagarin_scenario(scenario1_config, "Scenario 1", trace=trace)
+    df_gaga_skill_2, df_gaga_rounds_2 = run_gagarin_scenario(scenario2_config, "Scenario 2", trace=trace)
 
-    df_leo_skill_1, df_leo_rounds_1, _ = run_leo_scenario(scenario1_config, "Scenario 1")
-    df_leo_skill_2, df_leo_rounds_2, _ = run_leo_scenario(scenario2_config, "Scenario 2")
+    df_leo_skill_1, df_leo_rounds_1 = run_leo_scenario(scenario1_config, "Scenario 1", trace=trace)
+    df_leo_skill_2, df_leo_rounds_2 = run_leo_scenario(scenario2_config, "Scenario 2", trace=trace)
 
-    df_dg_skill_1, df_dg_rounds_1, _ = run_dragon_girl_scenario(scenario1_config, "Scenario 1")
-    df_dg_skill_2, df_dg_rounds_2, _ = run_dragon_girl_scenario(scenario2_config, "Scenario 2")
+    df_dg_skill_1, df_dg_rounds_1 = run_dragon_girl_scenario(scenario1_config, "Scenario 1", trace=trace)
+    df_dg_skill_2, df_dg_rounds_2 = run_dragon_girl_scenario(scenario2_config, "Scenario 2", trace=trace)
 
 
     # Combine results
-    df_gaga_skill = pd.concat([df_gaga_skill_1, df_gaga_skill_2], ignore_index=True)
-    df_gaga_rounds = pd.concat([df_gaga_rounds_1, df_gaga_rounds_2], ignore_index=True)
-    
-    df_leo_skill = pd.concat([df_leo_skill_1, df_leo_skill_2], ignore_index=True)
-    df_leo_rounds = pd.concat([df_leo_rounds_1, df_leo_rounds_2], ignore_index=True)
-
-    df_dg_skill = pd.concat([df_dg_skill_1, df_dg_skill_2], ignore_index=True)
-    df_dg_rounds = pd.concat([df_dg_rounds_1, df_dg_rounds_2], ignore_index=True)
-
-    df_all_skills = pd.concat([df_leo_skill, df_gaga_skill, df_dg_skill], ignore_index=True)
-    df_all_rounds = pd.concat([df_leo_rounds, df_gaga_rounds, df_dg_rounds], ignore_index=True)
-    
+    with span("concat"):
+        df_gaga_skill = pd.concat([df_gaga_skill_1, df_gaga_skill_2], ignore_index=True)
+        df_gaga_rounds = pd.concat([df_gaga_rounds_1, df_gaga_rounds_2], ignore_index=True)
+
+        df_leo_skill = pd.concat([df_leo_skill_1, df_leo_skill_2], ignore_index=True)
+        df_leo_rounds = pd.concat([df_leo_rounds_1, df_leo_rounds_2], ignore_index=True)
+
+        df_dg_skill = pd.concat([df_dg_skill_1, df_dg_skill_2], ignore_index=True)
+        df_dg_rounds = pd.concat([df_dg_rounds_1, df_dg_rounds_2], ignore_index=True)
+
+        df_all_skills = pd.concat([df_leo_skill, df_gaga_skill, df_dg_skill], ignore_index=True)
+        df_all_rounds = pd.concat([df_leo_rounds, df_gaga_rounds, df_dg_rounds], ignore_index=True)
+
     # --- Post-processing ---
-    df_all_skills["total"] = df_all_skills[["total_dragon_girl", "total_gagarin", "total_leonardo"]].max(axis=1)
-    
-    # Ensure numeric columns are correct
-    excluded_cols = {"source", "scenario", "level", "total", "breakdowns"}
-    damage_types = [
-        col for col in df_all_skills.columns 
-        if col not in excluded_cols and not col.startswith("Unnamed") and col != 'cooldown'
-    ]
-    df_all_skills[damage_types] = df_all_skills[damage_types].apply(pd.to_numeric, errors="coerce").fillna(0)
-    df_all_rounds["total_damage"] = pd.to_numeric(df_all_rounds["total_damage"], errors="coerce").fillna(0)
-    
-    # Standardize level column
-    df_all_skills["level"] = df_all_skills["level"].astype(int)
-    df_all_rounds["level"] = df_all_rounds["level"].astype(int)
+    with span("coercion"):
+        df_all_skills["total"] = df_all_skills[["total_dragon_girl", "total_gagarin", "total_leonardo"]].max(axis=1)
+
+        # Ensure numeric columns are correct
+        excluded_cols = {"source", "scenario", "level", "total", "breakdowns"}
+        damage_types = [
+            col for col in df_all_skills.columns
+            if col not in excluded_cols and not col.startswith("Unnamed") and col != 'cooldown'
+        ]
+        df_all_skills[damage_types] = df_all_skills[damage_types].apply(pd.to_numeric, errors="coerce").fillna(0)
+        df_all_rounds["total_damage"] = pd.to_numeric(df_all_rounds["total_damage"], errors="coerce").fillna(0)
+
+        # Standardize level column
+        df_all_skills["level"] = df_all_skills["level"].astype(int)
+        df_all_rounds["level"] = df_all_rounds["level"].astype(int)
 
     return df_all_skills, df_all_rounds
@@ -0,0 +1,156 @@
+# simulation/sparse.py
+
+"""
+Sparse storage for large build archives. Most config keys of a real build
+sit at their default, so a batch of builds is stored CSR-style over
+BATCH_KEYS: only the values that differ from a base row, with their column
+and the offsets of each build's run. Defaults are applied implicitly when
+rows are read back.
+
+The batch engine consumes it chunk by chunk: each chunk is expanded into a
+dense column-major config matrix of at most `chunk` rows, evaluated, and
+dropped, so memory grows with the stored values, not builds x keys.
+"""
+
+from array import array
+from dataclasses import dataclass
+
+import numpy as np
+
+from .batch import BATCH_KEYS, KEY_INDEX, configs_to_matrix, adventurer_damage_batch, fight_damage_batch
+from config.scenarios import BASE_CONFIG
+
+# Builds expanded to a dense matrix at a time
+SPARSE_CHUNK = 100_000
+# Column indices fit in 16 bits as long as there are fewer keys than this
+INDEX_DTYPE = np.int16 if len(BATCH_KEYS) < np.iinfo(np.int16).max else np.int32
+
+
+# === [1] Storage ===
+@dataclass
+class SparseConfigs:
+    """
+    Builds as CSR rows over BATCH_KEYS: row n holds the values
+    `data[indptr[n]:indptr[n + 1]]` at columns `indices[...]`, every other
+    key at `base`.
+    """
+    data: np.ndarray
+    indices: np.ndarray
+    indptr: np.ndarray
+    base: np.ndarray
+
+    @classmethod
+    def from_configs(cls, configs, base: dict = BASE_CONFIG) -> "SparseConfigs":
+        """Stores config dicts one at a time, without a dense intermediate. Missing keys take their `base` value."""
+        base_row = configs_to_matrix([{}], base)[0]
+        data, indices, indptr = array("d"), array("l"), array("q", [0])
+        for cfg in configs:
+            for key, value in cfg.items():
+                i = KEY_INDEX.get(key)
+                if i is not None and not float(value) == base_row[i]:
+                    data.append(float(value))
+                    indices.append(i)
+            indptr.append(len(data))
+        return cls(np.frombuffer(data, dtype=float).copy(), np.array(indices, dtype=INDEX_DTYPE),
+                   np.frombuffer(indptr, dtype=np.int64).copy(), base_row)
+
+    @classmethod
+    def from_matrix(cls, X: np.ndarray, base: dict = BASE_CONFIG, chunk: int = SPARSE_CHUNK) -> "SparseConfigs":
+        """Stores the rows of a dense config matrix."""
+        base_row = configs_to_matrix([{}], base)[0]
+        data, indices, counts = [], [], []
+        for start in range(0, X.shape[0], chunk):
+            part = X[start:start + chunk]
+            rows, cols = np.nonzero(~(part == base_row))
+            data.append(part[rows, cols])
+            indices.append(cols.astype(INDEX_DTYPE))
+            counts.append(np.bincount(rows, minlength=len(part)))
+        indptr = np.concatenate([[0], np.cumsum(np.concatenate(counts or [[]]))]).astype(np.int64)
+        return cls(np.concatenate(data or [np.zeros(0)]), np.concatenate(indices or [np.zeros(0, INDEX_DTYPE)]),
+                   indptr, base_row)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + self.indices.nbytes + self.indptr.nbytes + self.base.nbytes
+
+    def rows(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Dense (stop - start, K) config matrix of builds [start, stop), column-major."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        X = np.empty((stop - start, len(self.base)), order="F")
+        X[:] = self.base
+        lo, hi = self.indptr[start], self.indptr[stop]
+        owner = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        X[owner, self.indices[lo:hi]] = self.data[lo:hi]
+        return X
+
+    def chunks(self, chunk: int = SPARSE_CHUNK):
+        """Yields (start, stop, dense rows) over the whole batch."""
+        for start in range(0, len(self), chunk):
+            stop = min(len(self), start + chunk)
+            yield start, stop, self.rows(start, stop)
+
+    def column(self, key: str) -> np.ndarray:
+        """(N,) values of one config key, without expanding any row."""
+        out = np.full(len(self), self.base[KEY_INDEX[key]])
+        stored = np.nonzero(self.indices == KEY_INDEX[key])[0]
+        out[np.searchsorted(self.indptr, stored, side="right") - 1] = self.data[stored]
+        return out
+
+    def take(self, rows) -> "SparseConfigs":
+        """The builds at the given row indices, as a new batch."""
+        rows = np.arange(len(self))[rows]
+        counts = np.diff(self.indptr)[rows]
+        indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        # Position of every kept value: its row's start plus its offset within the row
+        offset = np.arange(indptr[-1]) - np.repeat(indptr[:-1], counts)
+        stored = np.repeat(self.indptr[rows], counts) + offset
+        return SparseConfigs(self.data[stored], self.indices[stored], indptr, self.base)
+
+    def to_configs(self, start: int = 0, stop: int = None) -> list:
+        """Full config dicts of builds [start, stop)."""
+        return [dict(zip(BATCH_KEYS, row)) for row in self.rows(start, stop).tolist()]
+
+    def save(self, path: str):
+        np.savez(path, data=self.data, indices=self.indices, indptr=self.indptr, base=self.base,
+                 keys=np.array(BATCH_KEYS))
+
+    @classmethod
+    def load(cls, path: str) -> "SparseConfigs":
+        with np.load(path) as archive:
+            if list(archive["keys"]) != BATCH_KEYS:
+                raise ValueError(f"{path} was saved with different config keys")
+            return cls(archive["data"], archive["indices"], archive["indptr"], archive["base"])
+
+
+# === [2] Evaluation ===
+def sparse_map(func, configs: SparseConfigs, chunk: int = SPARSE_CHUNK):
+    """
+    Applies `func` (dense matrix -> (n,) array or {name: (n,) array}) to
+    every chunk of `configs` and joins the results into (N,) outputs.
+    """
+    out = None
+    for start, stop, X in configs.chunks(chunk):
+        part = func(X)
+        if out is None:
+            shapes = part if isinstance(part, dict) else {None: part}
+            out = {name: np.empty((len(configs),) + np.shape(values)[1:]) for name, values in shapes.items()}
+        for name, values in (part.items() if isinstance(part, dict) else [(None, part)]):
+            out[name][start:stop] = values
+    if out is None:
+        return np.zeros(0)
+    return out[None] if list(out) == [None] else out
+
+
+def adventurer_damage_sparse(source: str, configs: SparseConfigs, level: int, stacks=True,
+                             chunk: int = SPARSE_CHUNK) -> dict:
+    """adventurer_damage_batch over a sparse batch: {column: (N,) damage}."""
+    return sparse_map(lambda X: adventurer_damage_batch(source, X, level, stacks), configs, chunk)
+
+
+def fight_damage_sparse(source: str, configs: SparseConfigs, level: int, rounds: int = None, stacks=True,
+                        chunk: int = SPARSE_CHUNK) -> np.ndarray:
+    """fight_damage_batch over a sparse batch: (N,) damage over the fight."""
+    return sparse_map(lambda X: fight_damage_batch(source, X, level, rounds, stacks), configs, chunk)
@@ -0,0 +1,128 @@
+# simulation/sweep.py
+
+"""
+Cartesian grid sweeps: fight damage of every adventurer level over a grid of
+config values (e.g. Crit_DMG_pct x Skill_DMG_pct x P_ATK_pct), as one dense
+labeled array per adventurer.
+
+No config dict is built per cell. Grid cells are flat indices, and each
+chunk of them is unravelled into a config matrix broadcast from the base
+config, evaluated and written straight into the result, so memory stays
+bounded by the chunk size plus the result itself. Axes an adventurer does
+not read (DEPENDENCY_GRAPH) are not swept for it: its values are computed
+over the other axes and broadcast along them.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .adventurers import ADVENTURER_LEVELS
+from .batch import KEY_INDEX, configs_to_matrix, fight_damage_batch
+from .dependencies import source_dependencies
+from config.scenarios import BASE_CONFIG
+
+# Grid cells evaluated per batch call
+SWEEP_CHUNK = 250_000
+
+
+# === [1] Axes ===
+def sweep_range(start: float, stop: float, step: float) -> np.ndarray:
+    """Values from `start` to `stop` inclusive, `step` apart."""
+    return np.arange(start, stop + step / 2, step, dtype=float)
+
+
+def sweep_levels(sources=None, levels=None) -> dict:
+    """{source: levels} swept: a list applied to every adventurer or a {source: levels} dict; None takes all."""
+    swept = {}
+    for source in sources or ADVENTURER_LEVELS:
+        chosen = levels.get(source) if isinstance(levels, dict) else levels
+        swept[source] = [level for level in ADVENTURER_LEVELS[source] if chosen is None or level in chosen]
+    return swept
+
+
+# === [2] Result ===
+@dataclass
+class SweepResult:
+    """
+    Fight damage over a grid: `totals[source]` has shape (levels, *axes),
+    indexed by `levels[source]` then by the values of each axis in order.
+    Arrays broadcast along axes an adventurer does not read are read-only
+    views.
+    """
+    axes: dict
+    levels: dict
+    totals: dict
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(len(values) for values in self.axes.values())
+
+    def sel(self, source: str, level: int = None, **values) -> np.ndarray:
+        """Slice of one adventurer's totals at a level and at given axis values (exact matches)."""
+        index = [slice(None)] * (len(self.axes) + 1)
+        if level is not None:
+            index[0] = self.levels[source].index(level)
+        for axis, (key, grid) in enumerate(self.axes.items(), start=1):
+            if key in values:
+                hit = np.nonzero(grid == values[key])[0]
+                if not len(hit):
+                    raise ValueError(f"{values[key]!r} is not on the {key} axis")
+                index[axis] = hit[0]
+        return self.totals[source][tuple(index)]
+
+    def to_frame(self, source: str) -> pd.DataFrame:
+        """Long table of one adventurer's totals: one row per (level, cell)."""
+        grids = np.meshgrid(self.levels[source], *self.axes.values(), indexing="ij")
+        frame = pd.DataFrame({name: grid.ravel() for name, grid in zip(["level", *self.axes], grids)})
+        frame["level"] = frame["level"].astype(int)
+        frame["total"] = np.asarray(self.totals[source]).ravel()
+        return frame
+
+
+# === [3] Sweep ===
+def _grid_rows(base: np.ndarray, columns: list, values: list, shape: tuple, start: int, stop: int) -> np.ndarray:
+    """Config rows of the flat grid cells [start, stop), column-major so the engine reads whole columns."""
+    X = np.empty((stop - start, len(base)), order="F")
+    X[:] = base
+    for column, grid, index in zip(columns, values, np.unravel_index(np.arange(start, stop), shape)):
+        X[:, column] = grid[index]
+    return X
+
+
+def grid_sweep(axes: dict, sources=None, levels=None, base: dict = BASE_CONFIG, rounds: int = None, stacks=True,
+               dtype=np.float64, chunk: int = SWEEP_CHUNK) -> SweepResult:
+    """
+    Fight damage of every adventurer level at every point of the Cartesian
+    grid of `axes` ({config key: values}), other keys taken from `base`.
+    `levels` is a list applied to every adventurer or a {source: levels}
+    dict. Cells are evaluated `chunk` at a time.
+    """
+    for key in axes:
+        if key not in KEY_INDEX:
+            raise ValueError(f"Unknown config key for sweep axis: {key!r}")
+    axes = {key: np.atleast_1d(np.asarray(values, dtype=float)) for key, values in axes.items()}
+    swept = sweep_levels(sources, levels)
+    base_row = configs_to_matrix([base])[0]
+    shape = tuple(len(values) for values in axes.values())
+
+    totals = {}
+    for source, source_levels in swept.items():
+        # Only the axes this adventurer reads are evaluated
+        read = [axis for axis, key in enumerate(axes) if key in source_dependencies(source)]
+        keys = [list(axes)[axis] for axis in read]
+        sub_shape = tuple(shape[axis] for axis in read)
+        cells = int(np.prod(sub_shape))
+        out = np.empty((len(source_levels), cells), dtype=dtype)
+        for start in range(0, cells, chunk):
+            stop = min(cells, start + chunk)
+            X = _grid_rows(base_row, [KEY_INDEX[key] for key in keys], [axes[key] for key in keys], sub_shape,
+                           start, stop)
+            for i, level in enumerate(source_levels):
+                out[i, start:stop] = fight_damage_batch(source, X, level, rounds, stacks)
+
+        full = tuple(n if axis in read else 1 for axis, n in enumerate(shape))
+        out = out.reshape((len(source_levels),) + full)
+        totals[source] = out if len(read) == len(shape) else np.broadcast_to(out, (len(source_levels),) + shape)
+    return SweepResult(axes=axes, levels=swept, totals=totals)
@@ -0,0 +1,156 @@
+# simulation/team.py
+
+"""
+Team evaluation: adventurers fighting side by side, their Global_* passives
+applying to the whole team instead of only to themselves.
+
+A member's fight damage depends only on its own level and on the team buffs
+among the keys its outputs read (DEPENDENCY_GRAPH). Member results are
+cached on exactly that, so a search over every team of a roster evaluates
+each (adventurer, level, relevant buffs) once, however many teams it
+appears in.
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from .adventurers import ADVENTURER_LEVELS, ADVENTURER_NAMES, ADVENTURER_PASSIVES
+from .batch import KEY_INDEX, configs_to_matrix, fight_damage_batch
+from .dependencies import source_dependencies
+from config.constants import *
+
+# How the same Global_* buff from several members combines
+BUFF_MODES = ("stacked", "shared")
+TEAM_SIZE = 3
+
+
+# === [1] Team Buffs ===
+def team_buffs(source: str, level: int) -> dict:
+    """Global_* passive bonuses {key: amount} one adventurer level grants the team."""
+    buffs = {}
+    for min_level, key, amount in ADVENTURER_PASSIVES[ADVENTURER_NAMES[source]]["bonuses"]:
+        if level >= min_level and key in GLOBAL_MOD_KEYS:
+            buffs[key] = buffs.get(key, 0) + amount
+    return buffs
+
+
+RELEVANT_KEYS = {source: source_dependencies(source) for source in ADVENTURER_LEVELS}
+
+
+def teammate_buffs(team: tuple, i: int, mode: str = "stacked") -> tuple:
+    """
+    Buffs member `i` of `team` ((source, level) pairs) gets from its
+    teammates, on top of its own passives, as sorted (key, amount) pairs
+    restricted to the keys it reads. "stacked" adds every teammate's copy
+    of a buff; "shared" keeps only the strongest copy, own one included.
+    """
+    if mode not in BUFF_MODES:
+        raise ValueError(f"Unknown buff mode: {mode!r}, expected one of {BUFF_MODES}")
+    source, level = team[i]
+    own = team_buffs(source, level)
+    extra = {}
+    for j, (other, other_level) in enumerate(team):
+        if j == i:
+            continue
+        for key, amount in team_buffs(other, other_level).items():
+            if key not in RELEVANT_KEYS[source]:
+                continue
+            if mode == "stacked":
+                extra[key] = extra.get(key, 0) + amount
+            else:
+                extra[key] = max(extra.get(key, 0), amount - own.get(key, 0))
+    return tuple(sorted((key, amount) for key, amount in extra.items() if amount > 0))
+
+
+# === [2] Cached Member Evaluation ===
+class TeamEvaluator:
+    """
+    Fight damage of teams for a fixed set of builds, one (N,) vector per
+    member, cached by (source, level, teammate buffs).
+    """
+
+    def __init__(self, configs, mode: str = "stacked", rounds: int = None, stacks=True):
+        if mode not in BUFF_MODES:
+            raise ValueError(f"Unknown buff mode: {mode!r}, expected one of {BUFF_MODES}")
+        self.X = configs if isinstance(configs, np.ndarray) else configs_to_matrix(configs)
+        self.mode, self.rounds, self.stacks = mode, rounds, stacks
+        self.cache = {}
+        self.hits = self.misses = 0
+
+    def member_damage(self, source: str, level: int, buffs: tuple = ()) -> np.ndarray:
+        """(N,) fight damage of one adventurer level with extra (key, amount) buffs."""
+        entry = (source, level, buffs)
+        if entry in self.cache:
+            self.hits += 1
+            return self.cache[entry]
+        self.misses += 1
+        X = self.X
+        if buffs:
+            X = X.copy()
+            for key, amount in buffs:
+                X[:, KEY_INDEX[key]] += amount
+        damage = fight_damage_batch(source, X, level, self.rounds, self.stacks)
+        self.cache[entry] = damage
+        return damage
+
+    def team_damage(self, team) -> dict:
+        """{source: (N,) damage} of every member of `team`, a sequence of (source, level) pairs."""
+        team = tuple(team)
+        return {source: self.member_damage(source, level, teammate_buffs(team, i, self.mode))
+                for i, (source, level) in enumerate(team)}
+
+
+# === [3] Team Search ===
+def team_roster(sources=None, levels=None) -> list:
+    """(source, level) candidates: every level of every source, or the levels given per source ({source: levels})."""
+    roster = []
+    for source in sources or ADVENTURER_LEVELS:
+        chosen = (levels or {}).get(source)
+        roster += [(source, level) for level in ADVENTURER_LEVELS[source] if chosen is None or level in chosen]
+    return roster
+
+
+def team_combinations(roster: list, size: int = TEAM_SIZE) -> list:
+    """Every team of `size` roster members with no adventurer twice."""
+    return [team for team in combinations(roster, size) if len({source for source, _ in team}) == size]
+
+
+def evaluate_teams(configs, roster: list = None, size: int = TEAM_SIZE, mode: str = "stacked",
+                   rounds: int = None, stacks=True) -> pd.DataFrame:
+    """
+    Fight damage of every team of `size` from `roster` ((source, level)
+    pairs, every adventurer level by default) for every build. One row per
+    (build, team) with each member's level and damage (NaN when absent) and
+    the team total, best team of each build first.
+    """
+    evaluator = TeamEvaluator(configs, mode, rounds, stacks)
+    roster = team_roster() if roster is None else list(roster)
+    builds = evaluator.X.shape[0]
+    sources = list(dict.fromkeys(source for source, _ in roster))
+
+    frames = []
+    for t, team in enumerate(team_combinations(roster, size)):
+        damage = evaluator.team_damage(team)
+        levels = dict(team)
+        frame = {"build": np.arange(builds), "team_id": t,
+                 "team": " + ".join(f"{source} L{level}" for source, level in team)}
+        for source in sources:
+            frame[f"{source}_level"] = levels.get(source, np.nan)
+            frame[f"{source}_damage"] = damage.get(source, np.full(builds, np.nan))
+        frame["total"] = sum(damage.values())
+        frames.append(pd.DataFrame(frame))
+
+    if not frames:
+        raise ValueError(f"No team of {size} distinct adventurers in the roster")
+    table = pd.concat(frames, ignore_index=True)
+    table = table.sort_values(["build", "total"], ascending=[True, False], kind="stable")
+    return table.reset_index(drop=True)
+
+
+def best_teams(configs, roster: list = None, size: int = TEAM_SIZE, mode: str = "stacked", top: int = 1,
+               rounds: int = None, stacks=True) -> pd.DataFrame:
+    """The `top` highest-damage teams of each build, as rows of evaluate_teams."""
+    table = evaluate_teams(configs, roster, size, mode, rounds, stacks)
+    return table.groupby("build", sort=False).head(top).reset_index(drop=True)
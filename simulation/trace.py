@@ -0,0 +1,72 @@
+# simulation/trace.py
+
+"""
+Opt-in tracing of the intermediate values computed during a simulation.
+The adventurer functions hand over references to what they already built
+(passive-adjusted config, final ATK, per-skill breakdowns); nothing is copied
+or recomputed until a trace is turned into a table.
+"""
+
+import pandas as pd
+
+
+class SimulationTrace:
+    """
+    Collects trace records. `bind` returns a view sharing the same records
+    that stamps extra context (scenario, source, ...) onto everything it records.
+    """
+
+    def __init__(self, records: list = None, **context):
+        self.records = [] if records is None else records
+        self.context = context
+
+    def bind(self, **context) -> "SimulationTrace":
+        return SimulationTrace(self.records, **{**self.context, **context})
+
+    def record(self, **values):
+        self.records.append({**self.context, **values})
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per traced skill with final ATK and its multipliers."""
+        rows = []
+        for record in self.records:
+            base = {
+                "scenario": record.get("scenario"),
+                "source": record.get("source"),
+                "level": record.get("level"),
+                "final_atk": record.get("final_atk"),
+                "strength": record.get("strength"),
+            }
+            for skill, breakdown in (record.get("breakdowns") or {}).items():
+                if breakdown is None:
+                    continue
+                rows.append({
+                    **base,
+                    "skill": skill,
+                    "count": breakdown.count,
+                    "base_coef": breakdown.base_coef,
+                    "bonus_coef": breakdown.bonus_coef,
+                    "local_multiplier": breakdown.local_multiplier,
+                    "global_multiplier": breakdown.global_multiplier,
+                    "final_multiplier": breakdown.final_multiplier,
+                    "crit_multiplier": breakdown.crit_multiplier,
+                    "total_damage": breakdown.total_damage,
+                })
+        return pd.DataFrame(rows)
+
+    def passives_frame(self) -> pd.DataFrame:
+        """One row per config key changed by adventurer passives."""
+        rows = []
+        for record in self.records:
+            before, after = record.get("config") or {}, record.get("passive_config") or {}
+            for key, value in after.items():
+                if before.get(key) != value:
+                    rows.append({
+                        "scenario": record.get("scenario"),
+                        "source": record.get("source"),
+                        "level": record.get("level"),
+                        "key": key,
+                        "before": before.get(key),
+                        "after": value,
+                    })
+        return pd.DataFrame(rows, columns=["scenario", "source", "level", "key", "before", "after"])
@@ -0,0 +1,145 @@
+# simulation/ttk.py
+
+"""
+Time-to-kill solver: the round on which each build brings an enemy's HP to
+zero, without building the round-by-round frames.
+
+Every adventurer schedule becomes periodic after a short transient (first
+casts, DoT stacks reaching their cap). Only that transient plus one period
+is simulated; beyond it the cumulative damage grows by a fixed amount per
+period, so the number of whole periods before the kill is solved in closed
+form and the remaining rounds are found by binary search on the cumulative
+sums. Everything is vectorized over (build, HP) pairs.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .adventurers import ADVENTURER_LEVELS, DOT_STACK_SKILLS, adventurer_schedule
+from .batch import configs_to_matrix, column, hp_grid, adventurer_hp_curve
+from .timeline import schedule_period
+from config.constants import *
+
+# Kill round reported when the enemy survives (no damage, or past `max_rounds`)
+NO_KILL = -1
+# Cumulative damage values held at once while solving an HP grid
+KILL_CHUNK = 4_000_000
+
+
+# === [1] Kill Round Solver ===
+def _search_rows(cumulative: np.ndarray, hp: np.ndarray) -> np.ndarray:
+    """Row-wise searchsorted (side="left"): first index with cumulative[n, i] >= hp[n, m]."""
+    lo = np.zeros(hp.shape, dtype=np.int64)
+    hi = np.full(hp.shape, cumulative.shape[1], dtype=np.int64)
+    while np.any(lo < hi):
+        active = lo < hi
+        mid = (lo + hi) // 2
+        value = np.take_along_axis(cumulative, np.minimum(mid, cumulative.shape[1] - 1), axis=1)
+        right = active & (value < hp)
+        lo = np.where(right, mid + 1, lo)
+        hi = np.where(active & ~right, mid, hi)
+    return lo
+
+
+def solve_kill_rounds(cumulative: np.ndarray, hp: np.ndarray, transient: int, period: int,
+                      max_rounds: int = None) -> np.ndarray:
+    """
+    Kill rounds from the cumulative damage of the first `transient + period`
+    rounds, (N, L), for HP values (N, M). Rounds past the simulated prefix
+    are reached by jumping whole periods: C(t + k * period) = C(t) + k * D,
+    with D the damage of one period.
+    """
+    cumulative = np.asarray(cumulative, dtype=float)
+    hp = np.asarray(hp, dtype=float)
+    prefix = transient + period
+    base = cumulative[:, transient - 1:transient] if transient else np.zeros((cumulative.shape[0], 1))
+    end = cumulative[:, prefix - 1:prefix]
+    per_period = end - base
+
+    beyond = hp > end
+    lethal = ~beyond | (per_period > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jumps = np.where(beyond & lethal, np.ceil((hp - end) / per_period), 0)
+    remaining = hp - jumps * per_period
+
+    index = _search_rows(cumulative[:, :prefix], remaining)
+    # Rounding can leave the remainder a hair above the prefix: one more period
+    overshoot = index >= prefix
+    if np.any(overshoot):
+        jumps = np.where(overshoot, jumps + 1, jumps)
+        index = np.where(overshoot, _search_rows(cumulative[:, :prefix], hp - jumps * per_period), index)
+
+    rounds = np.where(lethal, index + 1 + jumps * period, NO_KILL)
+    if max_rounds is not None:
+        rounds = np.where(rounds > max_rounds, NO_KILL, rounds)
+    return rounds.astype(np.int64)
+
+
+def _dot_ramp(X: np.ndarray, events: list) -> int:
+    """Rounds until every DoT in the schedule has reached its stack cap."""
+    ramp = 0
+    for skill, (count_key, cap_key) in DOT_STACK_SKILLS.items():
+        if not any(event.skill == skill for event in events):
+            continue
+        applications, cap = column(X, count_key), column(X, cap_key)
+        active = applications > 0
+        if np.any(active):
+            ramp = max(ramp, int(np.max(np.ceil(cap[active] / applications[active]))))
+    return ramp
+
+
+def kill_rounds_batch(source: str, X: np.ndarray, level: int, enemy_hp=None,
+                      max_rounds: int = None, stacks=True) -> np.ndarray:
+    """
+    Kill round of one adventurer level for every (build, HP) pair. `enemy_hp`
+    broadcasts to (N, M): a scalar, an (M,) grid shared by all builds, or an
+    (N, M) array (use hp[:, None] for one HP per build). None uses each
+    build's ENEMY_HP. HP-capped terms are evaluated against the HP they are
+    solved for, from a single evaluation over the whole HP axis. Returns
+    (N, M) rounds, NO_KILL where the enemy survives.
+    """
+    builds = X.shape[0]
+    hp = hp_grid(column(X, ENEMY_HP)[:, None] if enemy_hp is None else enemy_hp, builds)
+
+    events = adventurer_schedule(source, level)
+    transient, period = schedule_period(events)
+    transient += _dot_ramp(X, events)
+    if max_rounds is not None:
+        transient = min(transient, max_rounds)
+    prefix = transient + period
+
+    curve = adventurer_hp_curve(source, X, level, prefix, stacks)
+    result = np.empty(hp.shape, dtype=np.int64)
+    block = max(1, KILL_CHUNK // max(builds * prefix, 1))
+    for j in range(0, hp.shape[1], block):
+        part = hp[:, j:j + block]
+        cumulative = curve.cumulative(part).reshape(-1, prefix)
+        rounds = solve_kill_rounds(cumulative, part.reshape(-1, 1), transient, period, max_rounds)
+        result[:, j:j + block] = rounds.reshape(part.shape)
+    return result
+
+
+# === [2] Kill Round Tables ===
+def kill_round_table(configs, enemy_hp=None, sources=None, levels=None, max_rounds: int = None) -> pd.DataFrame:
+    """
+    One row per (build, source, level, enemy HP) with its kill round.
+    `configs` is a list of config dicts or a config matrix; `enemy_hp` is
+    None (each build's ENEMY_HP) or a list of HP values tried on every build.
+    """
+    X = configs if isinstance(configs, np.ndarray) else configs_to_matrix(configs)
+    hp_grid = None if enemy_hp is None else np.atleast_1d(np.asarray(enemy_hp, dtype=float))
+    hp_values = column(X, ENEMY_HP)[:, None] if hp_grid is None else np.broadcast_to(hp_grid, (X.shape[0], len(hp_grid)))
+
+    frames = []
+    for source in sources or ADVENTURER_LEVELS:
+        for level in levels or ADVENTURER_LEVELS[source]:
+            rounds = kill_rounds_batch(source, X, level, hp_grid, max_rounds)
+            build, hp_index = np.indices(rounds.shape)
+            frames.append(pd.DataFrame({
+                "build": build.ravel(),
+                "source": source,
+                "level": level,
+                "enemy_hp": hp_values[build.ravel(), hp_index.ravel()],
+                "kill_round": rounds.ravel(),
+            }))
+    return pd.concat(frames, ignore_index=True)
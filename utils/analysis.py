@@ -55,6 +55,25 @@ def build_percent_change_table(df_merged, damage_types):
 
     return pd.DataFrame(rows)
 
+def build_breakdown_table(df_all_skills):
+    """
+    Flattens the per-row breakdown dicts into one row per skill breakdown.
+    """
+    breakdown_rows = []
+    for _, row in df_all_skills.iterrows():
+        if isinstance(row.get("breakdowns"), dict):
+            for skill, breakdown in row["breakdowns"].items():
+                if breakdown:
+                    breakdown_dict = breakdown.as_dict()
+                    breakdown_dict.update({
+                        "Source": row["source"],
+                        "Scenario": row["scenario"],
+                        "Level": row["level"]
+                    })
+                    breakdown_rows.append(breakdown_dict)
+
+    return pd.DataFrame(breakdown_rows)
+
 def get_relevant_damage_types(df, threshold=0.01, exclude_cols=None):
     """
     Identifies damage types that contribute significantly to total damage.
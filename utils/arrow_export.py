@@ -0,0 +1,139 @@
+# utils/arrow_export.py
+
+"""
+Arrow export of simulation results for notebooks and other local
+processes. The skill, round and breakdown frames of a run are written as
+uncompressed Arrow IPC files, or into a named shared memory block, and
+read back as tables that point into the memory map instead of being parsed
+or unpickled. pyarrow is only needed when this module is used.
+"""
+
+import os
+from multiprocessing import resource_tracker, shared_memory
+
+from utils.analysis import build_breakdown_table
+
+# Tables of one exported run, each written to <name>.arrow
+RESULT_TABLES = ("skills", "rounds", "breakdowns")
+# Bytes holding the IPC file size at the start of a shared memory block
+SIZE_PREFIX = 8
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("Arrow export needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def results_to_tables(df_skills, df_rounds) -> dict:
+    """{name: pyarrow.Table} of a run_full_simulation result, breakdown objects flattened into their own table."""
+    pa = _pyarrow()
+    frames = {
+        "skills": df_skills.drop(columns=["breakdowns"], errors="ignore"),
+        "rounds": df_rounds,
+        "breakdowns": build_breakdown_table(df_skills),
+    }
+    return {name: pa.Table.from_pandas(frame, preserve_index=False) for name, frame in frames.items()}
+
+
+def _write_ipc(sink, table):
+    pa = _pyarrow()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+# === [1] IPC Files ===
+def write_results(directory: str, df_skills, df_rounds) -> dict:
+    """
+    Writes the result tables of a run to `directory` as Arrow IPC files.
+    Each file is written next to its final name and renamed into place, so
+    readers never see a partial file. Returns {name: path}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, table in results_to_tables(df_skills, df_rounds).items():
+        path = os.path.join(directory, f"{name}.arrow")
+        _write_ipc(f"{path}.tmp", table)
+        os.replace(f"{path}.tmp", path)
+        paths[name] = path
+    return paths
+
+
+def read_results(directory: str) -> dict:
+    """{name: pyarrow.Table} memory-mapped from the files write_results left in `directory`."""
+    pa = _pyarrow()
+    tables = {}
+    for name in RESULT_TABLES:
+        path = os.path.join(directory, f"{name}.arrow")
+        if os.path.exists(path):
+            tables[name] = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return tables
+
+
+# === [2] Shared Memory ===
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    # Before Python 3.13 an attaching process also registers the block with its
+    # resource tracker, which would free it when that process exits
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+
+class SharedResults:
+    """
+    Result tables held in named shared memory blocks, one per table. The
+    creating process keeps them alive until close(unlink=True); any local
+    process can attach by name while they exist.
+    """
+
+    def __init__(self, blocks: dict, owner: bool = False):
+        self.blocks = blocks
+        self.owner = owner
+
+    @property
+    def names(self) -> dict:
+        """{table: shared memory name}, what another process needs to attach."""
+        return {name: block.name for name, block in self.blocks.items()}
+
+    @classmethod
+    def create(cls, df_skills, df_rounds) -> "SharedResults":
+        pa = _pyarrow()
+        blocks = {}
+        for name, table in results_to_tables(df_skills, df_rounds).items():
+            # Sized first, then written straight into the block
+            mock = pa.MockOutputStream()
+            _write_ipc(mock, table)
+            size = mock.size()
+            # Blocks may be rounded up to whole pages, so the IPC file is prefixed with its size
+            block = shared_memory.SharedMemory(create=True, size=SIZE_PREFIX + size)
+            block.buf[:SIZE_PREFIX] = size.to_bytes(SIZE_PREFIX, "little")
+            _write_ipc(pa.FixedSizeBufferWriter(pa.py_buffer(block.buf[SIZE_PREFIX:SIZE_PREFIX + size])), table)
+            blocks[name] = block
+        return cls(blocks, owner=True)
+
+    @classmethod
+    def attach(cls, names: dict) -> "SharedResults":
+        return cls({name: _attach_block(block) for name, block in names.items()})
+
+    def tables(self) -> dict:
+        """{name: pyarrow.Table} reading straight from the shared blocks. Drop them before close()."""
+        pa = _pyarrow()
+        tables = {}
+        for name, block in self.blocks.items():
+            size = int.from_bytes(block.buf[:SIZE_PREFIX], "little")
+            tables[name] = pa.ipc.open_file(pa.py_buffer(block.buf[SIZE_PREFIX:SIZE_PREFIX + size])).read_all()
+        return tables
+
+    def close(self, unlink: bool = None):
+        """Detaches from the blocks, and frees them when `unlink` (by default, if this process created them)."""
+        for block in self.blocks.values():
+            block.close()
+            if self.owner if unlink is None else unlink:
+                block.unlink()
+        self.blocks = {}
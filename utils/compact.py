@@ -0,0 +1,134 @@
+# utils/compact.py
+
+"""
+Compact result frames for comparisons of many scenarios. The frames
+run_full_simulation returns keep `source` and `scenario` as Python strings,
+the breakdowns as an object column of dicts and every number as float64,
+which is fine for two scenarios but costs hundreds of bytes a row once a
+comparison reaches millions of rows. Compact frames use:
+- categorical `source` and `scenario` columns, small integer `level` and `round`;
+- optionally float32 damage columns, only where every value fits;
+- a separate breakdown table keyed by skill row instead of nested objects.
+"""
+
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+
+LABEL_COLUMNS = ("source", "scenario")
+# Narrowest integer types for the key columns; wider values keep their type
+INT_COLUMNS = {"level": "int8", "round": "int16", "Count": "int32"}
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+# Breakdown table columns, as DamageBreakdown.as_dict names them, and the attributes they come from
+BREAKDOWN_FIELDS = {
+    "Skill": "skill", "Count": "count", "BaseCoef": "base_coef", "BonusCoef": "bonus_coef",
+    "TotalCoef": "total_coef", "FinalATK": "final_atk", "LocalMult": "local_multiplier",
+    "GlobalMult": "global_multiplier", "FinalMult": "final_multiplier", "CritMult": "crit_multiplier",
+    "TotalDamage": "total_damage",
+}
+
+
+def _fits(values: np.ndarray, dtype) -> bool:
+    if not len(values):
+        return True
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        info = np.iinfo(dtype)
+        return bool(np.all(values == np.round(values))) and info.min <= values.min() and values.max() <= info.max
+    finite = values[np.isfinite(values)]
+    return not len(finite) or float(np.abs(finite).max()) <= FLOAT32_MAX
+
+
+def compact_frame(df: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """
+    Copy of a result frame with categorical labels and narrow key columns.
+    With `float32`, float64 columns whose values all fit are stored as
+    float32 (about 7 significant digits). Object columns are left as they are.
+    """
+    out = df.copy()
+    for column in out.columns:
+        series = out[column]
+        if column in LABEL_COLUMNS:
+            out[column] = series.astype("category")
+        elif column in INT_COLUMNS and pd.api.types.is_numeric_dtype(series):
+            if _fits(series.to_numpy(dtype=float), INT_COLUMNS[column]):
+                out[column] = series.astype(INT_COLUMNS[column])
+        elif float32 and series.dtype == np.float64 and _fits(series.to_numpy(), np.float32):
+            out[column] = series.astype(np.float32)
+    return out
+
+
+# === [1] Results ===
+def compact_breakdowns(df_skills: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """
+    Breakdown objects of a skill frame as one normalized table: one row per
+    skill breakdown, with `row` the position of its skill row in `df_skills`
+    instead of repeated source, scenario and level labels.
+    """
+    rows, items = [], []
+    if "breakdowns" in df_skills.columns:
+        for position, breakdowns in enumerate(df_skills["breakdowns"]):
+            if not isinstance(breakdowns, dict):
+                continue
+            for breakdown in breakdowns.values():
+                if breakdown:
+                    rows.append(position)
+                    items.append(breakdown)
+    # Read straight into columns; a dict per breakdown costs more than the rest together
+    values = list(map(attrgetter(*BREAKDOWN_FIELDS.values()), items))
+    columns = list(BREAKDOWN_FIELDS)
+    numbers = np.array([value[1:] for value in values], dtype=float).reshape(len(values), len(columns) - 1)
+    table = pd.DataFrame(numbers, columns=columns[1:])
+    table.insert(0, "Skill", pd.Categorical([value[0] for value in values]))
+    table.insert(0, "row", np.asarray(rows, dtype=np.int32))
+    return compact_frame(table, float32)
+
+
+def expand_breakdowns(df_skills: pd.DataFrame, df_breakdowns: pd.DataFrame) -> pd.DataFrame:
+    """A normalized breakdown table joined back to its labels, in the layout of build_breakdown_table."""
+    labels = df_skills[["source", "scenario", "level"]].iloc[df_breakdowns["row"].to_numpy()]
+    table = df_breakdowns.drop(columns=["row"]).reset_index(drop=True)
+    table["Source"] = labels["source"].to_numpy()
+    table["Scenario"] = labels["scenario"].to_numpy()
+    table["Level"] = labels["level"].to_numpy()
+    return table
+
+
+def compact_results(df_skills: pd.DataFrame, df_rounds: pd.DataFrame, float32: bool = False) -> tuple:
+    """
+    Compact (skills, rounds, breakdowns) frames of a run_full_simulation
+    result. The skill frame loses its breakdowns column, which moves to the
+    breakdown table; its index is reset so `row` addresses it by position.
+    """
+    skills = compact_frame(df_skills.drop(columns=["breakdowns"], errors="ignore").reset_index(drop=True), float32)
+    rounds = compact_frame(df_rounds, float32)
+    return skills, rounds, compact_breakdowns(df_skills, float32)
+
+
+# === [2] Memory Footprint ===
+def memory_footprint(frames: dict) -> pd.DataFrame:
+    """
+    Rows, columns and bytes of each named frame. Strings are measured in
+    full; object columns such as breakdown dicts only count their containers,
+    so the bytes of a full skill frame are a lower bound.
+    """
+    rows = [
+        {"table": name, "rows": len(frame), "columns": frame.shape[1],
+         "bytes": int(frame.memory_usage(deep=True, index=True).sum())}
+        for name, frame in frames.items()
+    ]
+    table = pd.DataFrame(rows, columns=["table", "rows", "columns", "bytes"])
+    table["MB"] = table["bytes"] / 2 ** 20
+    return table
+
+
+def result_footprint(df_skills: pd.DataFrame, df_rounds: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """Memory of a result as returned and as compact frames, for the diagnostics tab."""
+    skills, rounds, breakdowns = compact_results(df_skills, df_rounds, float32)
+    return memory_footprint({
+        "skills": df_skills,
+        "rounds": df_rounds,
+        "skills (compact)": skills,
+        "rounds (compact)": rounds,
+        "breakdowns (compact)": breakdowns,
+    })
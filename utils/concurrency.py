@@ -0,0 +1,123 @@
+# utils/concurrency.py
+
+"""
+Async execution helpers for the Gradio app. Heavy simulation jobs are
+offloaded to a bounded worker pool, and identical requests that arrive while
+a computation is still running are coalesced onto that single computation.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _normalize_value(value):
+    # Gradio hands back ints or floats depending on the input state, so
+    # numbers are normalized to float to keep 5 and 5.0 on the same hash.
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    return str(value)
+
+
+def canonical_scenario_hash(*scenarios: dict) -> str:
+    """Returns a stable hash identifying an ordered set of scenario configs."""
+    payload = [
+        {str(k): _normalize_value(v) for k, v in sorted(scenario.items())}
+        for scenario in scenarios
+    ]
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class SimulationExecutor:
+    """
+    Runs blocking jobs on a bounded thread pool with single-flight coalescing.
+
+    `max_workers` bounds the pool size and `max_heavy_jobs` bounds how many
+    jobs may run at once. Callers submitting a key that is already in flight
+    await the existing computation instead of starting a new one.
+    """
+
+    def __init__(self, max_workers: int = 4, max_heavy_jobs: int = 2):
+        self.max_workers = max_workers
+        self.max_heavy_jobs = max_heavy_jobs
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="simulation")
+        self._heavy_jobs = asyncio.Semaphore(max_heavy_jobs)
+        self._inflight = {}
+        # Job tasks, referenced until done so they are not garbage collected
+        self._tasks = set()
+
+        # Simple counters, exposed for diagnostics
+        self.submitted = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.running = 0
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    @property
+    def queued(self) -> int:
+        """Distinct jobs waiting for a heavy-job slot."""
+        return max(len(self._inflight) - self.running, 0)
+
+    async def run(self, key: str, fn, *args, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)` in the pool, sharing the result per key.
+
+        The job runs in its own task, so cancelling a caller (a closed browser
+        tab) only stops that caller waiting: coalesced callers still get the
+        result, and the heavy-job slot stays taken until the thread finishes.
+        """
+        self.submitted += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._inflight[key] = future
+            task = loop.create_task(self._execute(key, future, functools.partial(fn, *args, **kwargs)))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return await asyncio.shield(future)
+
+    async def _execute(self, key: str, future: asyncio.Future, job):
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._heavy_jobs:
+                self.running += 1
+                try:
+                    result = await loop.run_in_executor(self._pool, job)
+                finally:
+                    self.running -= 1
+        except asyncio.CancelledError:
+            # Only reached when the event loop itself shuts down
+            future.cancel()
+            raise
+        except BaseException as exc:
+            self.failed += 1
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else is waiting
+        else:
+            self.completed += 1
+            future.set_result(result)
+        finally:
+            self._inflight.pop(key, None)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
+def executor_from_env() -> SimulationExecutor:
+    """Builds an executor sized by the MAX_WORKERS / MAX_HEAVY_JOBS env vars."""
+    max_workers = int(os.getenv("MAX_WORKERS", 4))
+    max_heavy_jobs = int(os.getenv("MAX_HEAVY_JOBS", 2))
+    return SimulationExecutor(max_workers=max_workers, max_heavy_jobs=min(max_heavy_jobs, max_workers))
@@ -0,0 +1,128 @@
+# utils/instrumentation.py
+
+"""
+Lightweight timing instrumentation for the simulation hot path. Named spans
+are collected per request and exported as a structured log line or a table.
+
+Profiling is switched on with PROFILE=true. When it is off, `timed` returns
+the decorated function untouched and `span` hands back a shared no-op
+context, so the instrumented code pays next to nothing. Span listeners
+(the metrics histograms) still see the `span` blocks when profiling is off.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+import pandas as pd
+
+PROFILING_ENABLED = os.getenv("PROFILE", "false").lower() == "true"
+
+logger = logging.getLogger("capybara.profile")
+
+_current_collector = contextvars.ContextVar("span_collector", default=None)
+_NULL_SPAN = nullcontext()
+_LISTENERS = []
+
+
+class SpanCollector:
+    """Accumulates the spans recorded while it is the active collector."""
+
+    def __init__(self):
+        self.spans = []
+
+    def add(self, name: str, start: float, duration: float):
+        self.spans.append((name, start, duration))
+
+    def summary(self) -> list:
+        """Aggregates spans by name, in order of first appearance."""
+        stats = {}
+        for name, _, duration in self.spans:
+            entry = stats.setdefault(name, {"span": name, "count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += duration * 1e3
+            entry["max_ms"] = max(entry["max_ms"], duration * 1e3)
+        for entry in stats.values():
+            entry["mean_ms"] = entry["total_ms"] / entry["count"]
+        return list(stats.values())
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns the summary as a table. Nested spans report inclusive time."""
+        columns = ["span", "count", "total_ms", "mean_ms", "max_ms"]
+        return pd.DataFrame(self.summary(), columns=columns)
+
+    def to_log_line(self, **fields) -> str:
+        """Serializes the summary, plus any extra fields, as one JSON line."""
+        payload = {
+            **fields,
+            "spans": {
+                entry["span"]: {"count": entry["count"], "total_ms": round(entry["total_ms"], 3)}
+                for entry in self.summary()
+            },
+        }
+        return json.dumps(payload, sort_keys=True)
+
+
+class _Span:
+    __slots__ = ("name", "collector", "start")
+
+    def __init__(self, name: str, collector):
+        self.name = name
+        self.collector = collector
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start
+        if self.collector is not None:
+            self.collector.add(self.name, self.start, duration)
+        for listener in _LISTENERS:
+            listener(self.name, duration)
+        return False
+
+
+def span(name: str):
+    """Returns a context manager timing the enclosed block under `name`."""
+    collector = _current_collector.get() if PROFILING_ENABLED else None
+    if collector is None and not _LISTENERS:
+        return _NULL_SPAN
+    return _Span(name, collector)
+
+
+def timed(name: str):
+    """Decorator timing every call of a function. A no-op when disabled."""
+    def decorator(fn):
+        if not PROFILING_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_span_listener(listener):
+    """Registers `listener(name, duration_s)`, called whenever a span ends."""
+    _LISTENERS.append(listener)
+
+
+@contextmanager
+def collect():
+    """Makes a fresh SpanCollector active for the enclosed block (one request)."""
+    collector = SpanCollector()
+    if not PROFILING_ENABLED:
+        yield collector
+        return
+    token = _current_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _current_collector.reset(token)
@@ -0,0 +1,227 @@
+# utils/metrics.py
+
+"""
+Counters, gauges and histograms for the app and the API, rendered in the
+Prometheus text format on a /metrics endpoint or logged as periodic JSON
+snapshots. Updating a metric is a dict update under a lock, cheap enough
+for every request. Values other objects already count (executor jobs,
+incremental cache runs, API queue depth) are read through callbacks when
+metrics are collected rather than mirrored on the hot path.
+"""
+
+import json
+import logging
+import math
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds, from a quick table lookup to a slow full run
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger("capybara.metrics")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# === [1] Metrics ===
+class Metric:
+    """
+    A named metric with optional labels. Values are set on the metric, or
+    read at collection time from `fn`, which returns a number (no labels) or
+    {label values tuple: number}.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) == len(self.labels):
+            try:
+                return tuple([str(labels[name]) for name in self.labels])
+            except KeyError:
+                pass
+        raise ValueError(f"{self.name} takes labels {list(self.labels)}, got {sorted(labels)}")
+
+    def values(self) -> dict:
+        """{label values: value} as of now."""
+        if self.fn is None:
+            with self._lock:
+                return dict(self._values)
+        value = self.fn()
+        return value if isinstance(value, dict) else {(): value}
+
+    def samples(self) -> list:
+        """(sample name, label string, value) lines of the text format."""
+        return [(self.name, _labels(self.labels, key), value) for key, value in sorted(self.values().items())]
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down, usually read through `fn`."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def values(self) -> dict:
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+    def samples(self) -> list:
+        lines = []
+        for key, (counts, total) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append((f"{self.name}_bucket", _labels(self.labels, key, f'le="{_number(bound)}"'), cumulative))
+            lines.append((f"{self.name}_sum", _labels(self.labels, key), total))
+            lines.append((f"{self.name}_count", _labels(self.labels, key), cumulative))
+        return lines
+
+
+# === [2] Registry ===
+class MetricsRegistry:
+    """The metrics of one process or server, by name. Registering a name twice returns the first metric."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, help: str, labels=(), fn=None) -> Counter:
+        return self._register(Counter, name, help, labels, fn)
+
+    def gauge(self, name: str, help: str, labels=(), fn=None) -> Gauge:
+        return self._register(Gauge, name, help, labels, fn)
+
+    def histogram(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labels, buckets)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """{metric: {label string: value}}; histograms give count, sum and bucket counts."""
+        snapshot = {}
+        for metric in list(self._metrics.values()):
+            entries = {}
+            for key, value in metric.values().items():
+                label = ",".join(f"{name}={item}" for name, item in zip(metric.labels, key))
+                if isinstance(metric, Histogram):
+                    counts, total = value
+                    value = {"count": sum(counts), "sum": total,
+                             "buckets": dict(zip(map(_number, metric.buckets + (math.inf,)), counts))}
+                entries[label] = value
+            snapshot[metric.name] = entries
+        return snapshot
+
+
+REGISTRY = MetricsRegistry()
+
+
+# === [3] Exposition ===
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """Serves GET /metrics for `registry` from a background thread."""
+    handler = type("RegistryMetricsHandler", (MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def start_metrics_dump(interval_s: float, registry: MetricsRegistry = REGISTRY) -> threading.Event:
+    """Logs a JSON snapshot every `interval_s` seconds until the returned event is set."""
+    stop = threading.Event()
+
+    def dump():
+        while not stop.wait(interval_s):
+            logger.info(json.dumps({"event": "metrics", "metrics": registry.snapshot()}, sort_keys=True))
+
+    threading.Thread(target=dump, name="metrics-dump", daemon=True).start()
+    return stop